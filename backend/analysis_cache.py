@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+from candle_frame import CandleFrame
+
+logger = logging.getLogger("signal_bot")
+
+
+def candle_fingerprint(candles, window=8, decimals=4):
+    """
+    Відбиток вікна свічок: ціни останніх window свічок, округлені до decimals знаків.
+    Майже однакові вікна (повторний запуск одразу після планового) дають той самий відбиток.
+    """
+    tail = candles[-window:]
+    if isinstance(tail, CandleFrame):
+        parts = [f"{round(o, decimals)}:{round(c, decimals)}" for o, c in zip(tail.open.tolist(), tail.close.tolist())]
+        return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+    parts = []
+    for candle in tail:
+        parts.append(f"{round(candle.open, decimals)}:{round(candle.close, decimals)}")
+    return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+
+class AnalysisCache:
+    """LRU кеш відповідей AI з TTL та необов'язковим збереженням на диск"""
+
+    def __init__(self, max_entries=256, ttl=120, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self._load()
+
+    def make_key(self, asset, language, model, candles, window=8, decimals=4):
+        return f"{asset}|{language}|{model}|{candle_fingerprint(candles, window, decimals)}"
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            self._dirty = True
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty = True
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 2) if total else 0.0
+        }
+
+    def _load(self):
+        try:
+            if not os.path.exists(self.path):
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            now = time.time()
+            for key, expires_at, value in data.get('entries', []):
+                if expires_at > now:
+                    self._entries[key] = (expires_at, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося завантажити кеш аналізу: {e}")
+            self._entries = OrderedDict()
+
+    def flush(self):
+        """Запис кешу на диск (лише якщо були зміни)"""
+        if not self.path or not self._dirty:
+            return
+        try:
+            now = time.time()
+            entries = [[key, expires_at, value] for key, (expires_at, value) in self._entries.items()
+                       if expires_at > now]
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'entries': entries}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти кеш аналізу: {e}")
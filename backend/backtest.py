@@ -0,0 +1,393 @@
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from config import Config
+from candle_frame import CandleFrame
+from indicators import candles_to_matrix, ema, rsi, EMA_FAST, EMA_SLOW, RSI_PERIOD
+
+# Векторизований бектест: сигнали (з історії або кандидатної стратегії) перевіряються
+# на архіві свічок одним проходом NumPy - без поштучних відгуків через save_feedback.
+
+DIRECTIONS = {'UP': 1, 'CALL': 1, 'BUY': 1, 'DOWN': -1, 'PUT': -1, 'SELL': -1}
+CONFIDENCE_EDGES = (0.0, 0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95, 1.0)
+KEY_STRIDE = 1 << 40  # Ключ свічки: код активу * KEY_STRIDE + epoch
+
+DAY = 86400
+WIN, LOSS, DRAW, UNRESOLVED = 1, -1, 0, 2
+
+
+def _kyiv_offsets(epochs):
+    """Зсув Києва від UTC (секунди) для кожного epoch; pytz викликається лише раз на добу"""
+    days, inverse = np.unique(epochs // DAY, return_inverse=True)
+    offsets = np.array([
+        Config.KYIV_TZ.utcoffset(datetime.utcfromtimestamp(int(day) * DAY + DAY // 2)).total_seconds()
+        for day in days
+    ], dtype=np.int64)
+    return offsets[inverse] if len(days) else np.zeros(0, dtype=np.int64)
+
+
+def _to_epoch(value):
+    moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = Config.KYIV_TZ.localize(moment)
+    return moment.timestamp()
+
+
+class SignalBatch:
+    """Колонкове представлення сигналів: актив, вхід, тривалість, напрямок, впевненість, година (Київ)"""
+
+    def __init__(self, assets, entry, duration, direction, confidence, hour):
+        self.assets = np.asarray(assets, dtype=object)
+        self.entry = np.asarray(entry, dtype=np.int64)
+        self.duration = np.asarray(duration, dtype=np.float64)
+        self.direction = np.asarray(direction, dtype=np.int8)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.hour = np.asarray(hour, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.entry)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Записи історії (signals/history.json, архів сегментів). Час входу - entry_time (HH:MM, Київ)
+        у день генерації; без entry_time - generated + entry_delay хвилин.
+        """
+        assets, generated, entry_minutes, delays, durations, directions, confidences = [], [], [], [], [], [], []
+        for entry in entries:
+            direction = DIRECTIONS.get(str(entry.get('direction', '')).upper())
+            epoch = entry.get('generated_epoch')
+            try:
+                if epoch is None:
+                    epoch = _to_epoch(entry.get('generated_at') or entry['saved_at'])
+            except (KeyError, AttributeError, ValueError):
+                continue
+            if direction is None or not entry.get('asset'):
+                continue
+
+            entry_time = entry.get('entry_time') or ''
+            try:
+                minutes = int(entry_time[:2]) * 60 + int(entry_time[3:5])
+            except (TypeError, ValueError):
+                minutes = -1
+
+            assets.append(entry['asset'].replace('/', ''))
+            generated.append(epoch)
+            entry_minutes.append(minutes)
+            delays.append(entry.get('entry_delay', 2))
+            durations.append(entry.get('duration', 2))
+            directions.append(direction)
+            confidences.append(entry.get('confidence', 0))
+
+        generated = np.asarray(generated, dtype=np.float64).astype(np.int64)
+        entry_minutes = np.asarray(entry_minutes, dtype=np.int64)
+        offsets = _kyiv_offsets(generated)
+        local = generated + offsets
+
+        # HH:MM у день генерації; якщо вийшло раніше за генерацію більш ніж на пів доби - це вже наступний день
+        entry_local = local - local % DAY + entry_minutes * 60
+        entry_local = np.where(entry_local < local - DAY // 2, entry_local + DAY, entry_local)
+        fallback = generated + np.asarray(delays, dtype=np.int64) * 60
+        fallback -= fallback % 60
+        entry = np.where(entry_minutes >= 0, entry_local - offsets, fallback)
+
+        return cls(assets, entry, durations, directions, confidences, (local % DAY) // 3600)
+
+
+class CandleIndex:
+    """
+    Свічки всіх активів в одному відсортованому масиві ключів (актив, час):
+    ціни для всіх сигналів знаходяться одним searchsorted.
+    """
+
+    def __init__(self, frames):
+        self.assets = sorted(frames)
+        self.codes = {asset: code for code, asset in enumerate(self.assets)}
+        keys, opens, closes, ends = [], [], [], []
+        for code, asset in enumerate(self.assets):
+            frame = frames[asset]
+            if not len(frame):
+                continue
+            order = np.argsort(frame.timestamps, kind='stable')
+            timestamps = np.asarray(frame.timestamps, dtype=np.int64)[order]
+            timeframe = int(frame.timeframe or Config.TIMEFRAMES)
+            keys.append(code * KEY_STRIDE + timestamps)
+            opens.append(np.asarray(frame.open, dtype=np.float64)[order])
+            closes.append(np.asarray(frame.close, dtype=np.float64)[order])
+            ends.append(code * KEY_STRIDE + timestamps + timeframe)
+        self.keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        self.ends = np.concatenate(ends) if ends else np.zeros(0, dtype=np.int64)
+        self.open = np.concatenate(opens) if opens else np.zeros(0)
+        self.close = np.concatenate(closes) if closes else np.zeros(0)
+
+    def encode(self, assets):
+        """Коди активів сигналів (-1 - активу немає в архіві)"""
+        unique, inverse = np.unique(assets.astype(str), return_inverse=True)
+        codes = np.array([self.codes.get(asset, -1) for asset in unique], dtype=np.int64)
+        return codes[inverse] if len(unique) else np.zeros(0, dtype=np.int64)
+
+    def locate(self, codes, times):
+        """Індекси свічок, що містять момент times (valid=False - поза архівом або в пропуску)"""
+        targets = codes * KEY_STRIDE + times
+        index = np.searchsorted(self.keys, targets, side='right') - 1
+        safe = np.clip(index, 0, max(len(self.keys) - 1, 0))
+        valid = (codes >= 0) & (index >= 0) & (len(self.keys) > 0)
+        if len(self.keys):
+            valid &= (targets < self.ends[safe]) & (self.keys[safe] // KEY_STRIDE == codes)
+        return safe, valid
+
+
+def evaluate(signals, candles):
+    """
+    Результат кожного сигналу: ціна входу - open свічки з моментом entry_time,
+    ціна виходу - close свічки, в якій завершується угода (entry + duration хвилин).
+    Повертає масив WIN/LOSS/DRAW/UNRESOLVED.
+    """
+    codes = candles.encode(signals.assets)
+    entry_index, entry_valid = candles.locate(codes, signals.entry)
+    exit_time = signals.entry + np.round(signals.duration * 60).astype(np.int64)
+    exit_index, exit_valid = candles.locate(codes, exit_time - 1)
+
+    if len(candles.keys):
+        move = (candles.close[exit_index] - candles.open[entry_index]) * signals.direction
+    else:
+        move = np.zeros(len(signals))
+    outcome = np.where(move > 0, WIN, np.where(move < 0, LOSS, DRAW)).astype(np.int8)
+    outcome[~(entry_valid & exit_valid)] = UNRESOLVED
+    return outcome
+
+
+def _grouped(labels, keys, outcome):
+    """Лічильники по групах через bincount; labels - назви груп, keys - індекс групи сигналу"""
+    size = len(labels)
+    resolved = outcome != UNRESOLVED
+    totals = np.bincount(keys[resolved], minlength=size)
+    wins = np.bincount(keys[outcome == WIN], minlength=size)
+    draws = np.bincount(keys[outcome == DRAW], minlength=size)
+    signals = np.bincount(keys, minlength=size)
+
+    table = {}
+    for index, label in enumerate(labels):
+        if not signals[index]:
+            continue
+        total = int(totals[index])
+        table[label] = {
+            'signals': int(signals[index]),
+            'total': total,
+            'success': int(wins[index]),
+            'draws': int(draws[index]),
+            'win_rate': round(float(wins[index]) / total * 100, 2) if total else 0
+        }
+    return table
+
+
+def confidence_labels():
+    return [f"{low * 100:.0f}-{high * 100:.0f}%" for low, high in zip(CONFIDENCE_EDGES, CONFIDENCE_EDGES[1:])]
+
+
+def report(signals, outcome):
+    """Win rate загалом, по активу, по годині генерації (Київ) та по кошику впевненості"""
+    resolved = outcome != UNRESOLVED
+    total = int(resolved.sum())
+    wins = int((outcome == WIN).sum())
+
+    asset_labels, asset_keys = np.unique(signals.assets.astype(str), return_inverse=True)
+    confidence_keys = np.clip(np.digitize(signals.confidence, CONFIDENCE_EDGES[1:-1]), 0, len(CONFIDENCE_EDGES) - 2)
+
+    return {
+        'signals': len(signals),
+        'total': total,
+        'unresolved': len(signals) - total,
+        'success': wins,
+        'draws': int((outcome == DRAW).sum()),
+        'win_rate': round(wins / total * 100, 2) if total else 0,
+        'by_asset': _grouped(list(asset_labels), asset_keys, outcome),
+        'by_hour': _grouped([f"{hour:02d}" for hour in range(24)], signals.hour.astype(np.int64), outcome),
+        'by_confidence': _grouped(confidence_labels(), confidence_keys, outcome),
+    }
+
+
+# --- Кандидатні стратегії: (матриця OHLC активів) -> (напрямок -1/0/1, впевненість) на кожну свічку ---
+
+def ema_cross(matrix):
+    """Перетин EMA fast/slow; впевненість зростає з розходженням середніх"""
+    close = matrix['close']
+    fast, slow = ema(close, EMA_FAST), ema(close, EMA_SLOW)
+    above = fast > slow
+    direction = np.zeros(close.shape, dtype=np.int8)
+    direction[:, 1:][above[:, 1:] & ~above[:, :-1]] = 1
+    direction[:, 1:][~above[:, 1:] & above[:, :-1] & ~np.isnan(slow[:, :-1])] = -1
+    with np.errstate(invalid='ignore'):
+        confidence = np.clip(0.7 + np.abs(fast - slow) / close * 100, 0, 1)
+    return direction, np.nan_to_num(confidence)
+
+
+def rsi_reversal(matrix):
+    """Розворот від зон перекупленості/перепроданості RSI"""
+    values = rsi(matrix['close'], RSI_PERIOD)
+    with np.errstate(invalid='ignore'):
+        direction = np.where(values < Config.PRESCREEN_RSI_LOW, 1,
+                             np.where(values > Config.PRESCREEN_RSI_HIGH, -1, 0)).astype(np.int8)
+        confidence = np.clip(0.6 + np.abs(values - 50) / 100, 0, 1)
+    return direction, np.nan_to_num(confidence)
+
+
+STRATEGIES = {
+    'ema_cross': ema_cross,
+    'rsi_reversal': rsi_reversal,
+}
+
+
+def register_strategy(name, strategy):
+    """Додавання власної стратегії для бектесту"""
+    STRATEGIES[name] = strategy
+
+
+def strategy_signals(frames, strategy, duration=2, entry_delay=2):
+    """
+    Сигнали стратегії на всіх свічках архіву. Сигнал генерується на закритті свічки,
+    вхід - через entry_delay хвилин, як у генераторі. Активи однакової довжини рахуються однією матрицею.
+    """
+    strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    groups = {}
+    for asset, frame in frames.items():
+        groups.setdefault(len(frame), []).append(asset)
+
+    assets, entries, directions, confidences = [], [], [], []
+    for length, names in groups.items():
+        if length < 2:
+            continue
+        batch = [frames[name] for name in names]
+        direction, confidence = strategy(candles_to_matrix(batch, length))
+        rows, columns = np.nonzero(direction)
+        for row, frame in enumerate(batch):
+            mask = rows == row
+            if not mask.any():
+                continue
+            timeframe = int(frame.timeframe or Config.TIMEFRAMES)
+            generated = np.asarray(frame.timestamps, dtype=np.int64)[columns[mask]] + timeframe
+            assets.append(np.full(mask.sum(), frame.asset or names[row], dtype=object))
+            entries.append(generated + entry_delay * 60)
+        directions.append(direction[rows, columns])
+        confidences.append(confidence[rows, columns])
+
+    if not entries:
+        return SignalBatch([], [], [], [], [], [])
+    entry = np.concatenate(entries)
+    generated = entry - entry_delay * 60
+    hour = ((generated + _kyiv_offsets(generated)) % DAY) // 3600
+    return SignalBatch(np.concatenate(assets), entry, np.full(len(entry), float(duration)),
+                       np.concatenate(directions), np.concatenate(confidences), hour)
+
+
+# --- Джерела даних ---
+
+def load_history(path=None):
+    """Сигнали з архіву сегментів (повна історія) або з history.json"""
+    if path is None and Config.HISTORY_STORE_ENABLED \
+            and os.path.exists(os.path.join(str(Config.HISTORY_DIR), 'index.json')):
+        from history_store import HistoryStore
+        return HistoryStore(Config.HISTORY_DIR, Config.HISTORY_COMPRESSION).query()
+
+    path = path or Config.HISTORY_FILE
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('signals', []) if isinstance(data, dict) else data
+
+
+def load_archive(path):
+    """Архів свічок {актив: {таймфрейм: [[time, open, close, high, low], ...]}} (формат fake_pocket_server)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        archive = json.load(f)
+
+    frames = {}
+    for asset, series in archive.items():
+        timeframe, rows = min(series.items(), key=lambda item: int(item[0]))
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 5)
+        frames[asset.replace('/', '')] = CandleFrame(rows[:, 0].astype(np.int64), rows[:, 1], rows[:, 3],
+                                                     rows[:, 4], rows[:, 2], asset=asset.replace('/', ''),
+                                                     timeframe=int(timeframe))
+    return frames
+
+
+def synthetic_archive(signals, seed=None, timeframe=None):
+    """Синтетичні свічки (SyntheticMarket), що покривають період сигналів - для офлайн-перевірок"""
+    from synthetic_market import SyntheticMarket
+
+    timeframe = int(timeframe or Config.TIMEFRAMES)
+    assets = sorted(set(signals.assets.astype(str)))
+    if not assets:
+        return {}
+    exit_time = signals.entry + np.round(signals.duration * 60).astype(np.int64)
+    start, end = int(signals.entry.min()) - timeframe, int(exit_time.max()) + timeframe
+    count = (end - start) // timeframe + 1
+    return SyntheticMarket(seed).generate_frames(assets, timeframe, count, end)
+
+
+def run(signals, frames):
+    started = time.perf_counter()
+    outcome = evaluate(signals, CandleIndex(frames))
+    result = report(signals, outcome)
+    result['generated_at'] = Config.get_kyiv_time().isoformat()
+    result['elapsed'] = round(time.perf_counter() - started, 4)
+    return outcome, result
+
+
+def print_report(result, top=10):
+    print(f"📊 Бектест: {result['signals']} сигналів, перевірено {result['total']}, "
+          f"без свічок {result['unresolved']}, за {result['elapsed']:.3f} сек")
+    print(f"🎯 Win rate: {result['win_rate']:.2f}% ({result['success']}/{result['total']}, нічиїх {result['draws']})")
+    # Активи - лише top з найбільшою кількістю перевірених сигналів
+    by_asset = sorted(result['by_asset'].items(), key=lambda item: -item[1]['total'])[:top]
+    for title, rows in (("Активи", by_asset), ("Години (Київ)", result['by_hour'].items()),
+                        ("Впевненість", result['by_confidence'].items())):
+        print(f"\n{title}:")
+        for label, stats in rows:
+            print(f"   {label:<14} {stats['win_rate']:6.2f}%  ({stats['success']}/{stats['total']})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Векторизований бектест сигналів на архіві свічок")
+    parser.add_argument('--signals', help="JSON з сигналами (за замовчуванням - архів історії або history.json)")
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), help="Кандидатна стратегія замість історії")
+    parser.add_argument('--archive', help="Архів свічок (формат fake_pocket_server --archive)")
+    parser.add_argument('--synthetic', action='store_true', help="Синтетичні свічки замість архіву")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--duration', type=float, default=2, help="Тривалість угод стратегії, хвилин")
+    parser.add_argument('--top', type=int, default=10, help="Скільки активів показати")
+    parser.add_argument('--output', help="Запис звіту в JSON")
+    args = parser.parse_args(argv)
+
+    if args.strategy:
+        if not args.archive:
+            parser.error("--strategy потребує --archive")
+        frames = load_archive(args.archive)
+        signals = strategy_signals(frames, args.strategy, duration=args.duration)
+    else:
+        signals = SignalBatch.from_entries(load_history(args.signals))
+        if args.archive:
+            frames = load_archive(args.archive)
+        elif args.synthetic:
+            frames = synthetic_archive(signals, args.seed)
+        else:
+            parser.error("потрібен --archive або --synthetic")
+
+    _, result = run(signals, frames)
+    print_report(result, args.top)
+
+    if args.output:
+        from data_handler import write_json_atomic
+        write_json_atomic(args.output, result)
+        print(f"\n💾 Звіт: {args.output}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+import argparse
+import asyncio
+import contextlib
+import inspect
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from config import Config, BASE_DIR
+from data_handler import DataHandler, write_json_atomic
+from synthetic_market import SyntheticMarket
+
+logger = logging.getLogger("signal_bot")
+
+# Набір бенчмарків гарячого шляху: мікро (окремі функції) та макро (повний цикл генерації
+# проти локальних фейкових серверів PocketOption і Groq). Результати - JSON з порівнянням з базовою лінією.
+
+BENCHMARK_DIR = BASE_DIR / 'benchmarks'
+DEFAULT_OUTPUT = BENCHMARK_DIR / 'results.json'
+DEFAULT_BASELINE = BENCHMARK_DIR / 'baseline.json'
+
+HISTORY_SIZES = (10, 1000, 100000)
+MACRO_ASSET_COUNTS = (3, 30, 300)
+CANDLE_COUNT = 50
+BACKTEST_SIGNALS = 100000
+BACKTEST_CANDLES = 7 * 24 * 60  # Тиждень хвилинних свічок на актив
+BENCHMARK_SSID = '42["auth",{"session":"benchmark0session0for0fake0server","isDemo":1,"uid":1,"platform":1}]'
+
+# Шляхи даних, що перенаправляються у тимчасову директорію на час бенчмарку
+DATA_PATHS = {
+    'SIGNALS_FILE': 'signals.json', 'HISTORY_FILE': 'history.json', 'HISTORY_DIR': 'history',
+    'FEEDBACK_FILE': 'feedback.json', 'ASSETS_CONFIG_FILE': 'assets_config.json',
+    'LESSONS_FILE': 'lessons.json', 'INDICATOR_STATE_FILE': 'indicator_state.json',
+    'PRESCREEN_FILE': 'prescreen.json', 'ANALYSIS_CACHE_FILE': 'analysis_cache.json',
+    'SQLITE_DB_FILE': 'signals.db', 'METRICS_FILE': 'metrics.json', 'METRICS_PROM_FILE': 'metrics.prom',
+}
+
+# Реальні активи бібліотеки; решта для великих наборів генерується як SYNnnn_otc
+KNOWN_ASSETS = [
+    'EURUSD_otc', 'GBPUSD_otc', 'USDJPY_otc', 'USDCHF_otc', 'USDCAD_otc', 'AUDUSD_otc', 'AUDNZD_otc',
+    'AUDCAD_otc', 'AUDCHF_otc', 'AUDJPY_otc', 'CADCHF_otc', 'CADJPY_otc', 'CHFJPY_otc', 'EURCHF_otc',
+    'EURGBP_otc', 'EURJPY_otc', 'EURNZD_otc', 'GBPAUD_otc', 'GBPJPY_otc', 'NZDJPY_otc', 'NZDUSD_otc',
+]
+
+
+@contextlib.contextmanager
+def override_config(**values):
+    """Тимчасова заміна атрибутів Config з відновленням після виходу"""
+    previous = {name: getattr(Config, name) for name in values}
+    for name, value in values.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(Config, name, value)
+
+
+@contextlib.contextmanager
+def isolated_data_dir():
+    """Тимчасова директорія даних, щоб бенчмарк не торкався data/ сайту"""
+    directory = Path(tempfile.mkdtemp(prefix="signal_bench_"))
+    paths = {name: directory / filename for name, filename in DATA_PATHS.items()}
+    try:
+        with override_config(DATA_DIR=directory, **paths):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """Приглушення print та логів бота під час вимірювань"""
+    if not enabled:
+        yield
+        return
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            yield
+        finally:
+            logger.setLevel(level)
+
+
+def summarize(samples, operations=1):
+    """Статистика вибірки (секунд на операцію)"""
+    per_op = sorted(sample / operations for sample in samples)
+    p95_index = min(len(per_op) - 1, int(round(0.95 * (len(per_op) - 1))))
+    median = statistics.median(per_op)
+    return {
+        'runs': len(per_op),
+        'operations': operations,
+        'min': per_op[0],
+        'max': per_op[-1],
+        'mean': statistics.fmean(per_op),
+        'median': median,
+        'stdev': statistics.stdev(per_op) if len(per_op) > 1 else 0.0,
+        'p95': per_op[p95_index],
+        'ops_per_sec': 1.0 / median if median > 0 else None,
+    }
+
+
+def measure(function, number=1, repeat=5, setup=None, batch=1):
+    """
+    Час виконання: repeat вимірювань по number викликів; setup не входить у вимір.
+    batch - кількість операцій в одному виклику (статистика рахується на операцію).
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples, number * batch)
+
+
+def benchmark_assets(count):
+    """Перелік із count активів: спочатку реальні, далі синтетичні"""
+    assets = KNOWN_ASSETS[:count]
+    assets += [f"SYN{index:03d}_otc" for index in range(count - len(assets))]
+    return assets
+
+
+def history_entries(count, now=None):
+    """Синтетичні записи history.json у форматі _add_to_history"""
+    now = now or Config.get_kyiv_time()
+    entries = []
+    for index in range(count):
+        moment = now - timedelta(minutes=10 * (count - index))
+        asset = KNOWN_ASSETS[index % len(KNOWN_ASSETS)]
+        stamp = moment.strftime('%Y%m%d%H%M%S')
+        entries.append({
+            'asset': asset, 'direction': 'UP' if index % 2 else 'DOWN', 'confidence': 0.8,
+            'entry_time': (moment + timedelta(minutes=2)).strftime('%H:%M'), 'duration': 3,
+            'reason': 'Бенчмарк', 'volatility': 0.1, 'generated_at': moment.isoformat(),
+            'generated_epoch': moment.timestamp(), 'id': f"{asset}_{stamp}",
+            'expires_at': (moment + timedelta(minutes=10)).isoformat(),
+            'saved_at': moment.isoformat(), 'history_id': f"{asset}_{stamp}", 'status': 'saved'
+        })
+    return entries
+
+
+# --- Мікро-бенчмарки ---
+
+def micro_benchmarks(repeat=5, seed=42):
+    results = {}
+    market = SyntheticMarket(seed)
+
+    with isolated_data_dir(), quiet():
+        handler = DataHandler()
+
+        stamps = [(Config.get_kyiv_time() - timedelta(seconds=i)).isoformat() for i in range(1000)]
+        stamps += [stamp + 'Z' for stamp in ("2024-01-01T10:00:00", "2024-06-01T12:30:00")]
+        results['parse_datetime'] = measure(
+            lambda: [handler._parse_datetime(stamp) for stamp in stamps], repeat=repeat, batch=len(stamps)
+        )
+
+        for size in HISTORY_SIZES:
+            entries = history_entries(size)
+
+            def setup(entries=entries):
+                write_json_atomic(Config.HISTORY_FILE, entries)
+
+            def save(handler=handler):
+                now = Config.get_kyiv_time()
+                handler.save_signals([{
+                    'asset': 'EURUSD_otc', 'direction': 'UP', 'confidence': 0.85, 'duration': 3,
+                    'generated_at': now.isoformat(), 'generated_epoch': now.timestamp()
+                }])
+
+            results[f'save_signals[history={size}]'] = measure(save, repeat=repeat, setup=setup)
+
+    from groq_analyzer import GroqAnalyzer
+    from indicators import compute_indicators
+
+    with override_config(ANALYSIS_CACHE_ENABLED=False, GROQ_API_KEY=Config.GROQ_API_KEY or 'benchmark'), quiet():
+        analyzer = GroqAnalyzer()
+    frames = market.generate_frames(KNOWN_ASSETS[:5], Config.TIMEFRAMES, CANDLE_COUNT)
+    frame = frames[KNOWN_ASSETS[0]]
+    rows = list(frame)
+    indicators = compute_indicators([frame])[0]
+    items = [(asset, candles, compute_indicators([candles])[0]) for asset, candles in frames.items()]
+
+    results['calculate_volatility[frame]'] = measure(lambda: analyzer.calculate_volatility(frame),
+                                                     number=1000, repeat=repeat)
+    results['calculate_volatility[objects]'] = measure(lambda: analyzer.calculate_volatility(rows),
+                                                       number=1000, repeat=repeat)
+    results['build_prompt'] = measure(
+        lambda: analyzer._build_prompt(KNOWN_ASSETS[0], frame, Config.LANGUAGE, indicators),
+        number=1000, repeat=repeat
+    )
+    results['build_batch_prompt[5]'] = measure(lambda: analyzer._build_batch_prompt(items, Config.LANGUAGE),
+                                               number=200, repeat=repeat)
+
+    import backtest
+
+    assets = benchmark_assets(20)
+    end = int(time.time())
+    archive = market.generate_frames(assets, 60, BACKTEST_CANDLES, end)
+    start = end - BACKTEST_CANDLES * 60
+    step = (BACKTEST_CANDLES * 60 - 600) // BACKTEST_SIGNALS
+    entries = [{
+        'asset': assets[index % len(assets)], 'direction': 'UP' if index % 3 else 'DOWN',
+        'confidence': 0.5 + (index % 50) / 100, 'generated_epoch': start + index * step,
+        'entry_delay': 2, 'duration': 3
+    } for index in range(BACKTEST_SIGNALS)]
+    signals = backtest.SignalBatch.from_entries(entries)
+    results[f'backtest_load[signals={BACKTEST_SIGNALS}]'] = measure(
+        lambda: backtest.SignalBatch.from_entries(entries), repeat=repeat
+    )
+    results[f'backtest[signals={BACKTEST_SIGNALS}]'] = measure(lambda: backtest.run(signals, archive), repeat=repeat)
+    return results
+
+
+# --- Макро-бенчмарки ---
+
+class StageTimer:
+    """Час по етапах циклу: сума тривалостей викликів та стіна від першого старту до останнього кінця"""
+
+    def __init__(self):
+        self.stages = {}
+        self._restore = []
+
+    def _record(self, stage, started, finished):
+        info = self.stages.setdefault(stage, {'calls': 0, 'total_sec': 0.0, 'first': started, 'last': finished})
+        info['calls'] += 1
+        info['total_sec'] += finished - started
+        info['first'] = min(info['first'], started)
+        info['last'] = max(info['last'], finished)
+
+    def wrap(self, owner, name, stage):
+        original = getattr(owner, name)
+        if inspect.iscoroutinefunction(original):
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    self._record(stage, started, time.perf_counter())
+        else:
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self._record(stage, started, time.perf_counter())
+        had_own = inspect.ismodule(owner) or name in vars(owner)
+        self._restore.append((owner, name, original if had_own else None))
+        setattr(owner, name, timed)
+
+    def restore(self):
+        for owner, name, original in reversed(self._restore):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+        self._restore = []
+
+    def summary(self):
+        return {stage: {'calls': info['calls'], 'total_sec': info['total_sec'],
+                        'wall_sec': info['last'] - info['first']}
+                for stage, info in self.stages.items()}
+
+
+def _register_assets(assets):
+    """Синтетичні активи мають пройти перевірку бібліотеки PocketOption"""
+    try:
+        from pocketoptionapi_async.constants import ASSETS
+    except ImportError:
+        return
+    next_id = max(ASSETS.values(), default=0) + 1
+    for asset in assets:
+        if asset not in ASSETS:
+            ASSETS[asset] = next_id
+            next_id += 1
+
+
+async def _run_cycle(assets):
+    """Один холодний цикл generate_all_signals з розбивкою по етапах"""
+    import signal_generator
+
+    generator = signal_generator.SignalGenerator()
+    timer = StageTimer()
+    timer.wrap(generator.pocket_client, 'connect', 'connect')
+    timer.wrap(generator, 'fetch_candles', 'candle_fetch')
+    timer.wrap(signal_generator, 'compute_indicators', 'indicators')
+    timer.wrap(generator.analyzer, 'analyze_market_async', 'llm_analysis')
+    timer.wrap(generator.analyzer, 'analyze_batch_async', 'llm_analysis')
+    for name in ('begin_cycle', 'save_signals', 'auto_cleanup_old_signals', 'commit_cycle', 'learn_from_feedback'):
+        timer.wrap(generator.data_handler, name, 'persistence')
+
+    started = time.perf_counter()
+    try:
+        signals = await generator.generate_all_signals()
+    finally:
+        elapsed = time.perf_counter() - started
+        timer.restore()
+        await generator.analyzer.aclose()
+        await generator.close_workers()
+    return elapsed, len(signals), timer.summary()
+
+
+async def macro_benchmarks(asset_counts=MACRO_ASSET_COUNTS, repeat=3, seed=42, llm_latency=0.0,
+                           pocket_latency=0.0, execution_mode='concurrent'):
+    from fake_groq_server import FakeGroqServer
+    from fake_pocket_server import FakePocketServer
+
+    results = {}
+    cassette = tempfile.NamedTemporaryFile(prefix="groq_bench_", suffix=".jsonl", delete=False).name
+    try:
+        async with FakePocketServer(market=SyntheticMarket(seed), latency=pocket_latency, seed=seed,
+                                    history_size=CANDLE_COUNT) as pocket, \
+                FakeGroqServer(cassette, latency=llm_latency, seed=seed) as groq:
+            for count in asset_counts:
+                assets = benchmark_assets(count)
+                _register_assets(assets)
+                name = f'generation_cycle[assets={count}]'
+                samples, stages, signal_counts = [], [], []
+
+                with isolated_data_dir(), quiet(), override_config(
+                    POCKET_WS_URL=pocket.url, POCKET_SSID=BENCHMARK_SSID,
+                    GROQ_BASE_URL=groq.url, GROQ_API_KEY=Config.GROQ_API_KEY or 'benchmark',
+                    ASSETS=assets, MAX_ASSETS_PER_GENERATION=0, EXECUTION_MODE=execution_mode,
+                    ANALYSIS_CACHE_ENABLED=False, RATE_LIMITER_ENABLED=False
+                ):
+                    for _ in range(repeat):
+                        elapsed, signal_count, stage_summary = await _run_cycle(assets)
+                        samples.append(elapsed)
+                        stages.append(stage_summary)
+                        signal_counts.append(signal_count)
+
+                result = summarize(samples)
+                result['signals'] = signal_counts
+                result['stages'] = {
+                    stage: {key: statistics.median(run[stage][key] for run in stages if stage in run)
+                            for key in ('calls', 'total_sec', 'wall_sec')}
+                    for stage in sorted({stage for run in stages for stage in run})
+                }
+                if not any(signal_counts) and 'candle_fetch' not in result['stages']:
+                    result['error'] = "цикл не дійшов до отримання свічок (підключення до фейкового сервера?)"
+                results[name] = result
+                print(f"   {name}: {result['median']:.3f} сек, сигналів {signal_counts}")
+    finally:
+        os.unlink(cassette)
+    return results
+
+
+# --- Звіт та порівняння ---
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def build_report(results, args):
+    return {
+        'meta': {
+            'timestamp': Config.get_kyiv_time().isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'suite': args.suite,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'storage_backend': Config.STORAGE_BACKEND,
+            'llm_latency': args.llm_latency,
+            'pocket_latency': args.pocket_latency,
+        },
+        'results': results
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """Порівняння медіан з базовою лінією; повільніше більш ніж на threshold - регресія"""
+    comparison = {}
+    for name, current in results.items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or not reference.get('median') or not current.get('median'):
+            continue
+        ratio = current['median'] / reference['median']
+        if ratio > 1 + threshold:
+            status = 'regression'
+        elif ratio < 1 - threshold:
+            status = 'improvement'
+        else:
+            status = 'ok'
+        comparison[name] = {'baseline': reference['median'], 'current': current['median'],
+                            'change_pct': round((ratio - 1) * 100, 1), 'status': status}
+    return comparison
+
+
+def print_report(results, comparison):
+    icons = {'regression': '🔴', 'improvement': '🟢', 'ok': '⚪'}
+    print("\n📊 Результати (медіана на операцію):")
+    for name, result in results.items():
+        line = f"   {name:<36} {result['median'] * 1000:>12.4f} мс"
+        if name in comparison:
+            item = comparison[name]
+            line += f"   {icons[item['status']]} {item['change_pct']:+.1f}% до базової"
+        if result.get('error'):
+            line += f"   ⚠️ {result['error']}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки генерації сигналів (офлайн, з фейковими серверами)")
+    parser.add_argument('--suite', choices=['micro', 'macro', 'all'], default='all')
+    parser.add_argument('--assets', default=",".join(str(n) for n in MACRO_ASSET_COUNTS),
+                        help="Кількості активів для макро-бенчмарку, через кому")
+    parser.add_argument('--repeat', type=int, default=5, help="Повторів кожного вимірювання")
+    parser.add_argument('--macro-repeat', type=int, default=3, help="Повторів повного циклу")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Затримка фейкового Groq, сек")
+    parser.add_argument('--pocket-latency', type=float, default=0.0, help="Затримка фейкового PocketOption, сек")
+    parser.add_argument('--execution-mode', choices=['sequential', 'concurrent', 'process'], default='concurrent')
+    parser.add_argument('--output', default=str(DEFAULT_OUTPUT))
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+    parser.add_argument('--save-baseline', action='store_true', help="Записати результати як нову базову лінію")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Допустиме сповільнення (0.2 = 20%%)")
+    parser.add_argument('--fail-on-regression', action='store_true', help="Код виходу 1 при регресіях")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    results = {}
+    if args.suite in ('micro', 'all'):
+        print("⏱️ Мікро-бенчмарки...")
+        results.update(micro_benchmarks(repeat=args.repeat, seed=args.seed))
+    if args.suite in ('macro', 'all'):
+        print("⏱️ Макро-бенчмарки (повний цикл)...")
+        asset_counts = [int(value) for value in args.assets.split(',') if value.strip()]
+        results.update(asyncio.run(macro_benchmarks(
+            asset_counts, repeat=args.macro_repeat, seed=args.seed, llm_latency=args.llm_latency,
+            pocket_latency=args.pocket_latency, execution_mode=args.execution_mode
+        )))
+
+    report = build_report(results, args)
+    comparison = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            comparison = compare(results, json.load(f), args.threshold)
+        report['comparison'] = comparison
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    write_json_atomic(args.output, report)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        write_json_atomic(args.baseline, report)
+        print(f"📌 Базову лінію записано: {args.baseline}")
+
+    print_report(results, comparison)
+    print(f"\n💾 Звіт: {args.output}")
+
+    regressions = [name for name, item in comparison.items() if item['status'] == 'regression']
+    if regressions:
+        print(f"🔴 Регресії: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
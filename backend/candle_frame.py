@@ -0,0 +1,128 @@
+from datetime import datetime
+
+import numpy as np
+
+
+def _to_epoch(timestamp):
+    """Часова мітка свічки (datetime або число) -> секунди epoch"""
+    if isinstance(timestamp, datetime):
+        return int(timestamp.timestamp())
+    return int(timestamp)
+
+
+class CandleRow:
+    """Представлення одного рядка CandleFrame з інтерфейсом об'єкта свічки"""
+    __slots__ = ('_frame', '_index')
+
+    def __init__(self, frame, index):
+        self._frame = frame
+        self._index = index
+
+    @property
+    def epoch(self):
+        return int(self._frame.timestamps[self._index])
+
+    @property
+    def timestamp(self):
+        return datetime.fromtimestamp(self.epoch)
+
+    @property
+    def open(self):
+        return float(self._frame.open[self._index])
+
+    @property
+    def high(self):
+        return float(self._frame.high[self._index])
+
+    @property
+    def low(self):
+        return float(self._frame.low[self._index])
+
+    @property
+    def close(self):
+        return float(self._frame.close[self._index])
+
+    @property
+    def volume(self):
+        return 0.0
+
+    @property
+    def asset(self):
+        return self._frame.asset
+
+    @property
+    def timeframe(self):
+        return self._frame.timeframe
+
+    def __repr__(self):
+        return (f"CandleRow({self.timestamp}, O={self.open}, H={self.high}, "
+                f"L={self.low}, C={self.close})")
+
+
+class CandleFrame:
+    """
+    Колонкове представлення серії свічок: int64 epoch та float64 OHLC у суцільних масивах
+    (40 байт на свічку). Індексація повертає CandleRow, зрізи - CandleFrame без копіювання.
+    """
+    __slots__ = ('timestamps', 'open', 'high', 'low', 'close', 'asset', 'timeframe')
+
+    def __init__(self, timestamps, open, high, low, close, asset=None, timeframe=None):
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.asset = asset
+        self.timeframe = timeframe
+
+    @classmethod
+    def from_candles(cls, candles, asset=None, timeframe=None):
+        """Одноразове перетворення об'єктів свічок (API, сховище, namedtuple) у масиви"""
+        if isinstance(candles, CandleFrame):
+            return candles
+
+        count = len(candles)
+        timestamps = np.empty(count, dtype=np.int64)
+        ohlc = np.empty((4, count), dtype=np.float64)
+        for i, candle in enumerate(candles):
+            timestamps[i] = _to_epoch(candle.timestamp)
+            ohlc[0, i] = candle.open
+            ohlc[1, i] = candle.high
+            ohlc[2, i] = candle.low
+            ohlc[3, i] = candle.close
+
+        if count:
+            first = candles[0]
+            asset = getattr(first, 'asset', None) or asset
+            timeframe = getattr(first, 'timeframe', None) or timeframe
+        return cls(timestamps, ohlc[0], ohlc[1], ohlc[2], ohlc[3], asset=asset, timeframe=timeframe)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __bool__(self):
+        return len(self.timestamps) > 0
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CandleFrame(self.timestamps[index], self.open[index], self.high[index],
+                               self.low[index], self.close[index], self.asset, self.timeframe)
+
+        length = len(self.timestamps)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("CandleFrame index out of range")
+        return CandleRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.timestamps)):
+            yield CandleRow(self, index)
+
+    @property
+    def nbytes(self):
+        return (self.timestamps.nbytes + self.open.nbytes + self.high.nbytes
+                + self.low.nbytes + self.close.nbytes)
+
+    def __repr__(self):
+        return f"CandleFrame({self.asset}, {len(self)} свічок)"
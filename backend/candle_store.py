@@ -0,0 +1,254 @@
+import logging
+import time
+from datetime import datetime
+
+logger = logging.getLogger("signal_bot")
+
+
+class StoredCandle:
+    """Свічка у сховищі (сумісна за полями з Candle з pocketoptionapi_async)"""
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'asset', 'timeframe')
+
+    def __init__(self, timestamp, open, high, low, close, volume=0.0, asset=None, timeframe=None):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.asset = asset
+        self.timeframe = timeframe
+
+    @classmethod
+    def from_candle(cls, candle, asset=None, timeframe=None):
+        return cls(
+            timestamp=candle.timestamp,
+            open=float(candle.open),
+            high=float(candle.high),
+            low=float(candle.low),
+            close=float(candle.close),
+            volume=float(getattr(candle, 'volume', 0.0) or 0.0),
+            asset=getattr(candle, 'asset', None) or asset,
+            timeframe=getattr(candle, 'timeframe', None) or timeframe
+        )
+
+    def __repr__(self):
+        return (f"StoredCandle({self.timestamp}, O={self.open}, H={self.high}, "
+                f"L={self.low}, C={self.close})")
+
+
+class CandleView:
+    """Представлення останніх свічок кільцевого буфера без копіювання"""
+    __slots__ = ('_ring', '_start', '_length')
+
+    def __init__(self, ring, start, length):
+        self._ring = ring
+        self._start = start  # абсолютний індекс першої свічки
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step == 1:
+                return CandleView(self._ring, self._start + start, max(0, stop - start))
+            return [self[i] for i in range(start, stop, step)]
+
+        if index < 0:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("CandleView index out of range")
+        return self._ring._slots[(self._start + index) % self._ring.capacity]
+
+    def __iter__(self):
+        slots = self._ring._slots
+        capacity = self._ring.capacity
+        for i in range(self._start, self._start + self._length):
+            yield slots[i % capacity]
+
+    def __bool__(self):
+        return self._length > 0
+
+
+class CandleRing:
+    """Кільцевий буфер фіксованої ємності для одного активу і таймфрейму"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._total = 0  # кількість свічок, доданих за весь час
+        self.last_epoch = None
+        self.updated_at = 0.0  # monotonic час останнього оновлення
+
+    def __len__(self):
+        return min(self._total, self.capacity)
+
+    def _epoch(self, candle):
+        return int(candle.timestamp.timestamp())
+
+    def push(self, candle):
+        """Додає нову свічку або оновлює останню (та сама часова мітка)"""
+        epoch = self._epoch(candle)
+        self.updated_at = time.monotonic()
+
+        if self.last_epoch is not None:
+            if epoch == self.last_epoch:
+                self._slots[(self._total - 1) % self.capacity] = candle
+                return False
+            if epoch < self.last_epoch:
+                # Запізніла свічка - оновлюємо на місці, якщо вона ще в буфері
+                for i in range(self._total - 1, max(-1, self._total - len(self) - 1), -1):
+                    slot = self._slots[i % self.capacity]
+                    if self._epoch(slot) == epoch:
+                        self._slots[i % self.capacity] = candle
+                        break
+                return False
+
+        self._slots[self._total % self.capacity] = candle
+        self._total += 1
+        self.last_epoch = epoch
+        return True
+
+    def last(self):
+        if not self._total:
+            return None
+        return self._slots[(self._total - 1) % self.capacity]
+
+    def tail(self, count=None):
+        length = len(self)
+        if count is not None:
+            length = min(length, count)
+        return CandleView(self, self._total - length, length)
+
+
+class CandleStore:
+    """
+    Сховище свічок у пам'яті: кільцевий буфер на кожну пару (актив, таймфрейм).
+    Оновлюється з потоку вебсокета, мережею дозавантажуються лише відсутні свічки.
+    """
+
+    def __init__(self, capacity=500):
+        self.capacity = capacity
+        self._rings = {}
+        self._needs_repair = set()
+
+    def _key(self, asset, timeframe):
+        return (asset.replace('/', ''), int(timeframe))
+
+    def _ring(self, asset, timeframe):
+        key = self._key(asset, timeframe)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = CandleRing(self.capacity)
+            self._rings[key] = ring
+        return ring
+
+    def has(self, asset, timeframe):
+        return self._key(asset, timeframe) in self._rings
+
+    def size(self, asset, timeframe):
+        ring = self._rings.get(self._key(asset, timeframe))
+        return len(ring) if ring else 0
+
+    def get_view(self, asset, timeframe, count=None):
+        """Останні count свічок як представлення без копіювання"""
+        ring = self._rings.get(self._key(asset, timeframe))
+        if ring is None:
+            return CandleView(CandleRing(1), 0, 0)
+        return ring.tail(count)
+
+    def merge(self, asset, timeframe, candles):
+        """Злиття завантажених свічок (backfill або дозавантаження пропуску)"""
+        ring = self._ring(asset, timeframe)
+        added = 0
+        for candle in sorted(candles, key=lambda c: c.timestamp):
+            if ring.push(StoredCandle.from_candle(candle, asset, timeframe)):
+                added += 1
+        self._needs_repair.discard(self._key(asset, timeframe))
+        return added
+
+    def missing_candles(self, asset, timeframe, now=None):
+        """Скільки свічок бракує до поточного моменту (None - потрібен повний backfill)"""
+        key = self._key(asset, timeframe)
+        ring = self._rings.get(key)
+        if ring is None or ring.last_epoch is None:
+            return None
+
+        now_epoch = int((now or datetime.now()).timestamp())
+        current_bucket = now_epoch - now_epoch % key[1]
+        return max(0, (current_bucket - ring.last_epoch) // key[1])
+
+    def is_live(self, asset, timeframe):
+        """Чи оновлювалась серія потоком протягом останнього таймфрейму"""
+        key = self._key(asset, timeframe)
+        ring = self._rings.get(key)
+        if ring is None or key in self._needs_repair:
+            return False
+        return time.monotonic() - ring.updated_at < key[1]
+
+    def mark_all_for_repair(self):
+        """Після перепідключення всі серії потребують перевірки пропусків"""
+        self._needs_repair.update(self._rings.keys())
+
+    def on_tick(self, asset, epoch, price):
+        """Оновлення поточної свічки всіх таймфреймів активу з тіку"""
+        asset = asset.replace('/', '')
+        price = float(price)
+        for (ring_asset, timeframe), ring in self._rings.items():
+            if ring_asset != asset:
+                continue
+
+            bucket = int(epoch) - int(epoch) % timeframe
+            last = ring.last()
+            if last is not None and ring.last_epoch == bucket:
+                last.high = max(last.high, price)
+                last.low = min(last.low, price)
+                last.close = price
+                ring.updated_at = time.monotonic()
+            elif ring.last_epoch is None or bucket > ring.last_epoch:
+                ring.push(StoredCandle(
+                    timestamp=datetime.fromtimestamp(bucket),
+                    open=price, high=price, low=price, close=price,
+                    asset=asset, timeframe=timeframe
+                ))
+
+    def on_stream_update(self, data):
+        """Обробник події stream_update від pocketoptionapi_async"""
+        try:
+            if isinstance(data, dict):
+                asset = data.get('asset')
+                period = data.get('period')
+                items = data.get('candles') or data.get('data') or []
+                if asset and period and self.has(asset, period):
+                    self.merge(asset, period, self._parse_stream_candles(items, asset, period))
+            elif isinstance(data, list):
+                # Тіки у форматі [[asset, timestamp, price], ...]
+                for tick in data:
+                    if isinstance(tick, (list, tuple)) and len(tick) >= 3:
+                        self.on_tick(tick[0], tick[1], tick[2])
+        except Exception as e:
+            logger.debug(f"⚠️ Помилка обробки потоку свічок: {e}")
+
+    def _parse_stream_candles(self, items, asset, timeframe):
+        candles = []
+        for item in items:
+            if isinstance(item, dict):
+                candles.append(StoredCandle(
+                    timestamp=datetime.fromtimestamp(item.get('time', 0)),
+                    open=float(item.get('open', 0)),
+                    high=float(item.get('high', 0)),
+                    low=float(item.get('low', 0)),
+                    close=float(item.get('close', 0)),
+                    asset=asset, timeframe=timeframe
+                ))
+            elif isinstance(item, (list, tuple)) and len(item) >= 5:
+                # Формат сервера: [timestamp, open, close, high, low]
+                candles.append(StoredCandle(
+                    timestamp=datetime.fromtimestamp(item[0]),
+                    open=float(item[1]), close=float(item[2]),
+                    high=float(item[3]), low=float(item[4]),
+                    asset=asset, timeframe=timeframe
+                ))
+        return candles
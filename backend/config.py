@@ -20,10 +20,41 @@ class Config:
     # Pocket Option
     POCKET_SSID = os.getenv('POCKET_SSID')
     POCKET_DEMO = os.getenv('POCKET_DEMO', 'true').lower() == 'true'
+    POCKET_WS_URL = os.getenv('POCKET_WS_URL', '')  # Власний вебсокет (напр. fake_pocket_server.py для бенчмарків)
+    POCKET_POOL_SIZE = int(os.getenv('POCKET_POOL_SIZE', 1))  # Сесій PocketOption; >1 - активи шардуються між ними
+    POCKET_CONNECT_ATTEMPTS = int(os.getenv('POCKET_CONNECT_ATTEMPTS', 3))
+    POCKET_CONNECT_TIMEOUT = float(os.getenv('POCKET_CONNECT_TIMEOUT', 15))  # секунд на одну спробу
+    POCKET_RECONNECT_BASE_DELAY = float(os.getenv('POCKET_RECONNECT_BASE_DELAY', 0.5))
+    POCKET_RECONNECT_MAX_DELAY = float(os.getenv('POCKET_RECONNECT_MAX_DELAY', 5))
+    POCKET_READY_TIMEOUT = float(os.getenv('POCKET_READY_TIMEOUT', 3))  # Очікування балансу після auth
+    POCKET_PING_TIMEOUT = float(os.getenv('POCKET_PING_TIMEOUT', 2))
     
     # Groq AI
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
     GROQ_MODEL = os.getenv('GROQ_MODEL', 'llama-3.3-70b-versatile')
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', '')  # напр. фейковий сервер: http://127.0.0.1:8766
+    GROQ_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', 30))  # секунд на запит
+    GROQ_CONNECT_TIMEOUT = float(os.getenv('GROQ_CONNECT_TIMEOUT', 5))
+    GROQ_MAX_CONNECTIONS = int(os.getenv('GROQ_MAX_CONNECTIONS', 10))  # Розмір keep-alive пулу
+    GROQ_KEEPALIVE_EXPIRY = float(os.getenv('GROQ_KEEPALIVE_EXPIRY', 60))
+    GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', 3))
+    GROQ_RETRY_BASE_DELAY = float(os.getenv('GROQ_RETRY_BASE_DELAY', 0.5))
+    GROQ_RETRY_MAX_DELAY = float(os.getenv('GROQ_RETRY_MAX_DELAY', 8))
+    
+    # Обмеження швидкості Groq (ліміти тарифу)
+    RATE_LIMITER_ENABLED = os.getenv('RATE_LIMITER_ENABLED', 'true').lower() == 'true'
+    GROQ_RPM = int(os.getenv('GROQ_RPM', 30))  # запитів на хвилину
+    GROQ_TPM = int(os.getenv('GROQ_TPM', 8000))  # токенів на хвилину
+    GROQ_MAX_IN_FLIGHT = int(os.getenv('GROQ_MAX_IN_FLIGHT', 8))
+    GROQ_MIN_IN_FLIGHT = int(os.getenv('GROQ_MIN_IN_FLIGHT', 1))
+    
+    # Кеш відповідей AI
+    ANALYSIS_CACHE_ENABLED = os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+    ANALYSIS_CACHE_TTL = int(os.getenv('ANALYSIS_CACHE_TTL', 120))  # секунд
+    ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 256))
+    ANALYSIS_CACHE_PRICE_DECIMALS = int(os.getenv('ANALYSIS_CACHE_PRICE_DECIMALS', 4))
+    # Запис кешу на диск лише за явного ввімкнення: у разовому запуску раз на 10 хв свічки вже нові
+    ANALYSIS_CACHE_PERSIST = os.getenv('ANALYSIS_CACHE_PERSIST', 'false').lower() == 'true'
     
     # Сигнали
     SIGNAL_INTERVAL = int(os.getenv('SIGNAL_INTERVAL', 600))  # 10 хвилин
@@ -39,17 +70,62 @@ class Config:
     
     TIMEFRAMES = int(os.getenv('TIMEFRAMES', 60))  # Змінено з 120 на 60 (1 хвилина)
     
+    # Кешування свічок у пам'яті (кільцевий буфер на актив)
+    CANDLE_STORE_ENABLED = os.getenv('CANDLE_STORE_ENABLED', 'true').lower() == 'true'
+    CANDLE_STORE_CAPACITY = int(os.getenv('CANDLE_STORE_CAPACITY', 500))
+    SYNTHETIC_SEED = int(os.getenv('SYNTHETIC_SEED')) if os.getenv('SYNTHETIC_SEED') else None  # Тестові свічки демо-режиму
+    
+    # Локальний відбір активів перед AI
+    PRESCREEN_ENABLED = os.getenv('PRESCREEN_ENABLED', 'false').lower() == 'true'
+    PRESCREEN_RULES = [rule.strip() for rule in os.getenv('PRESCREEN_RULES', 'volatility,ema_cross,rsi_extremes').split(',') if rule.strip()]
+    PRESCREEN_MIN_VOLATILITY = float(os.getenv('PRESCREEN_MIN_VOLATILITY', 0.03))  # %
+    PRESCREEN_EMA_SPREAD = float(os.getenv('PRESCREEN_EMA_SPREAD', 0.02))  # % від ціни
+    PRESCREEN_RSI_LOW = float(os.getenv('PRESCREEN_RSI_LOW', 30))
+    PRESCREEN_RSI_HIGH = float(os.getenv('PRESCREEN_RSI_HIGH', 70))
+    
+    # Пакетний аналіз: кілька активів в одному запиті до AI
+    BATCH_ANALYSIS_ENABLED = os.getenv('BATCH_ANALYSIS_ENABLED', 'false').lower() == 'true'
+    BATCH_SIZE = int(os.getenv('BATCH_SIZE', 5))
+    
+    # Паралельна обробка активів
+    EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'sequential').lower()  # sequential | concurrent | process
+    PROCESS_WORKERS = int(os.getenv('PROCESS_WORKERS', 0))  # Процесів у режимі process; 0 = кількість ядер
+    MAX_CONCURRENCY = int(os.getenv('MAX_CONCURRENCY', 5))  # Одночасно оброблюваних активів
+    ASSET_TIMEOUT = float(os.getenv('ASSET_TIMEOUT', 60))  # секунд на один актив
+    MAX_ASSETS_PER_GENERATION = int(os.getenv('MAX_ASSETS_PER_GENERATION', 0))  # 0 = всі активи
+    
     # Навчання
     FEEDBACK_ENABLED = os.getenv('FEEDBACK_ENABLED', 'true').lower() == 'true'
+    LEARNING_BATCH_SIZE = int(os.getenv('LEARNING_BATCH_SIZE', 10))  # Невивчених відгуків для навчання поза розкладом
+    
+    # Архів історії (append-only сегменти по днях) - лише за явного ввімкнення:
+    # workflow комітить data/, і архів ріс би в репозиторії щоциклу
+    HISTORY_STORE_ENABLED = os.getenv('HISTORY_STORE_ENABLED', 'false').lower() == 'true'
+    HISTORY_COMPRESSION = os.getenv('HISTORY_COMPRESSION', 'gzip').lower()  # none | gzip | zstd
+    
+    # Метрики циклу (спани етапів, p50/p95) - data/metrics.json та файл Prometheus;
+    # вимкнено за замовчуванням, щоб workflow не комітив метрики щоциклу
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+    METRICS_HISTORY = int(os.getenv('METRICS_HISTORY', 144))  # Циклів в історії metrics.json (доба при 10 хв)
+    
+    # Сховище даних: json (файли) або sqlite (індексована база, JSON експортується для сайту)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'json').lower()
     CLEANUP_COUNT = 6  # Зберігаємо останні 6 сигналів
     
     # Шляхи до файлів
     DATA_DIR = BASE_DIR / 'data'
     SIGNALS_FILE = DATA_DIR / 'signals.json'
     HISTORY_FILE = DATA_DIR / 'history.json'
+    HISTORY_DIR = DATA_DIR / 'history'
     FEEDBACK_FILE = DATA_DIR / 'feedback.json'
     ASSETS_CONFIG_FILE = DATA_DIR / 'assets_config.json'
     LESSONS_FILE = DATA_DIR / 'lessons.json'
+    INDICATOR_STATE_FILE = DATA_DIR / 'indicator_state.json'
+    PRESCREEN_FILE = DATA_DIR / 'prescreen.json'
+    ANALYSIS_CACHE_FILE = DATA_DIR / 'analysis_cache.json'
+    SQLITE_DB_FILE = DATA_DIR / 'signals.db'
+    METRICS_FILE = DATA_DIR / 'metrics.json'
+    METRICS_PROM_FILE = DATA_DIR / 'metrics.prom'
     
     # Налаштування логування
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
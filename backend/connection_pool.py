@@ -0,0 +1,205 @@
+import asyncio
+import bisect
+import logging
+import time
+import zlib
+from collections import deque
+
+import metrics
+
+logger = logging.getLogger("signal_bot")
+
+
+class HashRing:
+    """
+    Консистентне хешування активів на сесії: кожна сесія має replicas віртуальних точок на кільці.
+    При видаленні сесії на інші переходять лише її активи, решта розподілу не змінюється.
+    """
+
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @staticmethod
+    def _hash(key):
+        return zlib.crc32(key.encode('utf-8'))
+
+    def add(self, node):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if point in self._owners:
+                continue
+            bisect.insort(self._points, point)
+            self._owners[point] = node
+
+    def remove(self, node):
+        points = [point for point, owner in self._owners.items() if owner == node]
+        for point in points:
+            del self._owners[point]
+            self._points.pop(bisect.bisect_left(self._points, point))
+
+    def __bool__(self):
+        return bool(self._points)
+
+    def node_for(self, key):
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+class PooledSession:
+    """Одна автентифікована сесія пулу зі статистикою запитів"""
+
+    def __init__(self, index, client, connection):
+        self.index = index
+        self.client = client
+        self.connection = connection  # ManagedConnection: стан, повтори, ping
+        self.connected = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.drops = 0
+        self.latencies = deque(maxlen=200)
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+        return {
+            'connection': self.index,
+            'connected': self.connected,
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'drops': self.drops,
+            'latency_p50': round(metrics.percentile(ordered, 0.5), 4) if ordered else None,
+            'latency_p95': round(metrics.percentile(ordered, 0.95), 4) if ordered else None,
+        }
+
+
+class PocketConnectionPool:
+    """
+    K незалежних вебсокет-сесій PocketOption. Активи закріплені за сесіями консистентним хешуванням,
+    тож запити свічок для різних активів ідуть паралельно різними сокетами.
+    Сесія, що відпала, виводиться з кільця (її активи переходять на інші) і повертається після перепідключення.
+    """
+
+    def __init__(self, size, client_factory, connection_factory):
+        self.size = max(1, int(size))
+        self.sessions = []
+        self.ring = HashRing()
+        for index in range(self.size):
+            client = client_factory()
+            session = PooledSession(index, client, connection_factory(client, f"Сесія пулу #{index}"))
+            client.add_event_callback('disconnected', lambda *_, session=session: self.mark_down(session))
+            self.sessions.append(session)
+
+    @property
+    def live_sessions(self):
+        return [session for session in self.sessions if session.connected]
+
+    async def connect(self):
+        """Відкриття (або відновлення) всіх сесій паралельно; повертає кількість живих сесій"""
+        pending = [session for session in self.sessions if not session.connected]
+        results = await asyncio.gather(*(session.connection.connect() for session in pending),
+                                       return_exceptions=True)
+        for session, result in zip(pending, results):
+            if result is True:
+                self.mark_up(session)
+            else:
+                logger.warning(f"⚠️ Сесія пулу #{session.index} не підключилася: {result}")
+
+        live = len(self.live_sessions)
+        logger.info(f"🔀 Пул PocketOption: {live}/{self.size} сесій активні")
+        return live
+
+    def mark_up(self, session):
+        if not session.connected:
+            session.connected = True
+            self.ring.add(session.index)
+            logger.info(f"🔗 Сесія пулу #{session.index} в кільці")
+
+    async def ensure(self):
+        """Ping активних сесій і перепідключення відпалих; повертає кількість живих сесій"""
+        sessions = self.live_sessions
+        alive = await asyncio.gather(*(session.connection.is_alive() for session in sessions))
+        for session, ok in zip(sessions, alive):
+            if not ok:
+                self.mark_down(session)
+        if len(self.live_sessions) < self.size:
+            return await self.connect()
+        return self.size
+
+    def mark_down(self, session):
+        session.connection.mark_down()
+        if session.connected:
+            session.connected = False
+            session.drops += 1
+            self.ring.remove(session.index)
+            logger.warning(f"🔌 Сесія пулу #{session.index} відпала, її активи перерозподілено "
+                           f"({len(self.live_sessions)} активних)")
+
+    def session_for(self, asset):
+        index = self.ring.node_for(asset)
+        return self.sessions[index] if index is not None else None
+
+    def assignment(self, assets):
+        """Поточний розподіл активів: індекс сесії -> список активів"""
+        shards = {}
+        for asset in assets:
+            session = self.session_for(asset)
+            shards.setdefault(session.index if session else None, []).append(asset)
+        return shards
+
+    async def get_candles(self, asset, timeframe, count):
+        """Запит свічок через сесію активу; при розриві - повтор через сесію, що прийняла актив"""
+        last_error = None
+        for _ in range(self.size):
+            session = self.session_for(asset)
+            if session is None:
+                break
+
+            session.in_flight += 1
+            session.max_in_flight = max(session.max_in_flight, session.in_flight)
+            session.requests += 1
+            started = time.perf_counter()
+            try:
+                candles = await session.client.get_candles(asset=asset, timeframe=timeframe, count=count)
+                session.connection.subscribe(asset, timeframe)
+                return candles
+            except Exception as e:
+                session.errors += 1
+                last_error = e
+                if getattr(session.client, 'is_connected', True) is False or isinstance(e, ConnectionError):
+                    self.mark_down(session)
+                    continue
+                raise
+            finally:
+                session.in_flight -= 1
+                session.latencies.append(time.perf_counter() - started)
+                metrics.count('pocket_requests', connection=session.index)
+
+        raise last_error or ConnectionError("Немає активних сесій PocketOption")
+
+    async def disconnect(self):
+        # Спершу виводимо сесії з кільця, щоб подія disconnected не рахувалась як розрив
+        for session in self.sessions:
+            if session.connected:
+                session.connected = False
+                self.ring.remove(session.index)
+        await asyncio.gather(*(session.connection.close() for session in self.sessions), return_exceptions=True)
+
+    def stats(self):
+        return [session.stats() for session in self.sessions]
+
+    def log_stats(self):
+        for item in self.stats():
+            state = '🟢' if item['connected'] else '🔴'
+            p50 = f"{item['latency_p50']:.3f}с" if item['latency_p50'] is not None else '-'
+            p95 = f"{item['latency_p95']:.3f}с" if item['latency_p95'] is not None else '-'
+            logger.info(f"{state} Сесія #{item['connection']}: {item['requests']} запитів, помилок {item['errors']}, "
+                        f"розривів {item['drops']}, макс. одночасно {item['max_in_flight']}, p50={p50} p95={p95}")
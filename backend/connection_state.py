@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import random
+import time
+
+import metrics
+
+logger = logging.getLogger("signal_bot")
+
+DISCONNECTED = 'disconnected'
+CONNECTING = 'connecting'
+BACKOFF = 'backoff'
+READY = 'ready'
+
+
+def _raw_socket(client):
+    """Вебсокет бібліотеки для протокольного ping (None, якщо недоступний)"""
+    transport = getattr(client, '_websocket', None)
+    return getattr(transport, 'websocket', None)
+
+
+class ManagedConnection:
+    """
+    Стан одного з'єднання PocketOption: disconnected -> connecting -> ready, між невдалими спробами backoff.
+    Спроби з експоненційною затримкою та full jitter; конкурентні виклики connect() чекають одну спільну спробу;
+    після вичерпання спроб нові підключення не починаються до кінця паузи, тож цикл не зависає на "блимаючому" лінку.
+    Після кожного підключення відновлюються підписки на потоки активів.
+    """
+
+    def __init__(self, client, open_session, name="PocketOption", max_attempts=3, base_delay=0.5,
+                 max_delay=5.0, attempt_timeout=15.0, ping_timeout=2.0):
+        self.client = client
+        self.open_session = open_session  # async (client) -> bool: рукостискання + автентифікація + готовність
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempt_timeout = attempt_timeout
+        self.ping_timeout = ping_timeout
+        self.state = DISCONNECTED
+        self.ready = asyncio.Event()
+        self.subscriptions = set()
+        self.retry_at = 0.0
+        self.last_connect_seconds = None
+        self._used = False  # Клієнт уже підключався: перед новою спробою закриваємо старий сокет
+        self._connecting = None
+
+    @property
+    def is_ready(self):
+        return self.state == READY
+
+    def mark_down(self):
+        if self.state == READY:
+            logger.warning(f"🔌 {self.name}: з'єднання втрачено")
+        self.state = DISCONNECTED
+        self.ready.clear()
+
+    async def close(self):
+        """Планове відключення (без попередження про розрив)"""
+        self.state = DISCONNECTED
+        self.ready.clear()
+        self._used = False
+        await self.client.disconnect()
+
+    async def connect(self):
+        """Підключення з повторами; паралельні виклики чекають ту саму спробу"""
+        if self._connecting is None or self._connecting.done():
+            self._connecting = asyncio.ensure_future(self._connect())
+        return await asyncio.shield(self._connecting)
+
+    async def _connect(self):
+        if self.state == READY and self.client.is_connected:
+            return True
+
+        wait = self.retry_at - time.monotonic()
+        if wait > 0:
+            logger.warning(f"⏳ {self.name}: нова спроба підключення через {wait:.1f} сек, цикл не чекає")
+            return False
+
+        started = time.perf_counter()
+        for attempt in range(1, self.max_attempts + 1):
+            self.state = CONNECTING
+            self.ready.clear()
+            if self._used:
+                try:
+                    await self.client.disconnect()
+                except Exception:
+                    pass
+            self._used = True
+            try:
+                ok = await asyncio.wait_for(self.open_session(self.client), timeout=self.attempt_timeout)
+                error = None
+            except Exception as e:
+                ok, error = False, str(e) or type(e).__name__
+
+            if ok:
+                self.state = READY
+                self.ready.set()
+                self.retry_at = 0.0
+                self.last_connect_seconds = time.perf_counter() - started
+                metrics.count('pocket_connects', result='ok')
+                await self.resubscribe()
+                return True
+
+            metrics.count('pocket_connects', result='failed')
+            if attempt >= self.max_attempts:
+                break
+
+            # Full jitter: випадкова затримка в межах експоненційного вікна
+            backoff = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+            delay = random.uniform(0, backoff)
+            self.state = BACKOFF
+            logger.warning(f"🔁 {self.name}: спроба {attempt}/{self.max_attempts} невдала ({error or 'немає готовності'}), "
+                           f"повтор через {delay:.2f} сек")
+            await asyncio.sleep(delay)
+
+        self.state = DISCONNECTED
+        self.retry_at = time.monotonic() + self.max_delay
+        logger.error(f"❌ {self.name}: не вдалося підключитися за {self.max_attempts} спроб")
+        return False
+
+    async def is_alive(self):
+        """Дешева перевірка живості: стан сокета та протокольний ping з коротким таймаутом"""
+        if self.state != READY or not self.client.is_connected:
+            self.mark_down()
+            return False
+
+        socket = _raw_socket(self.client)
+        if socket is None:
+            return True
+        try:
+            pong = await socket.ping()
+            await asyncio.wait_for(pong, timeout=self.ping_timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"📡 {self.name}: ping без відповіді ({str(e) or type(e).__name__})")
+            self.mark_down()
+            return False
+
+    async def ensure(self):
+        """Живе з'єднання: ping або перепідключення"""
+        if await self.is_alive():
+            return True
+        return await self.connect()
+
+    def subscribe(self, asset, timeframe):
+        self.subscriptions.add((asset, int(timeframe)))
+
+    async def resubscribe(self):
+        """Повторна підписка на потоки активів після (пере)підключення"""
+        if not self.subscriptions:
+            return
+        for asset, timeframe in sorted(self.subscriptions):
+            message = f'42{json.dumps(["changeSymbol", {"asset": asset, "period": timeframe}])}'
+            if not await self.client.send_message(message):
+                logger.warning(f"⚠️ {self.name}: не вдалося відновити підписку {asset}")
+                return
+        logger.info(f"📡 {self.name}: відновлено {len(self.subscriptions)} підписок")
@@ -1,8 +1,104 @@
 import json
+import heapq
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 import pytz
 from config import Config
+from history_store import HistoryStore
+from feedback_stats import FeedbackStats
+import metrics
+
+SIGNAL_TTL = 600  # Сигнал активний 10 хвилин з моменту генерації (секунд)
+
+def write_json_atomic(path, data, indent=2):
+    """Запис JSON через тимчасовий файл + fsync + os.replace: читач бачить або старий, або новий файл"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SignalsState:
+    """
+    Стан signals.json на один цикл: одне читання, всі зміни в пам'яті, один атомарний запис.
+    Час сигналів зберігається як epoch (generated_epoch/expires_epoch); живі сигнали
+    впорядковані в min-купі за часом зникнення, "зараз" береться один раз на цикл.
+    """
+    
+    def __init__(self, handler, now=None):
+        self.handler = handler
+        self.path = handler.signals_file
+        self.now = now if now is not None else time.time()
+        self.data = handler.load_signals()
+        self.dirty = False
+        self._seq = 0
+        self._live = {}  # seq -> сигнал (порядок додавання)
+        self._heap = []  # (expires_epoch, seq)
+        for signal in self.data['signals']:
+            self._push(signal)
+    
+    def _push(self, signal):
+        if 'expires_epoch' not in signal:
+            # Старі записи без epoch: розбираємо ISO рядок один раз і зберігаємо числа
+            self.handler._ensure_epoch(signal)
+            self.dirty = True
+        self._seq += 1
+        self._live[self._seq] = signal
+        heapq.heappush(self._heap, (signal.get('expires_epoch') or 0.0, self._seq))
+    
+    def _sync(self):
+        self.data['signals'] = list(self._live.values())
+        self.data['total_signals'] = len(self._live)
+        # Після expire() всі живі сигнали активні
+        self.data['active_signals'] = len(self._live)
+    
+    def expire(self, verbose=True):
+        """Видалення сигналів, що зникли до "зараз" циклу; повертає кількість видалених"""
+        removed_count = 0
+        while self._heap and self._heap[0][0] < self.now:
+            _, seq = heapq.heappop(self._heap)
+            signal = self._live.pop(seq)
+            removed_count += 1
+            if verbose:
+                print(f"🗑️ Видаляємо старий сигнал: {signal.get('asset')}")
+        
+        if removed_count or self.data.get('active_signals') != len(self._live):
+            self.dirty = True
+        self._sync()
+        return removed_count
+    
+    def add(self, signals):
+        """Нові сигнали: відкидання застарілих, обмеження до MAX_SIGNALS_ON_SITE, лічильники"""
+        for signal in signals:
+            self._push(signal)
+        self.expire(verbose=False)
+        
+        # Обмежуємо загальну кількість сигналів (залишаємо найновіші)
+        if len(self._live) > Config.MAX_SIGNALS_ON_SITE:
+            newest = heapq.nlargest(
+                Config.MAX_SIGNALS_ON_SITE, self._live.items(),
+                key=lambda item: item[1].get('generated_epoch') or 0.0
+            )
+            self._live = dict(newest)
+            self._heap = [(signal.get('expires_epoch') or 0.0, seq) for seq, signal in newest]
+            heapq.heapify(self._heap)
+        
+        self._sync()
+        self.data['last_update'] = datetime.fromtimestamp(self.now, self.handler.kyiv_tz).isoformat()
+        self.data['generation_count'] = self.data.get('generation_count', 0) + 1
+        self.dirty = True
+    
+    def commit(self):
+        """Атомарний запис, лише якщо стан змінився"""
+        if not self.dirty:
+            return False
+        write_json_atomic(self.path, self.data)
+        self.dirty = False
+        return True
+
 
 class DataHandler:
     def __init__(self):
@@ -13,6 +109,49 @@ class DataHandler:
         self.lessons_file = Config.LESSONS_FILE
         self.kyiv_tz = pytz.timezone('Europe/Kiev')
         self.create_data_dir()
+        self.history_store = self._init_history_store()
+        self.cycle = None  # SignalsState поточного циклу генерації
+    
+    def _init_history_store(self):
+        """Архів історії; при першому запуску переносимо в нього наявний history.json"""
+        if not Config.HISTORY_STORE_ENABLED:
+            return None
+        try:
+            store = HistoryStore(Config.HISTORY_DIR, compression=Config.HISTORY_COMPRESSION)
+            if store.is_empty and os.path.exists(self.history_file):
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    existing = json.load(f)
+                if isinstance(existing, list) and existing:
+                    store.append(existing)
+                    print(f"📚 Перенесено {len(existing)} записів history.json в архів історії")
+            return store
+        except Exception as e:
+            print(f"⚠️ Архів історії недоступний: {e}")
+            return None
+    
+    def begin_cycle(self, now=None):
+        """Початок циклу: signals.json читається один раз, далі зміни накопичуються в пам'яті"""
+        self.cycle = None
+        self.cycle = SignalsState(self, now)
+        return self.cycle
+    
+    @metrics.timed('commit')
+    def commit_cycle(self):
+        """Кінець циклу: один атомарний запис signals.json (якщо були зміни)"""
+        state, self.cycle = self.cycle, None
+        if state is None:
+            return False
+        try:
+            return state.commit()
+        except Exception as e:
+            print(f"❌ Помилка запису signals.json: {e}")
+            return False
+    
+    def _signals_state(self):
+        """Стан поточного циклу або разовий стан для виклику поза циклом: (стан, чи треба записати)"""
+        if self.cycle is not None:
+            return self.cycle, False
+        return SignalsState(self), True
     
     def create_data_dir(self):
         """Створення директорій для даних"""
@@ -40,7 +179,9 @@ class DataHandler:
                     "feedback_history": [],
                     "success_count": 0,
                     "total_feedback": 0,
-                    "accuracy_percentage": 0
+                    "accuracy_percentage": 0,
+                    "stats": FeedbackStats().to_dict(),
+                    "learned_count": 0
                 }, f, indent=2, ensure_ascii=False)
         
         if not os.path.exists(self.lessons_file):
@@ -51,6 +192,7 @@ class DataHandler:
                     "learned_patterns": []
                 }, f, indent=2, ensure_ascii=False)
     
+    @metrics.timed('save_signals')
     def save_signals(self, signals):
         """Збереження сигналів з обмеженням до 6 останніх"""
         try:
@@ -59,81 +201,15 @@ class DataHandler:
                 return False
             
             # Фільтруємо сигнали з достатньою впевненістю
-            valid_signals = []
-            for signal in signals:
-                confidence = signal.get('confidence', 0)
-                if confidence >= Config.MIN_CONFIDENCE:
-                    # Переконуємося, що є всі необхідні поля
-                    if 'asset' not in signal or 'direction' not in signal:
-                        continue
-                    
-                    # Додаємо ID, якщо немає
-                    if 'id' not in signal:
-                        now_kyiv = Config.get_kyiv_time()
-                        signal['id'] = f"{signal['asset']}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
-                    
-                    # Додаємо час зникнення (10 хвилин після генерації)
-                    if 'generated_at' in signal:
-                        gen_time = self._parse_datetime(signal['generated_at'])
-                        if gen_time:
-                            expiry_time = gen_time + timedelta(minutes=10)
-                            signal['expires_at'] = expiry_time.isoformat()
-                    
-                    valid_signals.append(signal)
+            valid_signals = self._prepare_signals(signals)
             
             if not valid_signals:
                 print("⚠️ Немає сигналів з достатньою впевненістю для збереження")
                 return False
             
-            now_kyiv = Config.get_kyiv_time()
-            
-            # Завантажуємо існуючі сигнали
-            existing_data = self.load_signals()
-            existing_signals = existing_data.get('signals', [])
-            
-            # Фільтруємо старі сигнали (старіші 10 хвилин)
-            current_signals = []
-            for signal in existing_signals:
-                try:
-                    gen_time_str = signal.get('generated_at')
-                    if gen_time_str:
-                        gen_time = self._parse_datetime(gen_time_str)
-                        if gen_time and (now_kyiv - gen_time <= timedelta(minutes=10)):
-                            current_signals.append(signal)
-                except:
-                    continue
-            
-            # Додаємо нові сигнали
-            all_signals = current_signals + valid_signals
-            
-            # Обмежуємо загальну кількість сигналів (максимум 6)
-            if len(all_signals) > Config.MAX_SIGNALS_ON_SITE:
-                # Залишаємо тільки найновіші 6 сигналів
-                all_signals = sorted(
-                    all_signals, 
-                    key=lambda x: self._parse_datetime(x.get('generated_at', '') or ''),
-                    reverse=True
-                )[:Config.MAX_SIGNALS_ON_SITE]
-            
-            # Рахуємо активні сигнали
-            active_count = 0
-            for signal in all_signals:
-                if self._is_signal_active(signal):
-                    active_count += 1
-            
-            # Оновлюємо дані
-            data = {
-                "last_update": now_kyiv.isoformat(),
-                "signals": all_signals,
-                "timezone": "Europe/Kiev (UTC+2)",
-                "total_signals": len(all_signals),
-                "active_signals": active_count,
-                "generation_count": existing_data.get('generation_count', 0) + 1
-            }
-            
-            # Зберігаємо
-            with open(self.signals_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+            # Зміни застосовуються до стану циклу; поза циклом - одразу записуємо
+            state, owned = self._signals_state()
+            state.add(valid_signals)
             
             # Додаємо в історію
             self._add_to_history(valid_signals)
@@ -141,6 +217,10 @@ class DataHandler:
             # Оновлюємо статистику навчання
             self.update_learning_stats()
             
+            if owned:
+                state.commit()
+            
+            active_count = state.data['active_signals']
             print(f"💾 Збережено {len(valid_signals)} сигналів. Активних: {active_count}")
             return True
             
@@ -150,6 +230,43 @@ class DataHandler:
             print(f"Деталі: {traceback.format_exc()}")
             return False
     
+    def _prepare_signals(self, signals):
+        """Відбір сигналів з достатньою впевненістю та додавання ID і часу зникнення"""
+        valid_signals = []
+        for signal in signals:
+            confidence = signal.get('confidence', 0)
+            if confidence >= Config.MIN_CONFIDENCE:
+                # Переконуємося, що є всі необхідні поля
+                if 'asset' not in signal or 'direction' not in signal:
+                    continue
+
+                # Додаємо ID, якщо немає
+                if 'id' not in signal:
+                    now_kyiv = Config.get_kyiv_time()
+                    signal['id'] = f"{signal['asset']}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+
+                # Час генерації та зникнення (10 хвилин після генерації) як epoch;
+                # expires_at у Київському часі - лише для відображення на сайті
+                if self._ensure_epoch(signal):
+                    signal['expires_at'] = datetime.fromtimestamp(signal['expires_epoch'], self.kyiv_tz).isoformat()
+
+                valid_signals.append(signal)
+        
+        return valid_signals
+    
+    def _ensure_epoch(self, signal):
+        """Додає generated_epoch/expires_epoch; ISO рядок розбирається лише якщо epoch ще немає"""
+        generated_epoch = signal.get('generated_epoch')
+        if generated_epoch is None:
+            gen_time = self._parse_datetime(signal.get('generated_at'))
+            generated_epoch = gen_time.timestamp() if gen_time else None
+        if generated_epoch is None:
+            signal['expires_epoch'] = None
+            return False
+        signal['generated_epoch'] = generated_epoch
+        signal['expires_epoch'] = generated_epoch + SIGNAL_TTL
+        return True
+    
     def _parse_datetime(self, datetime_str):
         """Парсинг datetime з рядка з обробкою різних форматів"""
         if not datetime_str:
@@ -174,7 +291,9 @@ class DataHandler:
             return None
     
     def load_signals(self):
-        """Завантаження сигналів з файлу"""
+        """Завантаження сигналів з файлу (під час циклу - незаписаний стан циклу)"""
+        if self.cycle is not None:
+            return self.cycle.data
         try:
             if os.path.exists(self.signals_file):
                 with open(self.signals_file, 'r', encoding='utf-8') as f:
@@ -210,107 +329,115 @@ class DataHandler:
                 "generation_count": 0
             }
     
-    def _is_signal_active(self, signal):
+    def _is_signal_active(self, signal, now=None):
         """Перевірка чи сигнал ще активний (точно 10 хвилин з моменту генерації)"""
-        try:
-            now_kyiv = Config.get_kyiv_time()
-            
-            # Час генерації сигналу
-            gen_time_str = signal.get('generated_at')
-            if not gen_time_str:
-                return False
-            
-            generated_at = self._parse_datetime(gen_time_str)
-            if not generated_at:
-                return False
-            
-            # Сигнал активний точно 10 хвилин з моменту генерації
-            time_since_generation = now_kyiv - generated_at
-            is_active = time_since_generation <= timedelta(minutes=10)
-            
-            return is_active
-            
-        except Exception as e:
-            print(f"⚠️ Помилка перевірки активності сигналу: {e}")
+        if 'expires_epoch' not in signal:
+            self._ensure_epoch(signal)
+        expires_epoch = signal.get('expires_epoch')
+        if expires_epoch is None:
             return False
+        return expires_epoch >= (now if now is not None else time.time())
     
     def _add_to_history(self, signals):
-        """Додавання сигналів до історії з обмеженням"""
+        """Додавання сигналів до історії: повний архів append-only, history.json - лише останні записи"""
         try:
             if not signals:
                 return
             
-            history = []
-            if os.path.exists(self.history_file):
-                with open(self.history_file, 'r', encoding='utf-8') as f:
-                    history = json.load(f)
-            
             now_kyiv = Config.get_kyiv_time()
+            new_entries = []
             for signal in signals:
                 # Створюємо копію сигналу для історії
                 history_entry = signal.copy()
                 history_entry['saved_at'] = now_kyiv.isoformat()
                 history_entry['history_id'] = f"{signal.get('asset', 'unknown')}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
                 history_entry['status'] = 'saved'
-                history.append(history_entry)
+                new_entries.append(history_entry)
+            
+            if self.history_store is not None:
+                self.history_store.append(new_entries)
             
-            # Обмежуємо історію (останні 100 записів)
+            history = []
+            if os.path.exists(self.history_file):
+                with open(self.history_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            history.extend(new_entries)
+            
+            # history.json - обмежене "останнє" представлення для сайту (останні 100 записів)
             if len(history) > Config.MAX_SIGNALS_HISTORY:
                 history = history[-Config.MAX_SIGNALS_HISTORY:]
             
-            with open(self.history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False, default=str)
+            write_json_atomic(self.history_file, history)
                 
             print(f"📚 Додано {len(signals)} сигналів до історії")
                 
         except Exception as e:
             print(f"❌ Помилка додавання в історію: {e}")
     
-    def save_feedback(self, signal_id, success, user_comment=""):
-        """Збереження відгуку про результат угоди для навчання AI"""
+    def _load_feedback(self):
+        """feedback.json з лічильниками та позначкою вже вивченого (старі файли мігруються один раз)"""
+        feedback_data = {}
+        if os.path.exists(self.feedback_file):
+            with open(self.feedback_file, 'r', encoding='utf-8') as f:
+                feedback_data = json.load(f)
+        
+        feedback_history = feedback_data.setdefault('feedback_history', [])
+        if 'stats' not in feedback_data:
+            feedback_data['stats'] = FeedbackStats.rebuild(feedback_history).to_dict()
+        if 'learned_count' not in feedback_data:
+            learned_count = 0
+            while learned_count < len(feedback_history) and feedback_history[learned_count].get('learned', False):
+                learned_count += 1
+            feedback_data['learned_count'] = learned_count
+        return feedback_data
+    
+    def _signal_direction(self, signal_id):
+        """Напрямок сигналу серед поточних сигналів (для статистики відгуків)"""
+        for signal in self.load_signals().get('signals', []):
+            if signal.get('id') == signal_id:
+                return signal.get('direction')
+        return None
+    
+    def save_feedback(self, signal_id, success, user_comment="", direction=None):
+        """Збереження відгуку про результат угоди: одне читання, інкрементальні лічильники, один запис"""
         try:
             if not Config.FEEDBACK_ENABLED:
                 return False
             
-            # Завантажуємо існуючі feedback
-            feedback_data = {}
-            if os.path.exists(self.feedback_file):
-                with open(self.feedback_file, 'r', encoding='utf-8') as f:
-                    feedback_data = json.load(f)
-            
-            feedback_history = feedback_data.get('feedback_history', [])
+            feedback_data = self._load_feedback()
+            feedback_history = feedback_data['feedback_history']
             
             now_kyiv = Config.get_kyiv_time()
             feedback_entry = {
                 'signal_id': signal_id,
                 'success': success,
+                'direction': direction or self._signal_direction(signal_id),
                 'user_comment': user_comment,
                 'feedback_at': now_kyiv.isoformat(),
                 'learned': False
             }
-            
             feedback_history.append(feedback_entry)
             
-            # Оновлюємо статистику
-            total_feedback = len(feedback_history)
-            success_count = len([f for f in feedback_history if f.get('success', False)])
-            accuracy = (success_count / total_feedback * 100) if total_feedback > 0 else 0
+            # Оновлюємо статистику без перерахунку всієї історії
+            stats = FeedbackStats.from_dict(feedback_data['stats'])
+            stats.record(feedback_entry)
             
             feedback_data.update({
-                'feedback_history': feedback_history,
-                'success_count': success_count,
-                'total_feedback': total_feedback,
-                'accuracy_percentage': round(accuracy, 2)
+                'stats': stats.to_dict(),
+                'success_count': stats.success,
+                'total_feedback': stats.total,
+                'accuracy_percentage': stats.accuracy()
             })
             
-            with open(self.feedback_file, 'w', encoding='utf-8') as f:
-                json.dump(feedback_data, f, indent=2, ensure_ascii=False, default=str)
+            pending = len(feedback_history) - feedback_data['learned_count']
+            if pending >= Config.LEARNING_BATCH_SIZE:
+                # Поріг досягнуто - навчаємося пакетом на вже завантажених даних
+                self._learn_batch(feedback_data)
             
-            # Запускаємо навчання AI на основі feedback
-            self.learn_from_feedback()
+            write_json_atomic(self.feedback_file, feedback_data)
             
             print(f"💾 Збережено відгук для сигналу {signal_id}: {'✅ Успіх' if success else '❌ Невдача'}")
-            print(f"📊 Нова точність AI: {accuracy:.2f}% ({success_count}/{total_feedback})")
+            print(f"📊 Нова точність AI: {stats.accuracy():.2f}% ({stats.success}/{stats.total})")
             return True
             
         except Exception as e:
@@ -318,72 +445,73 @@ class DataHandler:
             return False
     
     def learn_from_feedback(self):
-        """Навчання ШІ на основі feedback (аналіз чому сигнал був правильний/неправильний)"""
+        """Пакетне навчання ШІ на відгуках після позначки learned_count (за розкладом циклу)"""
         try:
             if not os.path.exists(self.feedback_file):
                 return []
             
-            with open(self.feedback_file, 'r', encoding='utf-8') as f:
-                feedback_data = json.load(f)
-            
-            feedback = feedback_data.get('feedback_history', [])
-            
-            unlearned = [fb for fb in feedback if not fb.get('learned', False)]
-            
-            if not unlearned:
+            feedback_data = self._load_feedback()
+            if len(feedback_data['feedback_history']) <= feedback_data['learned_count']:
                 return []
             
-            # Завантажуємо уроки
-            lessons_data = {}
-            if os.path.exists(self.lessons_file):
-                with open(self.lessons_file, 'r', encoding='utf-8') as f:
-                    lessons_data = json.load(f)
-            
-            lessons = lessons_data.get('lessons', [])
-            
-            now_kyiv = Config.get_kyiv_time()
-            new_lessons = []
-            
-            for fb in unlearned:
-                # Аналізуємо чому сигнал був правильний/неправильний
-                lesson = {
-                    'signal_id': fb.get('signal_id', ''),
-                    'success': fb.get('success', False),
-                    'feedback_at': fb.get('feedback_at', ''),
-                    'learned_at': now_kyiv.isoformat(),
-                    'asset': fb.get('signal_id', '').split('_')[0] if '_' in fb.get('signal_id', '') else '',
-                    'patterns': self._extract_patterns(fb),
-                    'analysis': self._analyze_feedback(fb)  # Аналіз причин
-                }
-                new_lessons.append(lesson)
-                
-                fb['learned'] = True
-            
-            # Оновлюємо feedback файл
-            feedback_data['feedback_history'] = feedback
-            with open(self.feedback_file, 'w', encoding='utf-8') as f:
-                json.dump(feedback_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            # Додаємо нові уроки
-            all_lessons = lessons + new_lessons
-            
-            # Оновлюємо уроки
-            lessons_data.update({
-                'lessons': all_lessons,
-                'last_learning': now_kyiv.isoformat(),
-                'learned_patterns': self._update_learned_patterns(all_lessons)
-            })
-            
-            with open(self.lessons_file, 'w', encoding='utf-8') as f:
-                json.dump(lessons_data, f, indent=2, ensure_ascii=False, default=str)
-            
-            print(f"🧠 ШІ навчився на {len(new_lessons)} нових прикладах")
+            new_lessons = self._learn_batch(feedback_data)
+            write_json_atomic(self.feedback_file, feedback_data)
             return new_lessons
             
         except Exception as e:
             print(f"❌ Помилка навчання ШІ: {e}")
             return []
     
+    def _learn_batch(self, feedback_data):
+        """Уроки з невивчених відгуків; оновлює feedback_data на місці і записує lessons.json"""
+        feedback_history = feedback_data['feedback_history']
+        start = feedback_data['learned_count']
+        unlearned = feedback_history[start:]
+        if not unlearned:
+            return []
+        
+        # Завантажуємо уроки
+        lessons_data = {}
+        if os.path.exists(self.lessons_file):
+            with open(self.lessons_file, 'r', encoding='utf-8') as f:
+                lessons_data = json.load(f)
+        
+        lessons = lessons_data.get('lessons', [])
+        
+        now_kyiv = Config.get_kyiv_time()
+        new_lessons = []
+        
+        for fb in unlearned:
+            # Аналізуємо чому сигнал був правильний/неправильний
+            lesson = {
+                'signal_id': fb.get('signal_id', ''),
+                'success': fb.get('success', False),
+                'feedback_at': fb.get('feedback_at', ''),
+                'learned_at': now_kyiv.isoformat(),
+                'asset': fb.get('signal_id', '').split('_')[0] if '_' in fb.get('signal_id', '') else '',
+                'patterns': self._extract_patterns(fb),
+                'analysis': self._analyze_feedback(fb)  # Аналіз причин
+            }
+            new_lessons.append(lesson)
+            
+            fb['learned'] = True
+        
+        feedback_data['learned_count'] = len(feedback_history)
+        
+        # Додаємо нові уроки
+        all_lessons = lessons + new_lessons
+        
+        lessons_data.update({
+            'lessons': all_lessons,
+            'last_learning': now_kyiv.isoformat(),
+            'learned_patterns': self._update_learned_patterns(all_lessons)
+        })
+        
+        write_json_atomic(self.lessons_file, lessons_data)
+        
+        print(f"🧠 ШІ навчився на {len(new_lessons)} нових прикладах")
+        return new_lessons
+    
     def _extract_patterns(self, feedback_entry):
         """Витягнення шаблонів з feedback (заглушка)"""
         return []
@@ -409,43 +537,32 @@ class DataHandler:
         """Оновлення статистики навчання"""
         pass
     
+    @metrics.timed('cleanup')
     def auto_cleanup_old_signals(self):
         """Автоматичне очищення сигналів старіших 10 хвилин"""
         try:
             print("🧹 Автоматичне очищення старих сигналів...")
             
-            data = self.load_signals()
-            signals = data.get('signals', [])
-            
-            if len(signals) == 0:
+            state, owned = self._signals_state()
+            if not state.data['signals']:
                 return
             
-            now_kyiv = Config.get_kyiv_time()
-            active_signals = []
-            removed_count = 0
-            
-            for signal in signals:
-                try:
-                    gen_time_str = signal.get('generated_at')
-                    if gen_time_str:
-                        gen_time = self._parse_datetime(gen_time_str)
-                        if gen_time and (now_kyiv - gen_time <= timedelta(minutes=10)):
-                            active_signals.append(signal)
-                        else:
-                            removed_count += 1
-                            print(f"🗑️ Видаляємо старий сигнал: {signal.get('asset')}")
-                except:
-                    continue
+            removed_count = state.expire()
+            if owned:
+                state.commit()
             
-            # Оновлюємо файл
-            data['signals'] = active_signals
-            data['total_signals'] = len(active_signals)
-            data['active_signals'] = len([s for s in active_signals if self._is_signal_active(s)])
-            
-            with open(self.signals_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-            
-            print(f"✅ Автоочищення: видалено {removed_count} старих сигналів, залишено {len(active_signals)} актуальних")
+            print(f"✅ Автоочищення: видалено {removed_count} старих сигналів, залишено {len(state.data['signals'])} актуальних")
             
         except Exception as e:
             print(f"❌ Помилка автоочищення: {e}")
+
+
+def create_data_handler():
+    """Обробник даних за налаштуванням Config.STORAGE_BACKEND"""
+    if Config.STORAGE_BACKEND == 'sqlite':
+        try:
+            from sqlite_storage import SQLiteDataHandler
+            return SQLiteDataHandler()
+        except Exception as e:
+            print(f"⚠️ SQLite сховище недоступне, використовую JSON: {e}")
+    return DataHandler()
@@ -0,0 +1,321 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+import uuid
+
+import httpx
+from aiohttp import web
+
+logger = logging.getLogger("signal_bot")
+
+# Локальний замінник Groq (OpenAI-сумісний /chat/completions) для офлайн-бенчмарків GroqAnalyzer.
+# record - проксі до справжнього Groq із записом пар запит -> відповідь та затримок у JSONL касету;
+# replay - відтворення касети з записаною або заданою затримкою, usage токенів, 429 та зламаним JSON.
+
+UPSTREAM_URL = "https://api.groq.com"
+COMPLETIONS_PATHS = ('/openai/v1/chat/completions', '/v1/chat/completions')
+
+ASSET_PATTERN = re.compile(r'^(?:Актив:|###)\s*(\S+)', re.MULTILINE)
+ENTRY_TIME_PATTERN = re.compile(r'(?:Час входу|Время входа):\s*(\d{2}:\d{2})')
+DURATION_PATTERN = re.compile(r'(?:Тривалість|Длительность):\s*(\d+)')
+CLOCK_PATTERN = re.compile(r'\b\d{2}:\d{2}(?::\d{2})?\b')
+
+
+def request_key(body):
+    """Ключ запиту: модель + повідомлення; час входу та мітки часу не враховуються, щоб записи збігались між запусками"""
+    messages = [dict(message, content=CLOCK_PATTERN.sub('HH:MM', message.get('content', '')))
+                for message in body.get('messages', [])]
+    material = json.dumps({'model': body.get('model'), 'messages': messages}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(material.encode('utf-8')).hexdigest()
+
+
+def prompt_assets(body):
+    """Активи, згадані в промпті (один для звичайного аналізу, кілька для пакетного)"""
+    text = "\n".join(message.get('content', '') for message in body.get('messages', []))
+    return ASSET_PATTERN.findall(text)
+
+
+class FakeGroqServer:
+    """Record/replay HTTP сервер, сумісний з клієнтом groq (base_url=self.url)"""
+
+    def __init__(self, cassette, mode='replay', host='127.0.0.1', port=0, upstream=UPSTREAM_URL,
+                 latency=None, jitter=0.0, latency_scale=1.0, rate_limit_rate=0.0, retry_after=1.0,
+                 malformed_rate=0.0, on_miss='synthetic', seed=None):
+        self.cassette = cassette
+        self.mode = mode
+        self.host = host
+        self.port = port
+        self.upstream = upstream.rstrip('/')
+        self.latency = latency  # None - записана затримка
+        self.jitter = jitter
+        self.latency_scale = latency_scale
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.malformed_rate = malformed_rate
+        self.on_miss = on_miss  # synthetic | error
+        self.random = random.Random(seed)
+        self.records = {}
+        self.by_asset = {}
+        self.by_batch = {}
+        self.ordered = []
+        self.singles = []
+        self._replay_position = 0
+        self._runner = None
+        self._upstream_client = None
+        self.stats = {'requests': 0, 'recorded': 0, 'exact_hits': 0, 'asset_hits': 0, 'fallback_hits': 0,
+                      'synthetic': 0, 'rate_limited': 0, 'malformed': 0, 'prompt_tokens': 0,
+                      'completion_tokens': 0}
+        if mode == 'replay':
+            self._load_cassette()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # --- Касета ---
+
+    def _load_cassette(self):
+        try:
+            with open(self.cassette, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._index(record)
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Касета {self.cassette} не знайдена, відповіді будуть синтетичними")
+        logger.info(f"📼 Завантажено {len(self.ordered)} записів касети")
+
+    def _index(self, record):
+        self.records[record['key']] = record
+        assets = record.get('assets', [])
+        if len(assets) == 1:
+            self.by_asset.setdefault(assets[0], []).append(record)
+            self.singles.append(record)
+        elif assets:
+            self.by_batch.setdefault(tuple(sorted(assets)), []).append(record)
+        self.ordered.append(record)
+
+    def _append(self, record):
+        with open(self.cassette, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._index(record)
+        self.stats['recorded'] += 1
+
+    # --- Життєвий цикл ---
+
+    async def start(self):
+        app = web.Application()
+        for path in COMPLETIONS_PATHS:
+            app.router.add_post(path, self._handle_completion)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        if self.mode == 'record':
+            self._upstream_client = httpx.AsyncClient(timeout=60)
+        logger.info(f"🧪 Фейковий Groq ({self.mode}) слухає {self.url}")
+        return self
+
+    async def stop(self):
+        if self._upstream_client is not None:
+            await self._upstream_client.aclose()
+            self._upstream_client = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # --- Обробка запитів ---
+
+    async def _handle_completion(self, request):
+        self.stats['requests'] += 1
+        body = await request.json()
+        if self.mode == 'record':
+            return await self._record(request, body)
+        return await self._replay(body)
+
+    async def _record(self, request, body):
+        started = time.perf_counter()
+        upstream = await self._upstream_client.post(
+            f"{self.upstream}/openai/v1/chat/completions",
+            json=body,
+            headers={'Authorization': request.headers.get('Authorization', '')}
+        )
+        latency = time.perf_counter() - started
+
+        try:
+            payload = upstream.json()
+        except ValueError:
+            payload = {'error': {'message': upstream.text}}
+
+        if upstream.status_code == 200:
+            self._append({
+                'key': request_key(body),
+                'model': body.get('model'),
+                'assets': prompt_assets(body),
+                'request': body,
+                'response': payload,
+                'latency': round(latency, 4),
+                'recorded_at': time.time()
+            })
+
+        headers = {name: value for name, value in upstream.headers.items()
+                   if name.lower() in ('retry-after',) or name.lower().startswith('x-ratelimit')}
+        return web.json_response(payload, status=upstream.status_code, headers=headers)
+
+    def _lookup(self, body):
+        """Точний збіг, потім запис того ж активу (набору активів), потім одиночний запис по колу"""
+        record = self.records.get(request_key(body))
+        if record is not None:
+            self.stats['exact_hits'] += 1
+            return record
+
+        assets = prompt_assets(body)
+        if len(assets) == 1:
+            candidates = self.by_asset.get(assets[0])
+        else:
+            candidates = self.by_batch.get(tuple(sorted(assets)))
+        if candidates:
+            self.stats['asset_hits'] += 1
+            return candidates[self.random.randrange(len(candidates))]
+
+        if self.singles and len(assets) <= 1:
+            record = self.singles[self._replay_position % len(self.singles)]
+            self._replay_position += 1
+            self.stats['fallback_hits'] += 1
+            return record
+        return None
+
+    def _delay(self, record):
+        if self.latency is not None:
+            base = self.latency
+        elif record is not None:
+            base = record.get('latency', 0.0) * self.latency_scale
+        else:
+            base = 0.0
+        if self.jitter:
+            base += self.random.uniform(-self.jitter, self.jitter)
+        return max(0.0, base)
+
+    def _synthetic_content(self, body):
+        """Коректна за форматом відповідь, побудована з промпту"""
+        text = "\n".join(message.get('content', '') for message in body.get('messages', []))
+        assets = prompt_assets(body) or ['UNKNOWN']
+        entry_time = ENTRY_TIME_PATTERN.search(text)
+        duration = DURATION_PATTERN.search(text)
+
+        def signal(asset):
+            return {
+                'asset': asset,
+                'direction': self.random.choice(['UP', 'DOWN']),
+                'confidence': round(self.random.uniform(0.75, 0.92), 2),
+                'entry_time': entry_time.group(1) if entry_time else time.strftime('%H:%M'),
+                'duration': int(duration.group(1)) if duration else 3,
+                'reason': 'Синтетична відповідь для бенчмарку'
+            }
+
+        if len(assets) > 1 or '"signals"' in text:
+            return json.dumps({'signals': [signal(asset) for asset in assets]}, ensure_ascii=False)
+        return json.dumps(signal(assets[0]), ensure_ascii=False)
+
+    def _completion(self, body, content, usage=None):
+        prompt_chars = sum(len(message.get('content', '')) for message in body.get('messages', []))
+        usage = usage or {
+            'prompt_tokens': prompt_chars // 4,
+            'completion_tokens': max(1, len(content) // 4),
+        }
+        usage['total_tokens'] = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+        self.stats['prompt_tokens'] += usage.get('prompt_tokens', 0)
+        self.stats['completion_tokens'] += usage.get('completion_tokens', 0)
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': usage
+        }
+
+    async def _replay(self, body):
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            return web.json_response(
+                {'error': {'message': 'Rate limit reached (fake)', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                status=429, headers={'retry-after': str(self.retry_after)}
+            )
+
+        record = self._lookup(body)
+        await asyncio.sleep(self._delay(record))
+
+        if record is not None:
+            response = record['response']
+            content = response['choices'][0]['message']['content']
+            usage = dict(response.get('usage') or {}) or None
+        elif self.on_miss == 'synthetic':
+            self.stats['synthetic'] += 1
+            content, usage = self._synthetic_content(body), None
+        else:
+            return web.json_response({'error': {'message': 'No recorded response for this request'}}, status=404)
+
+        if self.malformed_rate and self.random.random() < self.malformed_rate:
+            self.stats['malformed'] += 1
+            content = content[:max(1, len(content) // 2)]  # обрізаний JSON
+
+        return web.json_response(self._completion(body, content, usage))
+
+
+async def _serve_forever(args):
+    server = FakeGroqServer(
+        cassette=args.cassette, mode=args.mode, host=args.host, port=args.port, upstream=args.upstream,
+        latency=args.latency, jitter=args.jitter, latency_scale=args.latency_scale,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        malformed_rate=args.malformed_rate, on_miss=args.on_miss, seed=args.seed
+    )
+    await server.start()
+    print(f"🧪 Фейковий Groq ({args.mode}): {server.url}")
+    print(f"   Для бота: GROQ_BASE_URL={server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f"📊 Статистика: {server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record/replay замінник Groq API для бенчмарків")
+    parser.add_argument('mode', choices=['record', 'replay'])
+    parser.add_argument('--cassette', default='groq_cassette.jsonl', help="JSONL файл записів")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--upstream', default=UPSTREAM_URL, help="Справжній API для режиму record")
+    parser.add_argument('--latency', type=float, default=None, help="Фіксована затримка, сек (типово - записана)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Розкид затримки, сек")
+    parser.add_argument('--latency-scale', type=float, default=1.0, help="Множник записаної затримки")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Частка відповідей 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After для 429, сек")
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help="Частка відповідей зі зламаним JSON")
+    parser.add_argument('--on-miss', choices=['synthetic', 'error'], default='synthetic')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
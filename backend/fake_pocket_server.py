@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import time
+import uuid
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from synthetic_market import SyntheticMarket
+
+logger = logging.getLogger("signal_bot")
+
+# Локальний замінник сервера PocketOption для офлайн-бенчмарків.
+# Реалізує ту частину протоколу Socket.IO (EIO=4), яку використовує pocketoptionapi_async:
+# рукостискання 0/40, auth, getBalance, changeSymbol (історія свічок) та потік тіків updateStream.
+
+PING_INTERVAL = 25  # секунд між пінгами "2" від сервера, як у Engine.IO
+
+
+def save_archive(path, frames):
+    """Запис архіву свічок {актив: {таймфрейм: [[time, open, close, high, low], ...]}} з CandleFrame"""
+    archive = {}
+    for frame in frames:
+        rows = [[int(ts), round(float(o), 5), round(float(c), 5), round(float(h), 5), round(float(l), 5)]
+                for ts, o, c, h, l in zip(frame.timestamps, frame.open, frame.close, frame.high, frame.low)]
+        archive.setdefault(frame.asset, {})[str(frame.timeframe)] = rows
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(archive, f)
+
+
+def _self_signed_context():
+    """TLS контекст із тимчасовим самопідписаним сертифікатом (клієнт бібліотеки не перевіряє сертифікат)"""
+    directory = tempfile.mkdtemp(prefix="fake_pocket_")
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', keyfile, '-out', certfile,
+         '-days', '1', '-subj', '/CN=localhost'],
+        check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+class FakePocketServer:
+    """
+    Фейковий вебсокет-сервер PocketOption з керованими затримкою, джитером,
+    втратою повідомлень та примусовими розривами з'єднання (детерміновано при заданому seed).
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, market=None, archive=None, history_size=100,
+                 balance=10000.0, latency=0.0, jitter=0.0, loss=0.0, disconnect_rate=0.0,
+                 disconnect_after=None, stream_interval=1.0, seed=None, tls=True, ssl_context=None):
+        self.host = host
+        self.port = port
+        self.market = market or SyntheticMarket(seed)
+        self.archive = self._load_archive(archive) if isinstance(archive, str) else (archive or {})
+        self.history_size = history_size
+        self.balance = balance
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.disconnect_rate = disconnect_rate
+        self.disconnect_after = disconnect_after
+        self.stream_interval = stream_interval
+        self.tls = tls
+        self.ssl_context = ssl_context
+        self.random = random.Random(seed)
+        self._server = None
+        self._connections = set()
+        self.stats = {
+            'connections': 0,
+            'authenticated': 0,
+            'balance_requests': 0,
+            'candle_requests': 0,
+            'messages_sent': 0,
+            'messages_dropped': 0,
+            'ticks_sent': 0,
+            'forced_disconnects': 0,
+        }
+
+    @property
+    def url(self):
+        scheme = 'wss' if self.tls else 'ws'
+        return f"{scheme}://{self.host}:{self.port}/socket.io/?EIO=4&transport=websocket"
+
+    def _load_archive(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    async def start(self):
+        if self.tls and self.ssl_context is None:
+            self.ssl_context = _self_signed_context()
+        self._server = await websockets.serve(
+            self._handler, self.host, self.port,
+            ssl=self.ssl_context if self.tls else None,
+            ping_interval=None
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"🧪 Фейковий сервер PocketOption слухає {self.url}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def drop_all(self):
+        """Примусовий розрив усіх з'єднань (перевірка перепідключення)"""
+        for websocket in list(self._connections):
+            self.stats['forced_disconnects'] += 1
+            await websocket.close()
+
+    # --- Дані ---
+
+    def _history(self, asset, period):
+        """Історія у форматі сервера: [time, open, close, high, low]"""
+        recorded = self.archive.get(asset)
+        if isinstance(recorded, dict):
+            recorded = recorded.get(str(period))
+        if recorded:
+            return recorded[-self.history_size:]
+
+        frame = self.market.generate(asset, period, self.history_size)
+        return [[int(ts), round(float(o), 5), round(float(c), 5), round(float(h), 5), round(float(l), 5)]
+                for ts, o, c, h, l in zip(frame.timestamps, frame.open, frame.close, frame.high, frame.low)]
+
+    # --- Відправка з імітацією мережі ---
+
+    async def _send(self, websocket, message):
+        if self.loss and self.random.random() < self.loss:
+            self.stats['messages_dropped'] += 1
+            return
+        delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await websocket.send(message)
+        self.stats['messages_sent'] += 1
+
+        if self.disconnect_rate and self.random.random() < self.disconnect_rate:
+            self.stats['forced_disconnects'] += 1
+            await websocket.close()
+
+    async def _stream(self, websocket, subscriptions, prices):
+        """Тіки для підписаних активів та пінги Engine.IO"""
+        last_ping = time.monotonic()
+        while True:
+            await asyncio.sleep(self.stream_interval)
+            now = time.time()
+            ticks = []
+            for asset in list(subscriptions):
+                price = prices[asset] * (1 + self.random.gauss(0, 0.0002))
+                prices[asset] = price
+                ticks.append([asset, round(now, 3), round(price, 5)])
+            if ticks:
+                self.stats['ticks_sent'] += len(ticks)
+                await self._send(websocket, f'451-{json.dumps(["updateStream", ticks])}')
+            if time.monotonic() - last_ping >= PING_INTERVAL:
+                last_ping = time.monotonic()
+                await self._send(websocket, "2")
+
+    async def _handle_event(self, websocket, event, data, subscriptions, prices):
+        if event == 'auth':
+            self.stats['authenticated'] += 1
+            await self._send(websocket, '451-["successauth",{"_placeholder":true,"num":0}]')
+        elif event == 'getBalance':
+            self.stats['balance_requests'] += 1
+            payload = {'balance': self.balance, 'isDemo': 1, 'uid': (data or {}).get('uid', 0)}
+            await self._send(websocket, json.dumps(payload).encode('utf-8'))
+        elif event == 'changeSymbol':
+            self.stats['candle_requests'] += 1
+            asset, period = data.get('asset'), int(data.get('period', 60))
+            history = self._history(asset, period)
+            subscriptions.add(asset)
+            if history:
+                prices[asset] = history[-1][2]
+            await self._send(websocket, f'451-{json.dumps(["updateStream", {"asset": asset, "period": period, "data": history}])}')
+        # "ps" та інші події клієнта сервер мовчки приймає
+
+    async def _handler(self, websocket, path=None):
+        self.stats['connections'] += 1
+        self._connections.add(websocket)
+        sid = uuid.uuid4().hex[:20]
+        subscriptions = set()
+        prices = {}
+        stream_task = None
+        disconnect_task = None
+        try:
+            await self._send(websocket, '0' + json.dumps({
+                'sid': sid, 'upgrades': [], 'pingInterval': PING_INTERVAL * 1000, 'pingTimeout': 20000
+            }))
+            if self.disconnect_after:
+                disconnect_task = asyncio.create_task(self._disconnect_later(websocket))
+            stream_task = asyncio.create_task(self._stream(websocket, subscriptions, prices))
+
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    continue
+                if message == '40':
+                    await self._send(websocket, '40' + json.dumps({'sid': sid}))
+                elif message.startswith('42'):
+                    try:
+                        payload = json.loads(message[2:])
+                    except ValueError:
+                        continue
+                    event = payload[0] if payload else None
+                    data = payload[1] if len(payload) > 1 else None
+                    await self._handle_event(websocket, event, data, subscriptions, prices)
+        except ConnectionClosed:
+            pass
+        finally:
+            for task in (stream_task, disconnect_task):
+                if task is not None:
+                    task.cancel()
+            self._connections.discard(websocket)
+
+    async def _disconnect_later(self, websocket):
+        await asyncio.sleep(self.disconnect_after)
+        self.stats['forced_disconnects'] += 1
+        await websocket.close()
+
+
+async def _serve_forever(args):
+    server = FakePocketServer(
+        host=args.host, port=args.port, archive=args.archive, history_size=args.history,
+        latency=args.latency, jitter=args.jitter, loss=args.loss, disconnect_rate=args.disconnect_rate,
+        disconnect_after=args.disconnect_after, stream_interval=args.stream_interval,
+        seed=args.seed, tls=not args.no_tls
+    )
+    await server.start()
+    print(f"🧪 Фейковий сервер PocketOption: {server.url}")
+    print(f"   Для бота: POCKET_WS_URL={server.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(f"📊 Статистика: {server.stats}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальний фейковий сервер PocketOption для бенчмарків")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--archive', help="JSON архів свічок замість синтетичного ринку")
+    parser.add_argument('--history', type=int, default=100, help="Кількість свічок у відповіді на changeSymbol")
+    parser.add_argument('--latency', type=float, default=0.0, help="Затримка кожного повідомлення, сек")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Розкид затримки, сек")
+    parser.add_argument('--loss', type=float, default=0.0, help="Імовірність втрати повідомлення")
+    parser.add_argument('--disconnect-rate', type=float, default=0.0, help="Імовірність розриву після повідомлення")
+    parser.add_argument('--disconnect-after', type=float, default=None, help="Розрив з'єднання через N сек")
+    parser.add_argument('--stream-interval', type=float, default=1.0, help="Інтервал тіків, сек")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--no-tls', action='store_true', help="ws:// замість wss://")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(_serve_forever(args))
+    except KeyboardInterrupt:
+        pass
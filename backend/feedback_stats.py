@@ -0,0 +1,76 @@
+from datetime import datetime
+
+
+def _bucket():
+    return {'total': 0, 'success': 0}
+
+
+class FeedbackStats:
+    """
+    Лічильники відгуків, що оновлюються інкрементально (без перерахунку всієї історії):
+    загальні, по активу, по годині генерації сигналу (Київ) та по напрямку.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.success = 0
+        self.by_asset = {}
+        self.by_hour = {}
+        self.by_direction = {}
+
+    @staticmethod
+    def describe(signal_id, direction=None):
+        """Актив та година сигналу з ID формату ASSET_YYYYmmddHHMMSS"""
+        asset, hour = 'unknown', 'unknown'
+        if signal_id and '_' in signal_id:
+            asset, stamp = signal_id.rsplit('_', 1)
+            try:
+                hour = datetime.strptime(stamp, '%Y%m%d%H%M%S').strftime('%H')
+            except ValueError:
+                pass
+        return asset, hour, (direction or 'unknown').upper()
+
+    def record(self, entry):
+        """Врахування одного відгуку - O(1)"""
+        asset, hour, direction = self.describe(entry.get('signal_id', ''), entry.get('direction'))
+        success = 1 if entry.get('success') else 0
+        self.total += 1
+        self.success += success
+        for table, key in ((self.by_asset, asset), (self.by_hour, hour), (self.by_direction, direction)):
+            bucket = table.setdefault(key, _bucket())
+            bucket['total'] += 1
+            bucket['success'] += success
+
+    def accuracy(self):
+        return round(self.success / self.total * 100, 2) if self.total else 0
+
+    @classmethod
+    def rebuild(cls, feedback_history):
+        """Одноразовий перерахунок (міграція старого feedback.json без лічильників)"""
+        stats = cls()
+        for entry in feedback_history:
+            stats.record(entry)
+        return stats
+
+    def to_dict(self):
+        def with_accuracy(table):
+            return {key: dict(bucket, accuracy=round(bucket['success'] / bucket['total'] * 100, 2) if bucket['total'] else 0)
+                    for key, bucket in sorted(table.items())}
+
+        return {
+            'total': self.total,
+            'success': self.success,
+            'by_asset': with_accuracy(self.by_asset),
+            'by_hour': with_accuracy(self.by_hour),
+            'by_direction': with_accuracy(self.by_direction)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.total = data.get('total', 0)
+        stats.success = data.get('success', 0)
+        for name in ('by_asset', 'by_hour', 'by_direction'):
+            setattr(stats, name, {key: {'total': bucket.get('total', 0), 'success': bucket.get('success', 0)}
+                                  for key, bucket in data.get(name, {}).items()})
+        return stats
@@ -1,9 +1,17 @@
+import asyncio
 import json
 import logging
 import os
-from groq import Groq
+import random
+import httpx
+from groq import Groq, AsyncGroq, APIConnectionError, APITimeoutError, APIStatusError, RateLimitError
 from datetime import datetime, timedelta
 from config import Config
+from analysis_cache import AnalysisCache
+from rate_limiter import GroqRateLimiter
+from candle_frame import CandleFrame
+import metrics
+from indicators import candles_to_matrix, compute_indicators, format_indicators, volatility as volatility_metric
 
 logger = logging.getLogger("signal_bot")
 
@@ -17,43 +25,97 @@ class GroqAnalyzer:
             for var in proxy_vars:
                 os.environ.pop(var, None)
             
-            self.client = Groq(api_key=Config.GROQ_API_KEY)
+            self.client = Groq(api_key=Config.GROQ_API_KEY, base_url=Config.GROQ_BASE_URL or None)
             logger.info(f"✅ Groq AI ініціалізовано (модель: {Config.GROQ_MODEL})")
+        
+        # Кеш відповідей AI для повторних/перекриваючих запусків
+        self.cache = None
+        if Config.ANALYSIS_CACHE_ENABLED:
+            self.cache = AnalysisCache(
+                max_entries=Config.ANALYSIS_CACHE_MAX_ENTRIES,
+                ttl=Config.ANALYSIS_CACHE_TTL,
+                path=Config.ANALYSIS_CACHE_FILE if Config.ANALYSIS_CACHE_PERSIST else None
+            )
+        
+        # Спільний обмежувач запитів/токенів з адаптивною паралельністю
+        self.rate_limiter = None
+        if Config.RATE_LIMITER_ENABLED:
+            self.rate_limiter = GroqRateLimiter(
+                rpm=Config.GROQ_RPM,
+                tpm=Config.GROQ_TPM,
+                max_in_flight=Config.GROQ_MAX_IN_FLIGHT,
+                min_in_flight=Config.GROQ_MIN_IN_FLIGHT
+            )
+        
+        # Асинхронний клієнт створюється ліниво всередині event loop
+        self.async_client = None
+        self._http_client = None
+    
+    def _get_async_client(self):
+        """Асинхронний Groq клієнт зі спільним keep-alive пулом з'єднань"""
+        if self.async_client is None:
+            self._http_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(Config.GROQ_TIMEOUT, connect=Config.GROQ_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=Config.GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.GROQ_MAX_CONNECTIONS,
+                    keepalive_expiry=Config.GROQ_KEEPALIVE_EXPIRY
+                )
+            )
+            # Повтори робимо самі (з jitter), тому вбудовані вимикаємо
+            self.async_client = AsyncGroq(
+                api_key=Config.GROQ_API_KEY,
+                base_url=Config.GROQ_BASE_URL or None,
+                http_client=self._http_client,
+                max_retries=0
+            )
+            logger.info(f"✅ Async Groq клієнт ініціалізовано (пул: {Config.GROQ_MAX_CONNECTIONS} з'єднань)")
+        return self.async_client
+    
+    async def aclose(self):
+        """Закриття пулу HTTP з'єднань асинхронного клієнта"""
+        if self.async_client is not None:
+            try:
+                await self.async_client.close()
+            except Exception as e:
+                logger.warning(f"⚠️ Помилка закриття Groq клієнта: {e}")
+            self.async_client = None
+            self._http_client = None
     
     def calculate_volatility(self, candles):
         """Розрахунок волатильності"""
         if len(candles) < 10:
             return 0.0
         
-        recent_candles = candles[-10:]
-        closes = [candle.close for candle in recent_candles]
-        
-        if not closes:
-            return 0.0
-        
-        max_price = max(closes)
-        min_price = min(closes)
-        avg_price = sum(closes) / len(closes)
-        
-        if avg_price == 0:
-            return 0.0
-        
-        volatility = ((max_price - min_price) / avg_price) * 100
-        return round(volatility, 4)
+        closes = candles_to_matrix([candles], length=10)['close']
+        return float(volatility_metric(closes)[0])
     
-    def analyze_market(self, asset, candles_data, language='uk'):
-        """
-        Аналіз ринку через GPT OSS 120B AI з підтримкою мов
-        """
-        if not self.client:
-            logger.error("Groq AI не ініціалізовано.")
-            return None
-        
-        if not candles_data or len(candles_data) < 10:
-            logger.error(f"Недостатньо даних для {asset}")
-            return None
+    def _duration_for(self, volatility):
+        """Тривалість угоди за волатильністю (2-3 хвилини)"""
+        return 2 if volatility > 0.5 else 3
+    
+    def _format_candles(self, candles_data):
+        """Останні 8 свічок у текстовому вигляді"""
+        if isinstance(candles_data, CandleFrame):
+            window = candles_data[-8:]
+            return "".join(
+                f"{datetime.fromtimestamp(epoch).strftime('%H:%M')}: O={open_price:.5f} C={close_price:.5f}\n"
+                for epoch, open_price, close_price in zip(window.timestamps.tolist(), window.open.tolist(),
+                                                          window.close.tolist())
+            )
         
-        volatility = self.calculate_volatility(candles_data)
+        candles_str = ""
+        for i, candle in enumerate(candles_data[-8:]):
+            time_str = candle.timestamp.strftime('%H:%M') if hasattr(candle, 'timestamp') else f"{i+1}"
+            candles_str += f"{time_str}: O={candle.open:.5f} C={candle.close:.5f}\n"
+        return candles_str
+    
+    def _build_prompt(self, asset, candles_data, language='uk', indicators=None):
+        """Формування промпту для аналізу активу"""
+        if indicators is None:
+            indicators = compute_indicators([candles_data])[0]
+        volatility = indicators.get('volatility') or 0.0
+        indicators_str = format_indicators(indicators)
         now_kyiv = Config.get_kyiv_time()
         
         # Фіксований час входу через 2 хвилини
@@ -61,16 +123,10 @@ class GroqAnalyzer:
         entry_time = entry_time_dt.strftime('%H:%M')
         
         # Тривалість за волатильністю (2-3 хвилини)
-        if volatility > 0.5:
-            duration = 2
-        else:
-            duration = 3
+        duration = self._duration_for(volatility)
         
         # Формуємо дані про свічки
-        candles_str = ""
-        for i, candle in enumerate(candles_data[-8:]):
-            time_str = candle.timestamp.strftime('%H:%M') if hasattr(candle, 'timestamp') else f"{i+1}"
-            candles_str += f"{time_str}: O={candle.open:.5f} C={candle.close:.5f}\n"
+        candles_str = self._format_candles(candles_data)
         
         # Дуже простий промпт, як у робочому коді
         if language == 'ru':
@@ -82,8 +138,9 @@ class GroqAnalyzer:
 
 Последние свечи:
 {candles_str}
-
-Проанализируй RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, тренд и свечные паттерны.
+Индикаторы (рассчитаны по {len(candles_data)} свечам):
+{indicators_str}
+Учитывай приведённые значения RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд и свечные паттерны.
 Минимальная уверенность: 75%
 Длительность: {duration} мин
 Время входа: {entry_time}
@@ -108,8 +165,9 @@ class GroqAnalyzer:
 
 Останні свічки:
 {candles_str}
-
-Проаналізуй RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, тренд та свічкові патерни.
+Індикатори (розраховані по {len(candles_data)} свічках):
+{indicators_str}
+Врахуй наведені значення RSI, MACD, Bollinger Bands, EMA 9/21, Stochastic, ATR, тренд та свічкові патерни.
 Мінімальна впевненість: 75%
 Тривалість: {duration} хв
 Час входу: {entry_time}
@@ -126,52 +184,442 @@ class GroqAnalyzer:
 }}
 """
         
+        return prompt, volatility, now_kyiv
+    
+    def _build_messages(self, prompt):
+        """Повідомлення для chat completions"""
+        return [
+            {
+                "role": "system", 
+                "content": "Ти трейдер. Відповідай у JSON."
+            },
+            {
+                "role": "user", 
+                "content": prompt
+            }
+        ]
+    
+    def _parse_response(self, asset, response_text, volatility, now_kyiv):
+        """Розбір та перевірка відповіді AI"""
+        logger.debug(f"AI відповідь: {response_text[:200]}...")
+        
+        response = json.loads(response_text)
+        return self._validate_response(asset, response, volatility, now_kyiv)
+    
+    def _is_well_formed(self, entry):
+        """Чи має елемент відповіді всі поля коректних типів"""
+        if not isinstance(entry, dict):
+            return False
+        required_fields = ['asset', 'direction', 'confidence', 'entry_time', 'duration']
+        if any(field not in entry for field in required_fields):
+            return False
+        if entry['direction'] not in ('UP', 'DOWN') or not self._is_number(entry['confidence']):
+            return False
+        # Модель іноді повертає числа рядками ("3") - приводимо, інше відкидаємо
+        duration = entry['duration']
+        if isinstance(duration, str):
+            try:
+                duration = float(duration)
+            except ValueError:
+                return False
+        if not self._is_number(duration) or duration <= 0:
+            return False
+        entry['duration'] = duration
+        return isinstance(entry['entry_time'], str)
+    
+    @staticmethod
+    def _is_number(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+    
+    def _validate_response(self, asset, response, volatility, now_kyiv):
+        """Перевірка обов'язкових полів і впевненості одного сигналу"""
+        if not isinstance(response, dict):
+            logger.error(f"⚠️ Відповідь AI для {asset} не є об'єктом")
+            return None
+        
+        # Перевірка обов'язкових полів
+        required_fields = ['asset', 'direction', 'confidence', 'entry_time', 'duration']
+        for field in required_fields:
+            if field not in response:
+                logger.error(f"⚠️ Відповідь AI не містить поле {field}")
+                return None
+        
+        # Додаємо додаткові поля
+        response['generated_at'] = now_kyiv.isoformat()
+        response['volatility'] = volatility
+        response['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+        
+        # Перевірка типів полів та впевненості
+        if not self._is_well_formed(response):
+            logger.error(f"⚠️ Некоректні direction/confidence/duration/entry_time у відповіді AI для {asset}")
+            return None
+        confidence = response['confidence']
+        if confidence < Config.MIN_CONFIDENCE:
+            logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
+            return None
+        
+        logger.info(f"✅ AI повернув сигнал для {asset}: {response['direction']} ({confidence*100:.1f}%)")
+        return response
+    
+    def _cache_key(self, asset, candles_data, language):
+        if self.cache is None:
+            return None
+        return self.cache.make_key(asset, language, Config.GROQ_MODEL, candles_data,
+                                   decimals=Config.ANALYSIS_CACHE_PRICE_DECIMALS)
+    
+    def _from_cache(self, asset, cache_key, volatility, now_kyiv):
+        """Відповідь з кешу: (чи було влучання, розібраний сигнал)"""
+        if cache_key is None:
+            return False, None
+        response_text = self.cache.get(cache_key)
+        if response_text is None:
+            metrics.count('analysis_cache', result='miss')
+            return False, None
+        metrics.count('analysis_cache', result='hit')
+        logger.info(f"⚡ Відповідь AI для {asset} взято з кешу")
+        return True, self._parse_response(asset, response_text, volatility, now_kyiv)
+    
+    def _store_in_cache(self, cache_key, response_text):
+        if cache_key is None:
+            return
+        try:
+            json.loads(response_text)
+        except (TypeError, ValueError):
+            return
+        self.cache.put(cache_key, response_text)
+    
+    def flush_cache(self):
+        """Збереження кешу на диск та лог статистики"""
+        if self.cache is None:
+            return
+        self.cache.flush()
+        stats = self.cache.stats()
+        logger.info(f"🗃️ Кеш AI: {stats['hits']} влучань, {stats['misses']} промахів "
+                    f"({stats['hit_rate']}%), записів: {stats['entries']}")
+    
+    @metrics.timed('analyze')
+    def analyze_market(self, asset, candles_data, language='uk', indicators=None):
+        """
+        Аналіз ринку через GPT OSS 120B AI з підтримкою мов
+        """
+        if not self.client:
+            logger.error("Groq AI не ініціалізовано.")
+            return None
+        
+        if not candles_data or len(candles_data) < 10:
+            logger.error(f"Недостатньо даних для {asset}")
+            return None
+        
+        prompt, volatility, now_kyiv = self._build_prompt(asset, candles_data, language, indicators)
+        
+        cache_key = self._cache_key(asset, candles_data, language)
+        hit, cached = self._from_cache(asset, cache_key, volatility, now_kyiv)
+        if hit:
+            return cached
+        
         try:
             logger.info(f"🧠 Аналіз через {Config.GROQ_MODEL} для {asset}...")
             
             completion = self.client.chat.completions.create(
                 model=Config.GROQ_MODEL,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "Ти трейдер. Відповідай у JSON."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
+                messages=self._build_messages(prompt),
                 temperature=0.3,
                 max_tokens=800,
                 response_format={"type": "json_object"}
             )
+            self._count_usage(completion)
             
             response_text = completion.choices[0].message.content
-            logger.debug(f"AI відповідь: {response_text[:200]}...")
-            
-            response = json.loads(response_text)
-            
-            # Перевірка обов'язкових полів
-            required_fields = ['asset', 'direction', 'confidence', 'entry_time', 'duration']
-            for field in required_fields:
-                if field not in response:
-                    logger.error(f"⚠️ Відповідь AI не містить поле {field}")
-                    return None
-            
-            # Додаємо додаткові поля
-            response['generated_at'] = now_kyiv.isoformat()
-            response['volatility'] = volatility
-            response['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
-            
-            # Перевірка впевненості
-            confidence = response.get('confidence', 0)
-            if confidence < Config.MIN_CONFIDENCE:
-                logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
-                return None
+            self._store_in_cache(cache_key, response_text)
+            return self._parse_response(asset, response_text, volatility, now_kyiv)
             
-            logger.info(f"✅ AI повернув сигнал для {asset}: {response['direction']} ({confidence*100:.1f}%)")
-            return response
+        except Exception as e:
+            logger.error(f"❌ Groq AI error: {e}")
+            return None
+    
+    def _is_retryable(self, error):
+        """Чи варто повторювати запит після цієї помилки"""
+        if isinstance(error, (APIConnectionError, APITimeoutError)):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return False
+    
+    def _count_usage(self, completion):
+        """Фактичні токени відповіді у метриках циклу"""
+        usage = getattr(completion, 'usage', None)
+        if usage is None:
+            return
+        metrics.count('llm_tokens', getattr(usage, 'prompt_tokens', 0) or 0, kind='prompt')
+        metrics.count('llm_tokens', getattr(usage, 'completion_tokens', 0) or 0, kind='completion')
+    
+    def _estimate_tokens(self, messages, max_tokens):
+        """Груба оцінка токенів запиту (~4 символи на токен) плюс максимум відповіді"""
+        prompt_chars = sum(len(message['content']) for message in messages)
+        return prompt_chars // 4 + max_tokens
+    
+    def _retry_after(self, error):
+        """Значення Retry-After (секунди) з відповіді 429, якщо воно є"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+    
+    async def _create_completion_async(self, asset, messages, max_tokens=800):
+        """Асинхронний запит до Groq з повторами та експоненційною затримкою з jitter"""
+        client = self._get_async_client()
+        attempts = Config.GROQ_MAX_RETRIES + 1
+        estimated_tokens = self._estimate_tokens(messages, max_tokens)
+        
+        for attempt in range(1, attempts + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens)
+            
+            settled = {}
+            error = None
+            try:
+                metrics.count('llm_requests')
+                with metrics.span('llm_request'):
+                    completion = await client.chat.completions.create(
+                        model=Config.GROQ_MODEL,
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=max_tokens,
+                        response_format={"type": "json_object"}
+                    )
+                self._count_usage(completion)
+                usage = getattr(completion, 'usage', None)
+                settled = {'used_tokens': getattr(usage, 'total_tokens', None) or estimated_tokens}
+            except Exception as e:
+                error = e
+                metrics.count('llm_errors', status=getattr(e, 'status_code', None) or type(e).__name__)
+                settled = {
+                    'rate_limited': isinstance(e, RateLimitError),
+                    'retry_after': self._retry_after(e) if isinstance(e, RateLimitError) else None
+                }
+            finally:
+                # Рівно одне звільнення слота на спробу - і при скасуванні запиту таймаутом активу
+                if self.rate_limiter is not None:
+                    self.rate_limiter.release_nowait(estimated_tokens, **settled)
+            
+            if error is None:
+                return completion
+            
+            if attempt >= attempts or not self._is_retryable(error):
+                raise error
+            
+            # Full jitter: випадкова затримка в межах експоненційного вікна
+            backoff = min(Config.GROQ_RETRY_MAX_DELAY, Config.GROQ_RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+            delay = random.uniform(0, backoff)
+            retry_after = settled.get('retry_after')
+            if retry_after is not None and self.rate_limiter is None:
+                delay = max(delay, retry_after)
+            metrics.count('llm_retries')
+            logger.warning(f"🔁 Groq помилка для {asset} ({error}), повтор {attempt}/{attempts - 1} через {delay:.2f} сек")
+            await asyncio.sleep(delay)
+    
+    def log_rate_limit_usage(self):
+        """Лог поточного використання бюджету Groq"""
+        if self.rate_limiter is None:
+            return
+        usage = self.rate_limiter.usage()
+        logger.info(f"🚦 Groq бюджет: {usage['total_requests']} запитів, {usage['total_tokens']} токенів "
+                    f"(~{usage['avg_tokens_per_minute']}/хв з {usage['tokens_per_minute']}), "
+                    f"доступно {usage['requests_available']}/{usage['requests_per_minute']} запитів, "
+                    f"паралельність {usage['concurrency_limit']}, 429: {usage['rate_limited']}")
+    
+    @metrics.timed('analyze')
+    async def analyze_market_async(self, asset, candles_data, language='uk', indicators=None):
+        """
+        Неблокуючий аналіз ринку через AsyncGroq (спільний пул з'єднань, таймаути, повтори)
+        """
+        if not Config.GROQ_API_KEY:
+            logger.error("Groq AI не ініціалізовано.")
+            return None
+        
+        if not candles_data or len(candles_data) < 10:
+            logger.error(f"Недостатньо даних для {asset}")
+            return None
+        
+        prompt, volatility, now_kyiv = self._build_prompt(asset, candles_data, language, indicators)
+        
+        cache_key = self._cache_key(asset, candles_data, language)
+        hit, cached = self._from_cache(asset, cache_key, volatility, now_kyiv)
+        if hit:
+            return cached
+        
+        try:
+            logger.info(f"🧠 Async аналіз через {Config.GROQ_MODEL} для {asset}...")
+            
+            completion = await self._create_completion_async(asset, self._build_messages(prompt))
+            
+            response_text = completion.choices[0].message.content
+            self._store_in_cache(cache_key, response_text)
+            return self._parse_response(asset, response_text, volatility, now_kyiv)
             
         except Exception as e:
             logger.error(f"❌ Groq AI error: {e}")
             return None
+    
+    def _build_batch_prompt(self, items, language='uk'):
+        """Один промпт для кількох активів; items - список (asset, candles, indicators)"""
+        now_kyiv = Config.get_kyiv_time()
+        entry_time = (now_kyiv + timedelta(minutes=2)).strftime('%H:%M')
+        meta = {}
+        blocks = []
+        
+        for asset, candles_data, indicators in items:
+            if indicators is None:
+                indicators = compute_indicators([candles_data])[0]
+            volatility = indicators.get('volatility') or 0.0
+            duration = self._duration_for(volatility)
+            meta[asset] = volatility
+            
+            if language == 'ru':
+                blocks.append(
+                    f"### {asset}\nВолатильность: {volatility:.2f}%\nДлительность: {duration} мин\n"
+                    f"Последние свечи:\n{self._format_candles(candles_data)}"
+                    f"Индикаторы:\n{format_indicators(indicators)}"
+                )
+            else:
+                blocks.append(
+                    f"### {asset}\nВолатильність: {volatility:.2f}%\nТривалість: {duration} хв\n"
+                    f"Останні свічки:\n{self._format_candles(candles_data)}"
+                    f"Індикатори:\n{format_indicators(indicators)}"
+                )
+        
+        assets_block = "\n".join(blocks)
+        if language == 'ru':
+            prompt = f"""
+Таймфрейм: 1 минута
+Текущее время: {now_kyiv.strftime('%H:%M:%S')}
+Время входа: {entry_time}
+Минимальная уверенность: 75%
+
+Проанализируй каждый актив отдельно по приведённым свечам и индикаторам.
+
+{assets_block}
+Ответ в JSON: объект с массивом "signals", по одному элементу на каждый актив:
+{{
+    "signals": [
+        {{
+            "asset": "<актив>",
+            "direction": "UP или DOWN",
+            "confidence": 0.85,
+            "entry_time": "{entry_time}",
+            "duration": 3,
+            "reason": "Краткий анализ"
+        }}
+    ]
+}}
+"""
+        else:
+            prompt = f"""
+Таймфрейм: 1 хвилина
+Поточний час: {now_kyiv.strftime('%H:%M:%S')}
+Час входу: {entry_time}
+Мінімальна впевненість: 75%
+
+Проаналізуй кожен актив окремо за наведеними свічками та індикаторами.
+
+{assets_block}
+Відповідь у JSON: об'єкт з масивом "signals", по одному елементу на кожен актив:
+{{
+    "signals": [
+        {{
+            "asset": "<актив>",
+            "direction": "UP або DOWN",
+            "confidence": 0.85,
+            "entry_time": "{entry_time}",
+            "duration": 3,
+            "reason": "Короткий аналіз"
+        }}
+    ]
+}}
+"""
+        return prompt, meta, now_kyiv
+    
+    @metrics.timed('analyze_batch')
+    async def analyze_batch_async(self, items, language='uk'):
+        """
+        Пакетний аналіз: кілька активів в одному запиті до AI.
+        Кожен елемент відповіді перевіряється окремо; активи з некоректною або відсутньою
+        відповіддю (чи весь пакет, якщо JSON не розібрано) аналізуються поодинці.
+        Повертає dict asset -> сигнал або None.
+        """
+        results = {}
+        pending = []
+        
+        # Спочатку кеш, щоб не включати в пакет уже проаналізовані активи
+        for asset, candles_data, indicators in items:
+            if not candles_data or len(candles_data) < 10:
+                logger.error(f"Недостатньо даних для {asset}")
+                results[asset] = None
+                continue
+            
+            cache_key = self._cache_key(asset, candles_data, language)
+            if cache_key is not None:
+                volatility = (indicators or {}).get('volatility')
+                if volatility is None:
+                    volatility = self.calculate_volatility(candles_data)
+                hit, cached = self._from_cache(asset, cache_key, volatility, Config.get_kyiv_time())
+                if hit:
+                    results[asset] = cached
+                    continue
+            pending.append((asset, candles_data, indicators))
+        
+        if not pending:
+            return results
+        
+        if len(pending) == 1:
+            asset, candles_data, indicators = pending[0]
+            results[asset] = await self.analyze_market_async(asset, candles_data, language, indicators)
+            return results
+        
+        fallback = list(pending)
+        try:
+            prompt, meta, now_kyiv = self._build_batch_prompt(pending, language)
+            logger.info(f"🧠 Пакетний аналіз через {Config.GROQ_MODEL}: {len(pending)} активів")
+            
+            completion = await self._create_completion_async(
+                ", ".join(item[0] for item in pending),
+                self._build_messages(prompt),
+                max_tokens=min(4096, 300 * len(pending) + 200)
+            )
+            response = json.loads(completion.choices[0].message.content)
+            entries = response.get('signals') if isinstance(response, dict) else None
+            if not isinstance(entries, list):
+                raise ValueError("відповідь не містить масиву signals")
+            
+            entries_by_asset = {}
+            for entry in entries:
+                if isinstance(entry, dict) and entry.get('asset') in meta:
+                    entries_by_asset[entry['asset']] = entry
+            
+            fallback = []
+            for asset, candles_data, indicators in pending:
+                entry = entries_by_asset.get(asset)
+                if not self._is_well_formed(entry):
+                    logger.warning(f"⚠️ Пакет не містить коректної відповіді для {asset}")
+                    fallback.append((asset, candles_data, indicators))
+                    continue
+                
+                self._store_in_cache(self._cache_key(asset, candles_data, language), json.dumps(entry, ensure_ascii=False))
+                results[asset] = self._validate_response(asset, dict(entry), meta[asset], now_kyiv)
+            
+        except Exception as e:
+            logger.error(f"❌ Помилка пакетного аналізу, переходжу на поодинокі запити: {e}")
+        
+        if fallback:
+            logger.info(f"🔁 Поодинокий аналіз для {len(fallback)} активів: {[item[0] for item in fallback]}")
+            singles = await asyncio.gather(
+                *(self.analyze_market_async(asset, candles_data, language, indicators)
+                  for asset, candles_data, indicators in fallback)
+            )
+            for (asset, _, _), signal in zip(fallback, singles):
+                results[asset] = signal
+        
+        return results
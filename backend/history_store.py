@@ -0,0 +1,222 @@
+import gzip
+import io
+import json
+import logging
+import os
+from datetime import datetime
+
+logger = logging.getLogger("signal_bot")
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class HistoryStore:
+    """
+    Історія сигналів у вигляді append-only JSON-lines сегментів (один файл на день).
+    Закриті сегменти можна стискати (gzip/zstd); невеликий індекс index.json
+    дозволяє вибирати сегменти за часом та активом без читання всіх файлів.
+    """
+
+    INDEX_NAME = 'index.json'
+    EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+    def __init__(self, directory, compression='gzip'):
+        self.directory = str(directory)
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("⚠️ zstandard не встановлено, використовую gzip для архіву історії")
+            compression = 'gzip'
+        self.compression = compression if compression in self.EXTENSIONS else 'none'
+        self.index_path = os.path.join(self.directory, self.INDEX_NAME)
+        os.makedirs(self.directory, exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self):
+        try:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️ Індекс історії пошкоджено, перебудовую: {e}")
+        return self.rebuild_index()
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @property
+    def is_empty(self):
+        return not self.index['segments']
+
+    def _entry_time(self, entry):
+        value = entry.get('saved_at') or entry.get('generated_at')
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except Exception:
+            return None
+
+    def append(self, entries):
+        """Дописує записи у сегменти їхнього дня - O(кількість нових записів)"""
+        if not entries:
+            return 0
+
+        by_segment = {}
+        for entry in entries:
+            moment = self._entry_time(entry)
+            segment = moment.strftime('%Y-%m-%d') if moment else 'undated'
+            by_segment.setdefault(segment, []).append((entry, moment))
+
+        for segment, items in sorted(by_segment.items()):
+            info = self.index['segments'].get(segment)
+            if info is None:
+                info = {'file': f"history-{segment}.jsonl", 'count': 0, 'first': None, 'last': None,
+                        'assets': {}, 'sealed': False, 'compression': 'none'}
+                self.index['segments'][segment] = info
+
+            data = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n" for entry, _ in items)
+            self._write(os.path.join(self.directory, info['file']), info['compression'], data)
+
+            for entry, moment in items:
+                self._account(info, entry, moment)
+
+        # Сегменти попередніх днів більше не змінюються - закриваємо їх
+        dated = [segment for segment in by_segment if segment != 'undated']
+        if dated:
+            newest = max(dated)
+            for segment, info in self.index['segments'].items():
+                if segment < newest and segment != 'undated' and not info['sealed']:
+                    self._seal(segment)
+
+        self._save_index()
+        return len(entries)
+
+    def _account(self, info, entry, moment):
+        """Оновлення лічильників сегмента в індексі"""
+        info['count'] += 1
+        asset = entry.get('asset', 'unknown')
+        info['assets'][asset] = info['assets'].get(asset, 0) + 1
+        if moment:
+            ts = moment.timestamp()
+            info['first'] = ts if info['first'] is None else min(info['first'], ts)
+            info['last'] = ts if info['last'] is None else max(info['last'], ts)
+
+    def _write(self, path, compression, data):
+        raw = data.encode('utf-8')
+        if compression == 'gzip':
+            # gzip допускає кілька послідовних членів в одному файлі
+            with open(path, 'ab') as f:
+                f.write(gzip.compress(raw))
+        elif compression == 'zstd':
+            with open(path, 'ab') as f:
+                f.write(zstandard.ZstdCompressor().compress(raw))
+        else:
+            with open(path, 'ab') as f:
+                f.write(raw)
+
+    def _seal(self, segment):
+        """Закриття сегмента зі стисненням за налаштуванням"""
+        info = self.index['segments'][segment]
+        info['sealed'] = True
+        if self.compression == 'none' or info['compression'] != 'none':
+            return
+
+        source = os.path.join(self.directory, info['file'])
+        target_name = info['file'] + self.EXTENSIONS[self.compression]
+        target = os.path.join(self.directory, target_name)
+        try:
+            with open(source, 'rb') as f:
+                raw = f.read()
+            tmp_path = f"{target}.tmp"
+            with open(tmp_path, 'wb') as f:
+                if self.compression == 'gzip':
+                    f.write(gzip.compress(raw))
+                else:
+                    f.write(zstandard.ZstdCompressor().compress(raw))
+            os.replace(tmp_path, target)
+            os.remove(source)
+            info['file'] = target_name
+            info['compression'] = self.compression
+            logger.info(f"🗜️ Сегмент історії {segment} закрито і стиснено ({self.compression})")
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося стиснути сегмент історії {segment}: {e}")
+
+    def _read_segment(self, segment):
+        info = self.index['segments'][segment]
+        path = os.path.join(self.directory, info['file'])
+        if not os.path.exists(path):
+            return []
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if info['compression'] == 'gzip':
+            raw = gzip.decompress(raw)
+        elif info['compression'] == 'zstd':
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(raw), read_across_frames=True)
+            raw = reader.read()
+
+        entries = []
+        for line in raw.decode('utf-8').splitlines():
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+        return entries
+
+    def query(self, start=None, end=None, asset=None):
+        """Записи за проміжок часу (datetime) та/або активом; сегменти відбираються за індексом"""
+        start_ts = start.timestamp() if start else None
+        end_ts = end.timestamp() if end else None
+
+        results = []
+        for segment in sorted(self.index['segments']):
+            info = self.index['segments'][segment]
+            if asset and asset not in info['assets']:
+                continue
+            if start_ts is not None and info['last'] is not None and info['last'] < start_ts:
+                continue
+            if end_ts is not None and info['first'] is not None and info['first'] > end_ts:
+                continue
+
+            for entry in self._read_segment(segment):
+                if asset and entry.get('asset') != asset:
+                    continue
+                if start_ts is not None or end_ts is not None:
+                    moment = self._entry_time(entry)
+                    if moment is None:
+                        continue
+                    ts = moment.timestamp()
+                    if (start_ts is not None and ts < start_ts) or (end_ts is not None and ts > end_ts):
+                        continue
+                results.append(entry)
+        return results
+
+    def recent(self, limit):
+        """Останні limit записів (читаються лише найновіші сегменти)"""
+        collected = []
+        for segment in sorted(self.index['segments'], reverse=True):
+            collected = self._read_segment(segment) + collected
+            if len(collected) >= limit:
+                break
+        return collected[-limit:]
+
+    def rebuild_index(self):
+        """Відновлення індексу за файлами сегментів"""
+        self.index = {'segments': {}}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.startswith('history-') or '.jsonl' not in name or name.endswith('.tmp'):
+                continue
+            segment = name[len('history-'):name.index('.jsonl')]
+            compression = 'gzip' if name.endswith('.gz') else 'zstd' if name.endswith('.zst') else 'none'
+            self.index['segments'][segment] = {'file': name, 'count': 0, 'first': None, 'last': None,
+                                               'assets': {}, 'sealed': compression != 'none',
+                                               'compression': compression}
+            info = self.index['segments'][segment]
+            for entry in self._read_segment(segment):
+                self._account(info, entry, self._entry_time(entry))
+        self._save_index()
+        return self.index
@@ -0,0 +1,249 @@
+import numpy as np
+
+# Векторизовані технічні індикатори.
+# Усі функції працюють з 2-D масивами форми (активи, свічки): один прохід по
+# осі часу обробляє всі активи одночасно. Значення до "прогріву" індикатора - NaN.
+
+RSI_PERIOD = 14
+EMA_FAST = 9
+EMA_SLOW = 21
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BOLLINGER_PERIOD = 20
+BOLLINGER_STD = 2.0
+STOCHASTIC_K = 14
+STOCHASTIC_D = 3
+ATR_PERIOD = 14
+VOLATILITY_WINDOW = 10
+
+
+def candles_to_matrix(candle_lists, length=None):
+    """
+    Перетворення списків свічок кількох активів у 2-D масиви OHLC.
+    Ряди вирівнюються по останній свічці і обрізаються до спільної довжини.
+    """
+    if length is None:
+        length = min((len(candles) for candles in candle_lists), default=0)
+
+    rows = len(candle_lists)
+    matrix = {field: np.full((rows, length), np.nan) for field in ('open', 'high', 'low', 'close')}
+    if length == 0:
+        return matrix
+
+    for row, candles in enumerate(candle_lists):
+        window = candles[-length:]
+        offset = length - len(window)
+        for field, values in matrix.items():
+            column = getattr(window, field, None)
+            if isinstance(column, np.ndarray):
+                # CandleFrame: колонки вже є масивами - копіювання без обходу об'єктів
+                values[row, offset:] = column
+            else:
+                values[row, offset:] = [getattr(candle, field) for candle in window]
+    return matrix
+
+
+def _wilder(values, period, start=0):
+    """Згладжування Вайлдера (RMA) з ініціалізацією середнім перших period значень"""
+    out = np.full(values.shape, np.nan)
+    first = start + period - 1
+    if values.shape[1] <= first:
+        return out
+
+    out[:, first] = values[:, start:first + 1].mean(axis=1)
+    for t in range(first + 1, values.shape[1]):
+        out[:, t] = (out[:, t - 1] * (period - 1) + values[:, t]) / period
+    return out
+
+
+def ema(values, period, start=0):
+    """Експоненційна ковзна середня; start - індекс першого валідного значення"""
+    out = np.full(values.shape, np.nan)
+    first = start + period - 1
+    if values.shape[1] <= first:
+        return out
+
+    alpha = 2.0 / (period + 1)
+    out[:, first] = values[:, start:first + 1].mean(axis=1)
+    for t in range(first + 1, values.shape[1]):
+        out[:, t] = alpha * values[:, t] + (1 - alpha) * out[:, t - 1]
+    return out
+
+
+def sma(values, period):
+    """Проста ковзна середня"""
+    out = np.full(values.shape, np.nan)
+    if values.shape[1] < period:
+        return out
+    windows = np.lib.stride_tricks.sliding_window_view(values, period, axis=1)
+    out[:, period - 1:] = windows.mean(axis=2)
+    return out
+
+
+def rsi(close, period=RSI_PERIOD):
+    """RSI за Вайлдером"""
+    out = np.full(close.shape, np.nan)
+    if close.shape[1] <= period:
+        return out
+
+    delta = np.diff(close, axis=1)
+    gains = np.where(delta > 0, delta, 0.0)
+    losses = np.where(delta < 0, -delta, 0.0)
+
+    avg_gain = _wilder(gains, period)
+    avg_loss = _wilder(losses, period)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        values = 100.0 - 100.0 / (1.0 + rs)
+    # Без втрат RSI = 100, без руху взагалі - нейтральні 50
+    values = np.where(avg_loss == 0, np.where(avg_gain == 0, 50.0, 100.0), values)
+    values[np.isnan(avg_gain)] = np.nan
+
+    out[:, 1:] = values
+    return out
+
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, signal=MACD_SIGNAL):
+    """MACD лінія, сигнальна лінія та гістограма"""
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = ema(line, signal, start=slow - 1)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, period=BOLLINGER_PERIOD, num_std=BOLLINGER_STD):
+    """Смуги Боллінджера: верхня, середня, нижня та %B"""
+    middle = np.full(close.shape, np.nan)
+    std = np.full(close.shape, np.nan)
+    if close.shape[1] >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(close, period, axis=1)
+        middle[:, period - 1:] = windows.mean(axis=2)
+        std[:, period - 1:] = windows.std(axis=2)
+
+    upper = middle + num_std * std
+    lower = middle - num_std * std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent_b = np.where(upper != lower, (close - lower) / (upper - lower), 0.5)
+    percent_b[np.isnan(middle)] = np.nan
+    return upper, middle, lower, percent_b
+
+
+def stochastic(high, low, close, k_period=STOCHASTIC_K, d_period=STOCHASTIC_D):
+    """Стохастичний осцилятор %K та %D"""
+    k = np.full(close.shape, np.nan)
+    if close.shape[1] >= k_period:
+        highest = np.lib.stride_tricks.sliding_window_view(high, k_period, axis=1).max(axis=2)
+        lowest = np.lib.stride_tricks.sliding_window_view(low, k_period, axis=1).min(axis=2)
+        current = close[:, k_period - 1:]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k[:, k_period - 1:] = np.where(highest != lowest,
+                                           (current - lowest) / (highest - lowest) * 100.0, 50.0)
+    d = sma(np.nan_to_num(k, nan=0.0), d_period)
+    d[:, :k_period + d_period - 2] = np.nan
+    return k, d
+
+
+def atr(high, low, close, period=ATR_PERIOD):
+    """Average True Range за Вайлдером"""
+    prev_close = np.concatenate([close[:, :1], close[:, :-1]], axis=1)
+    true_range = np.maximum.reduce([
+        high - low,
+        np.abs(high - prev_close),
+        np.abs(low - prev_close)
+    ])
+    return _wilder(true_range, period)
+
+
+def volatility(close, window=VOLATILITY_WINDOW):
+    """Розмах закриттів останніх window свічок у відсотках від середнього (як calculate_volatility)"""
+    if close.shape[1] < window:
+        return np.zeros(close.shape[0])
+    recent = close[:, -window:]
+    avg = recent.mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = np.where(avg != 0, (recent.max(axis=1) - recent.min(axis=1)) / avg * 100.0, 0.0)
+    return np.round(values, 4)
+
+
+def _latest_values(candle_lists):
+    """Останні значення індикаторів для активів з однаковою кількістю свічок"""
+    m = candles_to_matrix(candle_lists)
+    close, high, low = m['close'], m['high'], m['low']
+    if close.shape[1] == 0:
+        return [{} for _ in candle_lists]
+
+    ema_fast = ema(close, EMA_FAST)
+    ema_slow = ema(close, EMA_SLOW)
+    macd_line, macd_signal, macd_hist = macd(close)
+    bb_upper, bb_middle, bb_lower, bb_percent = bollinger(close)
+    stoch_k, stoch_d = stochastic(high, low, close)
+
+    latest = {
+        'price': close[:, -1],
+        'rsi': rsi(close)[:, -1],
+        'ema_9': ema_fast[:, -1],
+        'ema_21': ema_slow[:, -1],
+        'ema_9_prev': ema_fast[:, -2] if close.shape[1] > 1 else np.full(close.shape[0], np.nan),
+        'ema_21_prev': ema_slow[:, -2] if close.shape[1] > 1 else np.full(close.shape[0], np.nan),
+        'macd': macd_line[:, -1],
+        'macd_signal': macd_signal[:, -1],
+        'macd_hist': macd_hist[:, -1],
+        'bb_upper': bb_upper[:, -1],
+        'bb_middle': bb_middle[:, -1],
+        'bb_lower': bb_lower[:, -1],
+        'bb_percent_b': bb_percent[:, -1],
+        'stoch_k': stoch_k[:, -1],
+        'stoch_d': stoch_d[:, -1],
+        'atr': atr(high, low, close)[:, -1],
+        'volatility': volatility(close),
+    }
+
+    results = []
+    for row in range(close.shape[0]):
+        results.append({
+            name: (None if np.isnan(values[row]) else float(values[row]))
+            for name, values in latest.items()
+        })
+    return results
+
+
+def compute_indicators(candle_lists):
+    """
+    Розрахунок усіх індикаторів для списку активів за один векторизований прохід.
+    Активи групуються за кількістю свічок (зазвичай група одна), щоб не обрізати історію.
+    Повертає список словників (по одному на актив) з останніми значеннями.
+    """
+    results = [None] * len(candle_lists)
+    groups = {}
+    for index, candles in enumerate(candle_lists):
+        groups.setdefault(len(candles), []).append(index)
+
+    for indexes in groups.values():
+        values = _latest_values([candle_lists[i] for i in indexes])
+        for index, value in zip(indexes, values):
+            results[index] = value
+    return results
+
+
+def format_indicators(values):
+    """Текстовий блок з індикаторами для промпту"""
+    if not values:
+        return ""
+
+    def fmt(name, digits=5):
+        value = values.get(name)
+        return "n/a" if value is None else f"{value:.{digits}f}"
+
+    trend = "n/a"
+    if values.get('ema_9') is not None and values.get('ema_21') is not None:
+        trend = "UP" if values['ema_9'] > values['ema_21'] else "DOWN"
+
+    return (
+        f"RSI(14): {fmt('rsi', 2)}\n"
+        f"MACD(12,26,9): {fmt('macd')} / signal {fmt('macd_signal')} / hist {fmt('macd_hist')}\n"
+        f"Bollinger(20,2): upper {fmt('bb_upper')} / middle {fmt('bb_middle')} / lower {fmt('bb_lower')} / %B {fmt('bb_percent_b', 2)}\n"
+        f"EMA 9/21: {fmt('ema_9')} / {fmt('ema_21')} (trend: {trend})\n"
+        f"Stochastic(14,3): %K {fmt('stoch_k', 2)} / %D {fmt('stoch_d', 2)}\n"
+        f"ATR(14): {fmt('atr')}\n"
+    )
@@ -0,0 +1,247 @@
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+logger = logging.getLogger("signal_bot")
+
+# Межі гістограм тривалості (секунди), як у клієнтів Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+PREFIX = "signal_bot"
+
+
+def percentile(sorted_values, q):
+    """Перцентиль за найближчим рангом для відсортованого списку"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Histogram:
+    """Кумулятивна гістограма за весь час роботи процесу"""
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+class MetricsRegistry:
+    """
+    Легкі спани та лічильники для етапів циклу генерації.
+    Гістограми накопичуються за весь час роботи процесу (для Prometheus),
+    вибірки поточного циклу - для p50/p95 у data/metrics.json.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.cycle_started = None
+        self.cycle_samples = {}
+        self.cycle_assets = {}
+        self.cycle_counters = {}
+
+    def begin_cycle(self):
+        self.cycle_started = time.time()
+        self.cycle_samples = {}
+        self.cycle_assets = {}
+        self.cycle_counters = {}
+
+    def observe(self, stage, seconds, asset=None):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = Histogram()
+        histogram.observe(seconds)
+        self.cycle_samples.setdefault(stage, []).append(seconds)
+        if asset:
+            per_asset = self.cycle_assets.setdefault(asset, {})
+            per_asset[stage] = per_asset.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def span(self, stage, asset=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, asset)
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+        self.cycle_counters[key] = self.cycle_counters.get(key, 0) + value
+
+    def cycle_state(self):
+        """Вибірки та лічильники поточного циклу для передачі з процесу-воркера"""
+        return {
+            'samples': self.cycle_samples,
+            'assets': self.cycle_assets,
+            'counters': list(self.cycle_counters.items()),
+        }
+
+    def merge(self, state):
+        """Додавання циклу процесу-воркера до метрик батьківського процесу"""
+        for stage, samples in state['samples'].items():
+            for seconds in samples:
+                self.observe(stage, seconds)
+        for asset, stages in state['assets'].items():
+            per_asset = self.cycle_assets.setdefault(asset, {})
+            for stage, seconds in stages.items():
+                per_asset[stage] = per_asset.get(stage, 0.0) + seconds
+        for (name, labels), value in state['counters']:
+            self.count(name, value, **dict(labels))
+
+    # --- Звіти ---
+
+    def stage_summary(self):
+        summary = {}
+        for stage, samples in sorted(self.cycle_samples.items()):
+            ordered = sorted(samples)
+            summary[stage] = {
+                'count': len(ordered),
+                'total': round(sum(ordered), 4),
+                'p50': round(percentile(ordered, 0.5), 4),
+                'p95': round(percentile(ordered, 0.95), 4),
+                'max': round(ordered[-1], 4),
+            }
+        return summary
+
+    def _counters_dict(self, counters):
+        result = {}
+        for (name, labels), value in sorted(counters.items()):
+            key = name if not labels else name + '{' + ','.join(f"{k}={v}" for k, v in labels) + '}'
+            result[key] = value
+        return result
+
+    def snapshot(self):
+        """Компактний звіт поточного циклу"""
+        finished = time.time()
+        return {
+            'generated_at': Config.get_kyiv_time().isoformat(),
+            'cycle_duration': round(finished - self.cycle_started, 3) if self.cycle_started else None,
+            'stages': self.stage_summary(),
+            'assets': {asset: {stage: round(value, 4) for stage, value in stages.items()}
+                       for asset, stages in sorted(self.cycle_assets.items())},
+            'counters': self._counters_dict(self.cycle_counters),
+        }
+
+    def prometheus_text(self):
+        """Текстовий формат експозиції Prometheus"""
+        lines = [
+            f"# HELP {PREFIX}_stage_duration_seconds Тривалість етапів циклу генерації",
+            f"# TYPE {PREFIX}_stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{PREFIX}_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append(f"# HELP {PREFIX}_cycle_stage_seconds p50/p95 етапів останнього циклу")
+        lines.append(f"# TYPE {PREFIX}_cycle_stage_seconds gauge")
+        for stage, stats in self.stage_summary().items():
+            for key, quantile in (('p50', '0.5'), ('p95', '0.95')):
+                lines.append(f'{PREFIX}_cycle_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+
+        names = sorted({name for name, _ in self.counters})
+        for name in names:
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for (counter_name, labels), value in sorted(self.counters.items()):
+                if counter_name != name:
+                    continue
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{PREFIX}_{name}_total{{{label_text}}} {value}" if label_text
+                             else f"{PREFIX}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path=None, prom_path=None, history_size=None):
+        """Запис data/metrics.json (з короткою історією циклів для графіків) та файлу Prometheus"""
+        from data_handler import write_json_atomic
+
+        json_path = json_path or Config.METRICS_FILE
+        prom_path = prom_path or Config.METRICS_PROM_FILE
+        history_size = Config.METRICS_HISTORY if history_size is None else history_size
+        snapshot = self.snapshot()
+
+        history = []
+        try:
+            if os.path.exists(json_path):
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    history = json.load(f).get('history', [])
+        except (ValueError, OSError):
+            history = []
+        history.append({
+            'generated_at': snapshot['generated_at'],
+            'cycle_duration': snapshot['cycle_duration'],
+            'stages': {stage: {'p50': stats['p50'], 'p95': stats['p95']}
+                       for stage, stats in snapshot['stages'].items()},
+        })
+        snapshot['history'] = history[-history_size:] if history_size > 0 else []
+
+        write_json_atomic(json_path, snapshot, indent=None)
+        tmp_path = f"{prom_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, prom_path)
+        return snapshot
+
+    def log_summary(self):
+        for stage, stats in self.stage_summary().items():
+            logger.info(f"⏱️ {stage}: {stats['count']}× p50={stats['p50']:.3f}с p95={stats['p95']:.3f}с "
+                        f"max={stats['max']:.3f}с")
+
+
+registry = MetricsRegistry()
+
+
+def span(stage, asset=None):
+    return registry.span(stage, asset)
+
+
+def count(name, value=1, **labels):
+    registry.count(name, value, **labels)
+
+
+def timed(stage):
+    """Декоратор: тривалість виклику (sync або async) як спан етапу; аргумент asset - мітка активу"""
+    def decorate(function):
+        parameters = list(inspect.signature(function).parameters)
+        asset_index = parameters.index('asset') if 'asset' in parameters else None
+
+        def asset_of(args, kwargs):
+            if asset_index is None:
+                return None
+            if 'asset' in kwargs:
+                return kwargs['asset']
+            return args[asset_index] if len(args) > asset_index else None
+
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                with registry.span(stage, asset_of(args, kwargs)):
+                    return await function(*args, **kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with registry.span(stage, asset_of(args, kwargs)):
+                    return function(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -1,7 +1,13 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import time
 from config import Config
+from candle_store import CandleStore
+from candle_frame import CandleFrame
+from synthetic_market import SyntheticMarket
+from connection_pool import PocketConnectionPool
+from connection_state import ManagedConnection
+import metrics
 
 # Налаштуємо логування для pocketoptionapi_async - відключимо DEBUG логи
 logging.getLogger("pocketoptionapi_async").setLevel(logging.WARNING)
@@ -10,15 +16,41 @@ logging.getLogger("pocketoptionapi_async.client").setLevel(logging.WARNING)
 
 logger = logging.getLogger("signal_bot")
 
+# Власні адреси POCKET_WS_URL, зареєстровані як регіони бібліотеки (один раз на адресу в процесі)
+_custom_regions = {}
+
+
+def _custom_region(url):
+    """
+    Назва регіону для власної адреси. Бібліотека приймає лише назви регіонів і не має
+    публічного способу додати адресу, тож реєструємо її в Regions._REGIONS під окремою назвою
+    """
+    if url in _custom_regions:
+        return _custom_regions[url]
+    from pocketoptionapi_async.constants import REGIONS
+    regions = getattr(REGIONS, '_REGIONS', None)
+    if not isinstance(regions, dict):
+        logger.warning("⚠️ pocketoptionapi_async не має Regions._REGIONS - POCKET_WS_URL ігнорується, "
+                       "підключення до стандартних регіонів")
+        return None
+    name = f"CUSTOM_{len(_custom_regions) + 1}"
+    regions[name] = url
+    _custom_regions[url] = name
+    return name
+
+
 class PocketOptionClient:
     def __init__(self):
         self.client = None
+        self.pool = None  # Пул сесій при POCKET_POOL_SIZE > 1
+        self.connection = None  # ManagedConnection одиночного клієнта
         self.connected = False
         self._initialized = False
-        self._connection_attempts = 0
-        self._max_attempts = 3
+        self._max_attempts = Config.POCKET_CONNECT_ATTEMPTS
         self._last_connection_time = None
-        self._reconnection_delay = 5  # секунд
+        self._reconnection_delay = Config.POCKET_RECONNECT_MAX_DELAY  # Верхня межа backoff, секунд
+        self.candle_store = CandleStore(Config.CANDLE_STORE_CAPACITY) if Config.CANDLE_STORE_ENABLED else None
+        self.synthetic_market = SyntheticMarket(Config.SYNTHETIC_SEED)
     
     async def initialize(self):
         if self._initialized:
@@ -41,12 +73,28 @@ class PocketOptionClient:
                 logger.info("ℹ️ Встановіть бібліотеку: pip install pocketoptionapi-async==2.0.1")
                 return self
             
-            # Створюємо клієнта з вимкненим детальним логуванням
-            self.client = AsyncPocketOptionClient(
-                ssid=ssid,
-                is_demo=Config.POCKET_DEMO,
-                enable_logging=False  # ← ВИМКНУТИ детальне логування!
-            )
+            def create_client():
+                # Створюємо клієнта з вимкненим детальним логуванням
+                # Перепідключенням керує ManagedConnection, вбудоване (з паузами 2+ сек) вимикаємо
+                client = AsyncPocketOptionClient(
+                    ssid=ssid,
+                    is_demo=Config.POCKET_DEMO,
+                    auto_reconnect=False,
+                    enable_logging=False  # ← ВИМКНУТИ детальне логування!
+                )
+                if self.candle_store is not None:
+                    # Потік свічок/тіків оновлює кільцеві буфери між запитами
+                    client.add_event_callback('stream_update', self.candle_store.on_stream_update)
+                return client
+            
+            if Config.POCKET_POOL_SIZE > 1:
+                self.pool = PocketConnectionPool(Config.POCKET_POOL_SIZE, create_client, self._managed)
+                self.client = self.pool.sessions[0].client
+                logger.info(f"🔀 Пул з {self.pool.size} сесій PocketOption")
+            else:
+                self.client = create_client()
+                self.connection = self._managed(self.client)
+                self.client.add_event_callback('disconnected', lambda *_: self._on_disconnected())
             
             self._initialized = True
             logger.info("✅ Клієнт ініціалізовано")
@@ -58,8 +106,53 @@ class PocketOptionClient:
             logger.error(f"Деталі: {traceback.format_exc()}")
             return self
     
+    def _regions(self):
+        """Регіони для підключення: None - стандартні регіони бібліотеки"""
+        if not Config.POCKET_WS_URL:
+            return None
+        region = _custom_region(Config.POCKET_WS_URL)
+        return [region] if region else None
+    
+    async def _open_session(self, client):
+        """
+        Рукостискання та автентифікація (client.connect повертається після auth),
+        далі чекаємо відповідь на getBalance як подію готовності - без фіксованої паузи
+        """
+        balance_ready = asyncio.Event()
+        on_balance = lambda *_: balance_ready.set()
+        client.add_event_callback('balance_updated', on_balance)
+        try:
+            if not await client.connect(regions=self._regions()):
+                return False
+            try:
+                await asyncio.wait_for(balance_ready.wait(), timeout=Config.POCKET_READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Баланс не надійшов за {Config.POCKET_READY_TIMEOUT} сек, сесія автентифікована")
+            return client.is_connected
+        finally:
+            client.remove_event_callback('balance_updated', on_balance)
+    
+    def _managed(self, client, name="PocketOption"):
+        """Машина станів з'єднання з повторами, ping та відновленням підписок"""
+        return ManagedConnection(
+            client, self._open_session, name=name,
+            max_attempts=self._max_attempts,
+            base_delay=Config.POCKET_RECONNECT_BASE_DELAY,
+            max_delay=self._reconnection_delay,
+            attempt_timeout=Config.POCKET_CONNECT_TIMEOUT,
+            ping_timeout=Config.POCKET_PING_TIMEOUT
+        )
+    
+    def _on_connected(self):
+        self.connected = True
+        self._last_connection_time = time.time()
+        if self.candle_store is not None:
+            # Під час відсутності з'єднання могли бути пропущені свічки
+            self.candle_store.mark_all_for_repair()
+    
+    @metrics.timed('connect')
     async def connect(self):
-        """Метод підключення до PocketOption"""
+        """Підключення до PocketOption (повтори з backoff; паралельні виклики чекають одну спробу)"""
         try:
             if not self._initialized:
                 await self.initialize()
@@ -68,32 +161,27 @@ class PocketOptionClient:
                 logger.error("❌ Клієнт не ініціалізований")
                 return False
             
-            logger.info("🔗 Підключення до PocketOption...")
+            if self.pool is not None:
+                logger.info(f"🔗 Підключення {self.pool.size} сесій PocketOption...")
+                if await self.pool.connect() > 0:
+                    self._on_connected()
+                else:
+                    self.connected = False
+                return self.connected
             
-            # Спробуємо підключитися
-            try:
-                await self.client.connect()
-                logger.info("✅ Виклик connect() успішний")
-                await asyncio.sleep(2)  # Чекаємо на підключення
-            except Exception as e:
-                logger.error(f"❌ Помилка при виклику connect(): {e}")
+            logger.info("🔗 Підключення до PocketOption...")
+            if not await self.connection.connect():
+                self.connected = False
                 return False
             
-            # Спробуємо отримати баланс - це найкраща перевірка підключення
+            self._on_connected()
+            logger.info(f"✅ Успішно підключено до PocketOption за {self.connection.last_connect_seconds:.2f} сек")
             try:
-                logger.info("🔄 Перевірка підключення через баланс...")
                 balance = await self.client.get_balance()
-                if balance and hasattr(balance, 'balance'):
-                    self.connected = True
-                    logger.info(f"✅ Успішно підключено до PocketOption!")
-                    logger.info(f"💰 Баланс: {balance.balance} {balance.currency}")
-                    return True
-                else:
-                    logger.error("❌ Баланс не отримано або неправильний формат")
-                    return False
+                logger.info(f"💰 Баланс: {balance.balance} {balance.currency}")
             except Exception as e:
-                logger.error(f"❌ Не вдалося отримати баланс: {e}")
-                return False
+                logger.warning(f"⚠️ Баланс недоступний: {e}")
+            return True
         
         except Exception as e:
             logger.error(f"❌ Помилка підключення: {e}")
@@ -102,6 +190,29 @@ class PocketOptionClient:
             self.connected = False
             return False
     
+    async def ensure_connected(self):
+        """Активне з'єднання між циклами: дешевий ping, перепідключення лише якщо він не пройшов"""
+        if not self._initialized or not self.client:
+            return await self.connect()
+        
+        if self.pool is not None:
+            live = await self.pool.ensure()
+            if live > 0:
+                self.connected = True
+                logger.info(f"♻️ Використовую активні сесії ({live}/{self.pool.size})")
+                return True
+            self.connected = False
+            return False
+        
+        if await self.connection.is_alive():
+            self.connected = True
+            logger.info("♻️ Використовую активне підключення (ping ok)")
+            return True
+        
+        self.connected = False
+        return await self.connect()
+    
+    @metrics.timed('get_candles')
     async def get_candles(self, asset, timeframe, count=50):
         """Отримання свічок"""
         try:
@@ -114,87 +225,118 @@ class PocketOptionClient:
                     logger.error(f"❌ Не вдалося підключитися для {asset}")
                     # У режимі демо повертаємо тестові дані
                     if Config.POCKET_DEMO:
-                        return await self._get_mock_candles(count)
+                        return await self._get_mock_candles(asset_clean, timeframe, count)
                     return None
             
-            logger.info(f"📊 Запит свічок для {asset_clean}...")
-            candles = await self.client.get_candles(
-                asset=asset_clean,
-                timeframe=timeframe,
-                count=count
-            )
+            if self.candle_store is not None:
+                candles = await self._get_candles_from_store(asset_clean, timeframe, count)
+            else:
+                candles = await self._fetch_candles(asset_clean, timeframe, count)
             
             if not candles:
-                logger.warning(f"⚠️ Не отримано свічок для {asset_clean}")
                 # У режимі демо повертаємо тестові дані
                 if Config.POCKET_DEMO:
-                    return await self._get_mock_candles(count)
+                    return await self._get_mock_candles(asset_clean, timeframe, count)
                 return None
             
-            # Перевіряємо, чи свічки містять реальні дані
-            if len(candles) > 0:
-                first_candle = candles[0]
-                if hasattr(first_candle, 'close'):
-                    if first_candle.close == 0 or first_candle.open == 0:
-                        logger.warning(f"⚠️ Отримані нульові дані для {asset_clean}")
-                        # У режимі демо повертаємо тестові дані
-                        if Config.POCKET_DEMO:
-                            return await self._get_mock_candles(count)
-                        return None
-            
             logger.info(f"✅ Отримано {len(candles)} коректних свічок для {asset_clean}")
-            return candles
+            # Єдине перетворення на межі клієнта: далі свічки йдуть як колонкові масиви
+            return CandleFrame.from_candles(candles, asset_clean, timeframe)
             
         except Exception as e:
             logger.error(f"❌ Помилка отримання свічок для {asset}: {e}")
             # У режимі демо повертаємо тестові дані
             if Config.POCKET_DEMO:
-                return await self._get_mock_candles(count)
+                return await self._get_mock_candles(asset_clean, timeframe, count)
             return None
     
-    async def _get_mock_candles(self, count=50):
-        """Повернення тестових свічок для демо-режиму"""
-        import random
-        from collections import namedtuple
+    async def _fetch_candles(self, asset_clean, timeframe, count):
+        """Запит свічок через мережу з перевіркою на нульові дані"""
+        logger.info(f"📊 Запит {count} свічок для {asset_clean}...")
+        if self.pool is not None:
+            try:
+                candles = await self.pool.get_candles(asset_clean, timeframe, count)
+            finally:
+                self.connected = bool(self.pool.live_sessions)
+        else:
+            try:
+                candles = await self.client.get_candles(
+                    asset=asset_clean,
+                    timeframe=timeframe,
+                    count=count
+                )
+            except Exception:
+                if not self.client.is_connected:
+                    self._on_disconnected()
+                raise
+            self.connection.subscribe(asset_clean, timeframe)
         
-        logger.info("🔄 Генерую тестові свічки для демо-режиму...")
+        if not candles:
+            logger.warning(f"⚠️ Не отримано свічок для {asset_clean}")
+            return None
         
-        Candle = namedtuple('Candle', ['timestamp', 'open', 'high', 'low', 'close'])
-        now = datetime.now()
-        candles = []
+        # Перевіряємо, чи свічки містять реальні дані
+        first_candle = candles[0]
+        if hasattr(first_candle, 'close'):
+            if first_candle.close == 0 or first_candle.open == 0:
+                logger.warning(f"⚠️ Отримані нульові дані для {asset_clean}")
+                return None
         
-        base_price = 150.0
+        return candles
+    
+    async def _get_candles_from_store(self, asset_clean, timeframe, count):
+        """Свічки з кільцевого буфера: повний backfill один раз, далі лише нові свічки"""
+        store = self.candle_store
+        missing = store.missing_candles(asset_clean, timeframe)
         
-        for i in range(count):
-            timestamp = now - timedelta(minutes=2 * (count - i))
-            
-            # Створюємо реалістичні коливання ціни
-            change = random.uniform(-0.5, 0.5)
-            open_price = base_price + random.uniform(-1, 1)
-            close_price = open_price + change
-            
-            high_price = max(open_price, close_price) + random.uniform(0, 0.3)
-            low_price = min(open_price, close_price) - random.uniform(0, 0.3)
-            
-            candle = Candle(
-                timestamp=timestamp,
-                open=round(open_price, 5),
-                high=round(high_price, 5),
-                low=round(low_price, 5),
-                close=round(close_price, 5)
-            )
-            candles.append(candle)
-            
-            base_price = close_price
+        if missing is None or store.size(asset_clean, timeframe) < count:
+            fetch_count = max(count, store.size(asset_clean, timeframe))
+            logger.info(f"📥 Backfill {fetch_count} свічок для {asset_clean}")
+        elif missing == 0 and store.is_live(asset_clean, timeframe):
+            fetch_count = 0
+        else:
+            # +1, щоб оновити останню незакриту свічку
+            fetch_count = min(missing + 1, store.capacity)
+            logger.info(f"🩹 Дозавантаження {fetch_count} свічок для {asset_clean}")
+        
+        if fetch_count:
+            candles = await self._fetch_candles(asset_clean, timeframe, fetch_count)
+            if candles:
+                store.merge(asset_clean, timeframe, candles)
+            elif store.size(asset_clean, timeframe) < count:
+                return None
+        else:
+            logger.info(f"⚡ Свічки {asset_clean} з потоку, без мережевого запиту")
         
+        return store.get_view(asset_clean, timeframe, count)
+    
+    async def _get_mock_candles(self, asset, timeframe, count=50):
+        """Тестові свічки для демо-режиму з синтетичного ринку"""
+        logger.info("🔄 Генерую тестові свічки для демо-режиму...")
+        candles = self.synthetic_market.generate(asset, timeframe, count)
         logger.info(f"✅ Згенеровано {len(candles)} тестових свічок")
         return candles
     
+    def _on_disconnected(self):
+        # Наступний get_candles/цикл підключиться заново через ManagedConnection (з backoff)
+        self.connected = False
+        if self.connection is not None:
+            self.connection.mark_down()
+    
+    def log_connection_stats(self):
+        """Статистика сесій пулу: запити, одночасні запити, затримка"""
+        if self.pool is not None:
+            self.pool.log_stats()
+    
     async def disconnect(self):
-        if self.client:
+        if self.pool is not None:
+            await self.pool.disconnect()
+            self.connected = False
+            logger.info("✅ Відключено всі сесії PocketOption")
+        elif self.client:
             try:
-                await self.client.disconnect()
                 self.connected = False
+                await self.connection.close()
                 logger.info("✅ Відключено від PocketOption")
             except Exception as e:
                 logger.warning(f"⚠️ Помилка при відключенні: {e}")
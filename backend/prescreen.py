@@ -0,0 +1,142 @@
+import logging
+from config import Config
+from data_handler import write_json_atomic
+
+logger = logging.getLogger("signal_bot")
+
+
+class PrescreenRule:
+    """
+    Базове правило попереднього відбору.
+    kind='gate' - обов'язкова умова, kind='setup' - достатньо хоча б одного сетапу.
+    """
+    name = "rule"
+    kind = "setup"
+
+    def check(self, indicators):
+        """Повертає (пройдено, причина); базове правило нічого не відсікає"""
+        return True, "без умов"
+
+
+class VolatilityFloorRule(PrescreenRule):
+    """Пропускає тільки ринок з волатильністю не нижче порогу"""
+    name = "volatility"
+    kind = "gate"
+
+    def __init__(self, min_volatility):
+        self.min_volatility = min_volatility
+
+    def check(self, indicators):
+        volatility = indicators.get('volatility') or 0.0
+        if volatility < self.min_volatility:
+            return False, f"волатильність {volatility:.4f}% < {self.min_volatility}%"
+        return True, f"волатильність {volatility:.4f}%"
+
+
+class EmaCrossRule(PrescreenRule):
+    """Перетин EMA 9/21 на останній свічці або достатній розрив між ними"""
+    name = "ema_cross"
+
+    def __init__(self, min_spread):
+        self.min_spread = min_spread
+
+    def check(self, indicators):
+        fast, slow = indicators.get('ema_9'), indicators.get('ema_21')
+        fast_prev, slow_prev = indicators.get('ema_9_prev'), indicators.get('ema_21_prev')
+        price = indicators.get('price')
+        if fast is None or slow is None:
+            return False, "EMA недоступні"
+
+        if fast_prev is not None and slow_prev is not None:
+            if (fast_prev - slow_prev) * (fast - slow) < 0:
+                return True, f"перетин EMA 9/21 ({'UP' if fast > slow else 'DOWN'})"
+
+        if price and self.min_spread > 0:
+            spread = abs(fast - slow) / price * 100
+            if spread >= self.min_spread:
+                return True, f"розрив EMA 9/21 {spread:.4f}%"
+        return False, "немає перетину EMA 9/21"
+
+
+class RsiExtremesRule(PrescreenRule):
+    """RSI у зоні перекупленості або перепроданості"""
+    name = "rsi_extremes"
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def check(self, indicators):
+        value = indicators.get('rsi')
+        if value is None:
+            return False, "RSI недоступний"
+        if value <= self.low:
+            return True, f"RSI {value:.1f} <= {self.low}"
+        if value >= self.high:
+            return True, f"RSI {value:.1f} >= {self.high}"
+        return False, f"RSI {value:.1f} в нейтральній зоні"
+
+
+# Реєстр правил: назва -> фабрика, що будує правило з Config
+RULES = {
+    'volatility': lambda: VolatilityFloorRule(Config.PRESCREEN_MIN_VOLATILITY),
+    'ema_cross': lambda: EmaCrossRule(Config.PRESCREEN_EMA_SPREAD),
+    'rsi_extremes': lambda: RsiExtremesRule(Config.PRESCREEN_RSI_LOW, Config.PRESCREEN_RSI_HIGH),
+}
+
+
+def register_rule(name, factory):
+    """Реєстрація власного правила (factory повертає екземпляр PrescreenRule)"""
+    RULES[name] = factory
+
+
+class Prescreener:
+    """Локальний відбір активів перед зверненням до AI"""
+
+    def __init__(self, rule_names=None):
+        rule_names = rule_names if rule_names is not None else Config.PRESCREEN_RULES
+        self.rules = []
+        for name in rule_names:
+            factory = RULES.get(name)
+            if factory is None:
+                logger.warning(f"⚠️ Невідоме правило відбору: {name}")
+                continue
+            self.rules.append(factory())
+        self.results = {}
+
+    def evaluate(self, asset, indicators):
+        """Повертає (пройдено, причини) і запам'ятовує результат для звіту"""
+        if not self.rules:
+            return True, []
+
+        gates_passed = True
+        setups = []
+        reasons = []
+        for rule in self.rules:
+            passed, reason = rule.check(indicators or {})
+            reasons.append(f"{rule.name}: {reason}")
+            if rule.kind == 'gate':
+                gates_passed = gates_passed and passed
+            else:
+                setups.append(passed)
+
+        passed = gates_passed and (not setups or any(setups))
+        self.results[asset] = {'passed': passed, 'reasons': reasons}
+        return passed, reasons
+
+    def skipped(self):
+        return {asset: result['reasons'] for asset, result in self.results.items() if not result['passed']}
+
+    def reset(self):
+        self.results = {}
+
+    def save_report(self, path, timestamp):
+        """Запис причин пропуску активів за цикл"""
+        try:
+            write_json_atomic(path, {
+                'generated_at': timestamp,
+                'checked': len(self.results),
+                'skipped': self.skipped()
+            })
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти звіт відбору: {e}")
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import Config
+import metrics
+
+logger = logging.getLogger("signal_bot")
+
+# Стан процесу-воркера: власний event loop і генератор (з'єднання живе між циклами)
+_worker_loop = None
+_worker_generator = None
+
+
+def worker_count():
+    return Config.PROCESS_WORKERS if Config.PROCESS_WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def partition(assets, shards):
+    """Рівномірний розподіл активів між процесами (по черзі)"""
+    shards = max(1, min(shards, len(assets)))
+    return [assets[index::shards] for index in range(shards)]
+
+
+def _config_snapshot(workers):
+    """Налаштування батьківського процесу для воркерів (spawn не успадковує змін у Config)"""
+    values = {name: value for name, value in vars(Config).items() if name.isupper()}
+    # Ліміти тарифу Groq спільні для всіх процесів - ділимо між воркерами
+    values['GROQ_RPM'] = max(1, Config.GROQ_RPM // workers)
+    values['GROQ_TPM'] = max(1, Config.GROQ_TPM // workers)
+    values['GROQ_MAX_IN_FLIGHT'] = max(1, Config.GROQ_MAX_IN_FLIGHT // workers)
+    values['GROQ_MIN_IN_FLIGHT'] = min(Config.GROQ_MIN_IN_FLIGHT, values['GROQ_MAX_IN_FLIGHT'])
+    # Усередині шарду активи обробляються паралельно; файли пише лише батьківський процес
+    values['EXECUTION_MODE'] = 'concurrent'
+    values['ANALYSIS_CACHE_PERSIST'] = False
+    return values
+
+
+def _library_assets():
+    """Активи, зареєстровані в бібліотеці PocketOption під час роботи батьківського процесу"""
+    try:
+        from pocketoptionapi_async.constants import ASSETS
+    except ImportError:
+        return {}
+    return dict(ASSETS)
+
+
+def _init_worker(values, library_assets, log_level):
+    global _worker_loop
+    for name, value in values.items():
+        setattr(Config, name, value)
+    if library_assets:
+        from pocketoptionapi_async.constants import ASSETS
+        ASSETS.update(library_assets)
+
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s - %(processName)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    # Виконується при штатному завершенні процесу-воркера (shutdown пулу)
+    multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    """Закриття з'єднань PocketOption та клієнта Groq процесу-воркера"""
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        if _worker_generator is not None:
+            _worker_loop.run_until_complete(_worker_generator.pocket_client.disconnect())
+            _worker_loop.run_until_complete(_worker_generator.analyzer.aclose())
+        # Фонові задачі бібліотеки (приймання повідомлень, keep-alive) скасовуємо до закриття циклу
+        pending = asyncio.all_tasks(_worker_loop)
+        for task in pending:
+            task.cancel()
+        _worker_loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    except Exception as e:
+        logger.warning(f"⚠️ Процес {os.getpid()}: помилка закриття з'єднань: {e}")
+    finally:
+        _worker_loop.close()
+
+
+def _run_shard(assets, indicator_states, incremental):
+    return _worker_loop.run_until_complete(_process_shard(assets, indicator_states, incremental))
+
+
+async def _process_shard(assets, indicator_states, incremental):
+    """Свічки, індикатори та AI аналіз для шарду; результат повертається батьківському процесу"""
+    global _worker_generator
+    from signal_generator import SignalGenerator
+    from streaming_indicators import AssetIndicatorState
+
+    if _worker_generator is None:
+        _worker_generator = SignalGenerator(owns_storage=False)
+        _worker_generator.keep_connection = True
+    generator = _worker_generator
+    generator.incremental_indicators = incremental
+
+    metrics.registry.begin_cycle()
+    result = {'pid': os.getpid(), 'signals': [], 'failed': list(assets), 'prescreen': {}, 'indicator_state': {}}
+    try:
+        for asset, state in indicator_states.items():
+            generator.indicator_state.states[asset] = AssetIndicatorState.from_dict(state)
+
+        if generator.pocket_client.connected:
+            connected = await generator.pocket_client.ensure_connected()
+        else:
+            connected = await generator.pocket_client.connect()
+        if not connected:
+            logger.error(f"❌ Процес {os.getpid()}: не вдалося підключитися до PocketOption")
+            return result
+
+        if generator.prescreener is not None:
+            generator.prescreener.reset()
+        result['signals'], result['failed'] = await generator._process_assets_concurrent(assets)
+        if generator.prescreener is not None:
+            result['prescreen'] = generator.prescreener.results
+        if incremental:
+            result['indicator_state'] = {asset: generator.indicator_state.states[asset].to_dict()
+                                         for asset in assets if asset in generator.indicator_state.states}
+        return result
+    finally:
+        result['metrics'] = metrics.registry.cycle_state()
+
+
+class ProcessShardPool:
+    """
+    Пул процесів для режиму EXECUTION_MODE=process: Config.ASSETS ділиться на шарди,
+    кожен процес має власний event loop, клієнтів PocketOption і Groq.
+    Процеси лише повертають сигнали - усі записи (DataHandler, звіти, стан індикаторів) робить батьківський процес.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, workers or worker_count())
+        self._executor = None
+        self._executor_size = 0
+
+    def _get_executor(self, size):
+        """Пул рівно на кількість шардів: на неї ж ділиться бюджет Groq"""
+        if self._executor is not None and self._executor_size != size:
+            self.close()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(_config_snapshot(size), _library_assets(),
+                          logger.getEffectiveLevel())
+            )
+            self._executor_size = size
+            logger.info(f"🧩 Пул з {size} процесів")
+        return self._executor
+
+    async def run(self, assets, indicator_state, incremental=False):
+        """Обробка шардів паралельно; повертає (сигнали, активи без сигналу)"""
+        shards = partition(list(assets), self.workers)
+        logger.info(f"🧩 Шарди: {', '.join(str(len(shard)) for shard in shards)} активів на процес")
+
+        executor = self._get_executor(len(shards))
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, _run_shard, shard,
+                                   {asset: indicator_state.states[asset].to_dict()
+                                    for asset in shard if asset in indicator_state.states},
+                                   incremental)
+              for shard in shards),
+            return_exceptions=True
+        )
+
+        signals_by_asset = {}
+        failed = set()
+        prescreen = {}
+        for shard, result in zip(shards, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Помилка процесу для {len(shard)} активів: {result}")
+                failed.update(shard)
+                if isinstance(result, BrokenProcessPool):
+                    self.close()
+                continue
+            for signal in result['signals']:
+                signals_by_asset[signal['asset']] = signal
+            failed.update(result['failed'])
+            prescreen.update(result['prescreen'])
+            indicator_state.merge(result['indicator_state'])
+            metrics.registry.merge(result['metrics'])
+
+        # Порядок активів як у конфігурації, незалежно від розподілу по процесах
+        valid_signals = [signals_by_asset[asset] for asset in assets if asset in signals_by_asset]
+        failed_assets = [asset for asset in assets if asset in failed]
+        return valid_signals, failed_assets, prescreen
+
+    async def aclose(self):
+        """Штатне завершення: воркери закривають з'єднання, чекаємо їх у потоці без блокування event loop"""
+        executor, self._executor, self._executor_size = self._executor, None, 0
+        if executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown, True)
+
+    def close(self):
+        # Без очікування: викликається з run() для зламаного пулу, що може не завершитися швидко
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_size = 0
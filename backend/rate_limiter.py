@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("signal_bot")
+
+
+class TokenBucket:
+    """Відро токенів з безперервним поповненням (capacity за хвилину)"""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now=None):
+        now = now or time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Скільки секунд чекати, доки в відрі з'явиться amount (не більше за ємність)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+
+class GroqRateLimiter:
+    """
+    Спільний обмежувач запитів до Groq: бюджети запитів і токенів на хвилину,
+    пауза за Retry-After після 429 та адаптивна кількість одночасних запитів (AIMD).
+    """
+
+    def __init__(self, rpm, tpm, max_in_flight=8, min_in_flight=1):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_in_flight = max(1, min(min_in_flight, self.max_in_flight))
+        self.limit = float(max(self.min_in_flight, self.max_in_flight // 2))  # поточна межа одночасних запитів
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._condition = None
+        self._pending_notifications = set()
+
+        # Статистика для логів
+        self.total_requests = 0
+        self.total_tokens = 0
+        self.rate_limited = 0
+        self.window_started = time.monotonic()
+
+    def _get_condition(self):
+        # Створюємо всередині event loop, в якому працює обмежувач
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def _wait_time(self, estimated_tokens):
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(
+            self.blocked_until - now,
+            self.requests.wait_time(1),
+            self.tokens.wait_time(estimated_tokens),
+            0.0
+        )
+
+    async def acquire(self, estimated_tokens):
+        """Очікування дозволу на запит з оцінкою кількості токенів"""
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                if self.in_flight < int(self.limit):
+                    wait = self._wait_time(estimated_tokens)
+                    if wait <= 0:
+                        break
+                    timeout = min(wait, 5.0)
+                else:
+                    timeout = None
+                try:
+                    await asyncio.wait_for(condition.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+
+    def _settle(self, estimated_tokens, used_tokens=None, rate_limited=False, retry_after=None):
+        """Облік завершеного запиту без очікування: звільнення слота, корекція бюджету токенів та AIMD"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+        if used_tokens is not None:
+            # Повертаємо/доплачуємо різницю між оцінкою та фактичним використанням
+            self.tokens.take(used_tokens - estimated_tokens)
+            self.total_tokens += used_tokens
+            self.total_requests += 1
+        else:
+            # Помилка/429/таймаут без usage: оцінка не витрачена - повертаємо її в бюджет
+            self.tokens.take(-estimated_tokens)
+
+        if rate_limited:
+            self.rate_limited += 1
+            self.limit = max(float(self.min_in_flight), self.limit / 2)
+            pause = retry_after if retry_after is not None else 60.0 / max(self.requests.capacity, 1)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            logger.warning(f"🚦 Groq 429: пауза {pause:.1f} сек, межа одночасних запитів -> {int(self.limit)}")
+        elif used_tokens is not None:
+            # Адитивне збільшення: +1 до межі приблизно за кожне "вікно" успішних запитів
+            self.limit = min(float(self.max_in_flight), self.limit + 1.0 / max(self.limit, 1.0))
+
+    async def _notify(self):
+        condition = self._get_condition()
+        async with condition:
+            condition.notify_all()
+
+    async def release(self, estimated_tokens, used_tokens=None, rate_limited=False, retry_after=None):
+        """Завершення запиту: корекція бюджету токенів та AIMD"""
+        self._settle(estimated_tokens, used_tokens, rate_limited, retry_after)
+        await self._notify()
+
+    def release_nowait(self, estimated_tokens, used_tokens=None, rate_limited=False, retry_after=None):
+        """
+        release() для блоку finally: слот звільняється синхронно, тож навіть скасована задача
+        (таймаут активу, CancelledError) не залишає його зайнятим; очікувачів будить окрема задача
+        """
+        self._settle(estimated_tokens, used_tokens, rate_limited, retry_after)
+        task = asyncio.get_running_loop().create_task(self._notify())
+        self._pending_notifications.add(task)
+        task.add_done_callback(self._pending_notifications.discard)
+
+    def usage(self):
+        """Поточне використання бюджету для логування"""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        elapsed_minutes = max((now - self.window_started) / 60.0, 1e-9)
+        return {
+            'in_flight': self.in_flight,
+            'concurrency_limit': int(self.limit),
+            'requests_available': round(self.requests.tokens, 2),
+            'requests_per_minute': self.requests.capacity,
+            'tokens_available': int(self.tokens.tokens),
+            'tokens_per_minute': int(self.tokens.capacity),
+            'total_requests': self.total_requests,
+            'total_tokens': self.total_tokens,
+            'avg_tokens_per_minute': int(self.total_tokens / elapsed_minutes),
+            'rate_limited': self.rate_limited,
+        }
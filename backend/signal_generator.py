@@ -1,102 +1,184 @@
+import argparse
 import asyncio
 import logging
 import os
+import signal as signal_module
+import time
 from datetime import datetime, timedelta
 import pytz
 import random
 from config import Config
 from pocket_client import PocketOptionClient
 from groq_analyzer import GroqAnalyzer
-from data_handler import DataHandler
+from data_handler import create_data_handler
+from indicators import compute_indicators
+from streaming_indicators import IndicatorStateRegistry
+from prescreen import Prescreener
+from process_pool import ProcessShardPool
+import metrics
 
 logger = logging.getLogger("signal_bot")
 
 class SignalGenerator:
-    def __init__(self):
+    def __init__(self, owns_storage=True):
         self.pocket_client = PocketOptionClient()
         self.analyzer = GroqAnalyzer()
-        self.data_handler = DataHandler()
+        # Процеси-воркери режиму process не пишуть у сховище - це робить лише батьківський процес
+        self.data_handler = create_data_handler() if owns_storage else None
         self.signals = []
         
+        # Пул процесів для EXECUTION_MODE=process (створюється при першому циклі)
+        self.process_pool = None
+        
+        # У режимі демона з'єднання з PocketOption тримаємо між циклами
+        self.keep_connection = False
+        
+        # Інкрементні індикатори: оновлюються лише новими закритими свічками (режим демона)
+        self.incremental_indicators = False
+        self.indicator_state = IndicatorStateRegistry()
+        
+        # Локальний відбір: активи без сетапу не відправляються в AI
+        self.prescreener = Prescreener() if Config.PRESCREEN_ENABLED else None
+        
         # Обмеження для економії токенів
         self.MAX_SIGNALS_PER_GENERATION = 3
         self.REQUEST_DELAY = 2  # секунд між запитами
 
-    async def generate_signal(self, asset):
+    async def fetch_candles(self, asset):
+        """Отримання свічок для активу з перевіркою актуальності"""
+        if not hasattr(self.pocket_client, 'client') or not self.pocket_client.client:
+            logger.error("❌ PocketOptionClient не ініціалізований")
+            return None
+        
+        logger.info(f"📊 Запит свічок для {asset}...")
+        candles = await self.pocket_client.get_candles(
+            asset=asset,
+            timeframe=Config.TIMEFRAMES,
+            count=50
+        )
+        
+        if not candles or len(candles) == 0:
+            logger.error(f"❌ Не вдалося отримати свічки для {asset}")
+            return None
+
+        logger.info(f"✅ Отримано {len(candles)} свічок для {asset}")
+        if self.incremental_indicators:
+            self.indicator_state.update(asset, candles)
+        
+        # Перевірка актуальності даних
+        if hasattr(candles[-1], 'timestamp'):
+            last_candle_time = candles[-1].timestamp
+            current_time = Config.get_kyiv_time()
+            
+            if last_candle_time.tzinfo is None:
+                last_candle_time = pytz.UTC.localize(last_candle_time)
+            
+            last_candle_time_kyiv = last_candle_time.astimezone(Config.KYIV_TZ)
+            time_diff = (current_time - last_candle_time_kyiv).total_seconds()
+            
+            if time_diff > 300:
+                logger.warning(f"⚠️ Остання свічка застаріла: {time_diff:.0f} сек тому")
+            else:
+                logger.info(f"🕐 Остання свічка актуальна: {time_diff:.0f} сек тому")
+        
+        return candles
+
+    def _prescreen(self, asset, candles, indicators):
+        """Попередній відбір: (індикатори, чи пройшов актив)"""
+        if self.prescreener is None:
+            return indicators, True
+        
+        if indicators is None:
+            indicators = compute_indicators([candles])[0]
+        passed, reasons = self.prescreener.evaluate(asset, indicators)
+        if not passed:
+            logger.info(f"⏭️ {asset} пропущено попереднім відбором: {'; '.join(reasons)}")
+        else:
+            logger.info(f"🔎 {asset} пройшов відбір: {'; '.join(reasons)}")
+        return indicators, passed
+
+    def _finalize_signal(self, asset, signal):
+        """Перевірка відповіді AI та додавання часу входу, ID і службових полів"""
+        if not signal:
+            logger.warning(f"⚠️ AI не повернув сигнал для {asset}")
+            return None
+        
+        confidence = signal.get('confidence', 0)
+        logger.info(f"📝 AI повернув сигнал для {asset}: confidence={confidence*100:.1f}%")
+        
+        if confidence < Config.MIN_CONFIDENCE:
+            logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
+            return None
+        
+        duration = signal.get('duration', 2)
+        if duration > Config.MAX_DURATION:
+            logger.warning(f"⚠️ Сигнал для {asset} має завелику тривалість: {duration} > {Config.MAX_DURATION}")
+            signal['duration'] = Config.MAX_DURATION
+        
+        now_kyiv = Config.get_kyiv_time()
+        
+        # Фіксована затримка 2 хвилини для входу
+        delay_minutes = 2
+        entry_time_dt = now_kyiv + timedelta(minutes=2)  # Чітко через 2 хвилини
+        signal['entry_time'] = entry_time_dt.strftime('%H:%M')
+        signal['entry_delay'] = 2
+        
+        signal['generated_at'] = now_kyiv.isoformat()
+        signal['generated_epoch'] = now_kyiv.timestamp()
+        signal['generated_at_utc'] = datetime.utcnow().isoformat() + 'Z'
+        signal['asset'] = asset
+        signal['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+        
+        # Додаємо інформацію про волатильність
+        if 'volatility' not in signal:
+            signal['volatility'] = 0.0
+        
+        logger.info(f"✅ Створено сигнал для {asset}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
+        logger.info(f"   📅 Вхід через {delay_minutes} хв о {signal['entry_time']}, Тривалість: {signal['duration']} хв")
+        return signal
+
+    def _indicators_for(self, assets, candles_by_asset):
+        """
+        Індикатори з інкрементного стану; холодні та перебудовані активи - векторизованим перерахунком.
+        EMA/MACD/RSI/ATR прогрітого стану - значення довшої історії, тож можуть трохи відрізнятися від перерахунку.
+        """
+        indicators_by_asset = {}
+        if self.incremental_indicators:
+            for asset in assets:
+                if asset not in self.indicator_state.rebuilt:
+                    snapshot = self.indicator_state.snapshot(asset, candles_by_asset[asset])
+                    if snapshot is not None:
+                        indicators_by_asset[asset] = snapshot
+        
+        cold_assets = [asset for asset in assets if asset not in indicators_by_asset]
+        if cold_assets:
+            indicators_list = compute_indicators([candles_by_asset[asset] for asset in cold_assets])
+            indicators_by_asset.update(zip(cold_assets, indicators_list))
+        logger.info(f"📐 Індикатори: {len(assets) - len(cold_assets)} з інкрементного стану, "
+                    f"{len(cold_assets)} перераховано")
+        return indicators_by_asset
+
+    async def generate_signal(self, asset, candles=None, indicators=None):
         """Генерація одного сигналу з фіксованою затримкою входу 2 хвилини"""
         try:
             logger.info(f"📈 Аналіз активу: {asset}")
             
-            if not hasattr(self.pocket_client, 'client') or not self.pocket_client.client:
-                logger.error("❌ PocketOptionClient не ініціалізований")
-                return None
+            if candles is None:
+                candles = await self.fetch_candles(asset)
+                if not candles:
+                    return None
             
-            logger.info(f"📊 Запит свічок для {asset}...")
-            candles = await self.pocket_client.get_candles(
-                asset=asset,
-                timeframe=Config.TIMEFRAMES,
-                count=50
-            )
+            if indicators is None:
+                indicators = self._indicators_for([asset], {asset: candles})[asset]
             
-            if not candles or len(candles) == 0:
-                logger.error(f"❌ Не вдалося отримати свічки для {asset}")
+            indicators, passed = self._prescreen(asset, candles, indicators)
+            if not passed:
                 return None
-
-            logger.info(f"✅ Отримано {len(candles)} свічок для {asset}")
-            
-            # Перевірка актуальності даних
-            if hasattr(candles[-1], 'timestamp'):
-                last_candle_time = candles[-1].timestamp
-                current_time = Config.get_kyiv_time()
-                
-                if last_candle_time.tzinfo is None:
-                    last_candle_time = pytz.UTC.localize(last_candle_time)
-                
-                last_candle_time_kyiv = last_candle_time.astimezone(Config.KYIV_TZ)
-                time_diff = (current_time - last_candle_time_kyiv).total_seconds()
-                
-                if time_diff > 300:
-                    logger.warning(f"⚠️ Остання свічка застаріла: {time_diff:.0f} сек тому")
-                else:
-                    logger.info(f"🕐 Остання свічка актуальна: {time_diff:.0f} сек тому")
             
             logger.info(f"🧠 Аналіз через GPT OSS 120B для {asset}...")
-            signal = self.analyzer.analyze_market(asset, candles, language=Config.LANGUAGE)
-
-            if signal:
-                confidence = signal.get('confidence', 0)
-                logger.info(f"📝 AI повернув сигнал для {asset}: confidence={confidence*100:.1f}%")
-                
-                if confidence >= Config.MIN_CONFIDENCE:
-                    duration = signal.get('duration', 2)
-                    if duration > Config.MAX_DURATION:
-                        logger.warning(f"⚠️ Сигнал для {asset} має завелику тривалість: {duration} > {Config.MAX_DURATION}")
-                        signal['duration'] = Config.MAX_DURATION
-                    
-                    now_kyiv = Config.get_kyiv_time()
-                    
-                    # Фіксована затримка 2 хвилини для входу
-                    delay_minutes = 2
-                    entry_time_dt = now_kyiv + timedelta(minutes=2)  # Чітко через 2 хвилини
-                    signal['entry_time'] = entry_time_dt.strftime('%H:%M')
-                    signal['entry_delay'] = 2
-                    
-                    signal['generated_at'] = now_kyiv.isoformat()
-                    signal['generated_at_utc'] = datetime.utcnow().isoformat() + 'Z'
-                    signal['asset'] = asset
-                    signal['id'] = f"{asset}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
-                    
-                    # Додаємо інформацію про волатильність
-                    if 'volatility' not in signal:
-                        signal['volatility'] = 0.0
-                    
-                    logger.info(f"✅ Створено сигнал для {asset}: {signal['direction']} ({signal['confidence']*100:.1f}%)")
-                    logger.info(f"   📅 Вхід через {delay_minutes} хв о {signal['entry_time']}, Тривалість: {signal['duration']} хв")
-                    return signal
-                else:
-                    logger.warning(f"⚠️ Сигнал для {asset} має низьку впевненість: {confidence*100:.1f}% < {Config.MIN_CONFIDENCE*100}%")
-            else:
-                logger.warning(f"⚠️ AI не повернув сигнал для {asset}")
+            signal = await self.analyzer.analyze_market_async(asset, candles, language=Config.LANGUAGE,
+                                                              indicators=indicators)
+            return self._finalize_signal(asset, signal)
                     
         except Exception as e:
             logger.error(f"❌ Помилка генерації сигналу для {asset}: {e}")
@@ -105,13 +187,165 @@ class SignalGenerator:
 
         return None
 
+    async def generate_signals_batch(self, assets, candles_by_asset, indicators_by_asset):
+        """Генерація сигналів для групи активів одним запитом до AI"""
+        items = []
+        for asset in assets:
+            indicators, passed = self._prescreen(asset, candles_by_asset[asset], indicators_by_asset.get(asset))
+            if passed:
+                items.append((asset, candles_by_asset[asset], indicators))
+        
+        if not items:
+            return {}
+        
+        logger.info(f"🧠 Пакетний аналіз {len(items)} активів: {[item[0] for item in items]}")
+        results = await self.analyzer.analyze_batch_async(items, language=Config.LANGUAGE)
+        signals = {}
+        for asset, _, _ in items:
+            # Помилка в одному елементі не скасовує сигнали решти пакета
+            try:
+                signals[asset] = self._finalize_signal(asset, results.get(asset))
+            except Exception as e:
+                logger.error(f"❌ Некоректний сигнал у пакеті для {asset}: {e}")
+                signals[asset] = None
+        return signals
+
+    def _get_assets_to_process(self):
+        """Список активів для поточної генерації з урахуванням режиму"""
+        if Config.EXECUTION_MODE in ('concurrent', 'process'):
+            limit = Config.MAX_ASSETS_PER_GENERATION
+        else:
+            limit = self.MAX_SIGNALS_PER_GENERATION
+        
+        if limit and limit > 0:
+            return Config.ASSETS[:limit]
+        return list(Config.ASSETS)
+
+    async def _process_assets_sequential(self, assets_to_process):
+        """Послідовна обробка активів із затримкою між запитами"""
+        valid_signals = []
+        failed_assets = []
+        
+        for asset in assets_to_process:
+            logger.info(f"\n{'='*30}")
+            logger.info(f"💰 Обробка активу: {asset}")
+            logger.info(f"{'='*30}")
+            
+            signal = await self.generate_signal(asset)
+            if signal:
+                valid_signals.append(signal)
+                logger.info(f"✅ Сигнал для {asset} успішно створений")
+            else:
+                logger.warning(f"⚠️ Не створено сигнал для {asset}")
+                failed_assets.append(asset)
+            
+            # Затримка між запитами для економії токенів (з обмежувачем швидкості не потрібна)
+            if not Config.RATE_LIMITER_ENABLED:
+                await asyncio.sleep(self.REQUEST_DELAY)
+        
+        return valid_signals, failed_assets
+
+    async def _process_assets_concurrent(self, assets_to_process):
+        """Паралельна обробка активів з обмеженням одночасних задач і таймаутом на актив"""
+        semaphore = asyncio.Semaphore(max(1, Config.MAX_CONCURRENCY))
+        logger.info(f"⚡ Паралельна обробка: {len(assets_to_process)} активів, "
+                    f"до {Config.MAX_CONCURRENCY} одночасно, таймаут {Config.ASSET_TIMEOUT} сек")
+        
+        async def limited(asset, coroutine, stage):
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(coroutine, timeout=Config.ASSET_TIMEOUT)
+                except asyncio.TimeoutError:
+                    logger.error(f"⏱️ Таймаут {stage} для {asset} ({Config.ASSET_TIMEOUT} сек)")
+                    return None
+        
+        # 1. Паралельно отримуємо свічки для всіх активів
+        fetched = await asyncio.gather(
+            *(limited(asset, self.fetch_candles(asset), "отримання свічок") for asset in assets_to_process),
+            return_exceptions=True
+        )
+        candles_by_asset = {
+            asset: candles for asset, candles in zip(assets_to_process, fetched)
+            if candles and not isinstance(candles, Exception)
+        }
+        
+        # 2. Індикатори для всіх активів за один векторизований прохід
+        ready_assets = list(candles_by_asset)
+        with metrics.span('indicators'):
+            indicators_by_asset = self._indicators_for(ready_assets, candles_by_asset)
+        
+        # 3. Паралельний AI аналіз (по одному активу або пакетами)
+        if Config.BATCH_ANALYSIS_ENABLED:
+            batch_size = max(1, Config.BATCH_SIZE)
+            batches = [ready_assets[i:i + batch_size] for i in range(0, len(ready_assets), batch_size)]
+            batch_results = await asyncio.gather(
+                *(limited(", ".join(batch), self.generate_signals_batch(batch, candles_by_asset, indicators_by_asset),
+                          "пакетного аналізу") for batch in batches),
+                return_exceptions=True
+            )
+            signals_by_asset = {}
+            for batch, result in zip(batches, batch_results):
+                if isinstance(result, Exception):
+                    logger.error(f"❌ Помилка пакетного аналізу {batch}: {result}")
+                elif result:
+                    signals_by_asset.update(result)
+            results = [signals_by_asset.get(asset) for asset in assets_to_process]
+        else:
+            async def analyze(asset):
+                if asset not in candles_by_asset:
+                    return None
+                return await limited(
+                    asset,
+                    self.generate_signal(asset, candles_by_asset[asset], indicators_by_asset[asset]),
+                    "аналізу"
+                )
+            
+            results = await asyncio.gather(*(analyze(asset) for asset in assets_to_process), return_exceptions=True)
+        
+        valid_signals = []
+        failed_assets = []
+        for asset, result in zip(assets_to_process, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Помилка обробки {asset}: {result}")
+                failed_assets.append(asset)
+            elif result:
+                valid_signals.append(result)
+                logger.info(f"✅ Сигнал для {asset} успішно створений")
+            else:
+                failed_assets.append(asset)
+        
+        return valid_signals, failed_assets
+
+    async def _process_assets_in_processes(self, assets_to_process):
+        """Шардування активів між процесами: CPU-робота (індикатори, промпти) іде на всіх ядрах"""
+        if self.process_pool is None:
+            self.process_pool = ProcessShardPool()
+        valid_signals, failed_assets, prescreen = await self.process_pool.run(assets_to_process, self.indicator_state,
+                                                                             self.incremental_indicators)
+        if self.prescreener is not None:
+            self.prescreener.results.update(prescreen)
+        return valid_signals, failed_assets
+
+    async def close_workers(self):
+        if self.process_pool is not None:
+            await self.process_pool.aclose()
+            self.process_pool = None
+
+    def _expire_old_signals(self):
+        """Окремий цикл DataHandler лише для очищення старих сигналів"""
+        logger.info("🧹 Автоматичне очищення старих сигналів...")
+        self.data_handler.begin_cycle()
+        self.data_handler.auto_cleanup_old_signals()
+        self.data_handler.commit_cycle()
+
     async def generate_all_signals(self):
         """Генерація сигналів для всіх активів з обмеженням для економії токенів"""
+        metrics.registry.begin_cycle()
         logger.info("=" * 60)
         logger.info(f"🚀 ПОЧАТОК ГЕНЕРАЦІЇ СИГНАЛІВ")
         logger.info(f"🌐 Мова: {Config.LANGUAGE}")
         logger.info(f"🕐 Час: {Config.get_kyiv_time().strftime('%Y-%m-%d %H:%M:%S')} (Київ)")
-        logger.info(f"💰 Обмеження: {self.MAX_SIGNALS_PER_GENERATION} сигналів для економії токенів")
+        logger.info(f"💰 Обмеження: {len(self._get_assets_to_process())} активів за генерацію")
         logger.info("=" * 60)
 
         try:
@@ -125,44 +359,52 @@ class SignalGenerator:
             logger.info(f"  - Мова: {Config.LANGUAGE}")
             logger.info(f"  - Часовий пояс: Київ (UTC+2)")
             logger.info(f"  - Затримка входу: 2 хвилини")
+            logger.info(f"  - Режим обробки: {Config.EXECUTION_MODE}")
             
             # ⚠️ ВИДАЛЕНО ВСІ ПЕРЕВІРКИ ЧАСУ! Генеруємо завжди
             logger.info("🔗 Підключення до PocketOption...")
             logger.info(f"   Режим: {'DEMO' if Config.POCKET_DEMO else 'REAL'}")
             
-            connection_result = await self.pocket_client.connect()
+            if Config.EXECUTION_MODE == 'process':
+                # Кожен процес-воркер тримає власне підключення
+                connection_result = True
+            elif self.keep_connection and self.pocket_client.connected:
+                # Дешевий ping замість повного перепідключення
+                connection_result = await self.pocket_client.ensure_connected()
+            else:
+                connection_result = await self.pocket_client.connect()
             
             if not connection_result:
                 logger.error("❌ Не вдалося підключитися до PocketOption")
                 logger.info("⏸️ Пропускаю генерацію сигналів...")
+                # Без нових сигналів прострочені все одно мають зникнути з signals.json
+                self._expire_old_signals()
                 return []
             
             logger.info("✅ Підключення успішне!")
-            logger.info(f"🎯 Генерую сигнали для {self.MAX_SIGNALS_PER_GENERATION} активів...")
             
-            valid_signals = []
-            failed_assets = []
+            if self.prescreener is not None:
+                self.prescreener.reset()
             
             # Обмежуємо кількість активів для аналізу
-            assets_to_process = Config.ASSETS[:self.MAX_SIGNALS_PER_GENERATION]
+            assets_to_process = self._get_assets_to_process()
             logger.info(f"📊 Обробляємо активи: {assets_to_process}")
             
-            for asset in assets_to_process:
-                logger.info(f"\n{'='*30}")
-                logger.info(f"💰 Обробка активу: {asset}")
-                logger.info(f"{'='*30}")
-                
-                signal = await self.generate_signal(asset)
-                if signal:
-                    valid_signals.append(signal)
-                    logger.info(f"✅ Сигнал для {asset} успішно створений")
-                else:
-                    logger.warning(f"⚠️ Не створено сигнал для {asset}")
-                    failed_assets.append(asset)
-                
-                # Затримка між запитами для економії токенів
-                await asyncio.sleep(self.REQUEST_DELAY)
+            if Config.EXECUTION_MODE == 'process':
+                valid_signals, failed_assets = await self._process_assets_in_processes(assets_to_process)
+            elif Config.EXECUTION_MODE == 'concurrent':
+                valid_signals, failed_assets = await self._process_assets_concurrent(assets_to_process)
+            else:
+                valid_signals, failed_assets = await self._process_assets_sequential(assets_to_process)
 
+            if self.prescreener is not None:
+                skipped = self.prescreener.skipped()
+                logger.info(f"🔎 Відбір: {len(skipped)} з {len(assets_to_process)} активів пропущено без запиту до AI")
+                self.prescreener.save_report(Config.PRESCREEN_FILE, Config.get_kyiv_time().isoformat())
+            
+            # signals.json читається один раз і записується один раз наприкінці циклу
+            self.data_handler.begin_cycle()
+            
             if valid_signals:
                 logger.info(f"\n💾 Збереження {len(valid_signals)} сигналів...")
                 save_result = self.data_handler.save_signals(valid_signals)
@@ -184,15 +426,26 @@ class SignalGenerator:
                 if failed_assets:
                     logger.info(f"📉 Активи без сигналів: {', '.join(failed_assets)}")
 
-            logger.info("🔌 Відключення від PocketOption...")
-            await self.pocket_client.disconnect()
-            logger.info("✅ Відключено від PocketOption")
+            self.pocket_client.log_connection_stats()
+            
+            if not self.keep_connection and Config.EXECUTION_MODE != 'process':
+                logger.info("🔌 Відключення від PocketOption...")
+                await self.pocket_client.disconnect()
+                logger.info("✅ Відключено від PocketOption")
+            
+            self.analyzer.flush_cache()
+            self.analyzer.log_rate_limit_usage()
             
             # Автоматичне очищення старих сигналів
             logger.info("🧹 Автоматичне очищення старих сигналів...")
             self.data_handler.auto_cleanup_old_signals()
+            self.data_handler.commit_cycle()
             
-            logger.info(f"\n⏱️  Час виконання: {Config.get_kyiv_time().strftime('%H:%M:%S')}")
+            # Пакетне навчання на відгуках, що накопичилися з попереднього циклу
+            self.data_handler.learn_from_feedback()
+            
+            logger.info(f"\n⏱️  Час виконання: {Config.get_kyiv_time().strftime('%H:%M:%S')}, "
+                        f"тривалість циклу: {time.time() - metrics.registry.cycle_started:.1f} сек")
             logger.info(f"📊 Підсумок: {len(valid_signals)} сигналів з {len(assets_to_process)} активів")
             logger.info("=" * 60)
             
@@ -202,7 +455,28 @@ class SignalGenerator:
             logger.error(f"💥 Критична помилка: {e}")
             import traceback
             logger.error(f"📋 Трейс: {traceback.format_exc()}")
+            self.data_handler.commit_cycle()
             return []
+        finally:
+            self._export_metrics()
+
+    def _export_metrics(self):
+        """p50/p95 етапів циклу в лог, data/metrics.json та файл Prometheus"""
+        if not Config.METRICS_ENABLED:
+            return
+        try:
+            metrics.registry.log_summary()
+            metrics.registry.export()
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося записати метрики: {e}")
+
+def get_next_run_time(now_utc, interval_seconds=600):
+    """Наступний запуск, вирівняний на межу інтервалу (:00, :10, :20 ... для 10 хвилин)"""
+    interval_seconds = max(60, int(interval_seconds))
+    day_start = now_utc.replace(hour=0, minute=0, second=0, microsecond=0)
+    elapsed = (now_utc - day_start).total_seconds()
+    slots_passed = int(elapsed // interval_seconds) + 1
+    return day_start + timedelta(seconds=slots_passed * interval_seconds)
 
 async def main():
     """Головна функція - запускається ТІЛЬКИ ОДИН РАЗ"""
@@ -228,6 +502,8 @@ async def main():
     
     generator = SignalGenerator()
     signals = await generator.generate_all_signals()
+    await generator.analyzer.aclose()
+    await generator.close_workers()
     
     if signals:
         print(f"\n🎯 ЗГЕНЕРОВАНО {len(signals)} СИГНАЛІВ:")
@@ -246,25 +522,13 @@ async def main():
     print(f"\n✅ Генерація сигналів завершена о {Config.get_kyiv_time().strftime('%H:%M:%S')}")
     print("="*60)
     
-    # Очищаємо старі сигнали після генерації
-    generator.data_handler.auto_cleanup_old_signals()
-    
     # Важливо: Повідомляємо про наступний автоматичний запуск
     print(f"\n⏰ НАСТУПНИЙ АВТОМАТИЧНИЙ ЗАПУСК:")
     
-    # ВИПРАВЛЕНИЙ КОД:
     now_utc = datetime.utcnow()
     
     # Розраховуємо наступний 10-хвилинний інтервал
-    current_minute = now_utc.minute
-    next_minute = ((current_minute // 10) + 1) * 10
-    
-    if next_minute >= 60:
-        # Перехід на наступну годину
-        next_time_utc = now_utc.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-    else:
-        # Це ж година
-        next_time_utc = now_utc.replace(minute=next_minute, second=0, microsecond=0)
+    next_time_utc = get_next_run_time(now_utc, Config.SIGNAL_INTERVAL)
     
     # Розраховуємо різницю в часі
     time_diff = next_time_utc - now_utc
@@ -274,5 +538,77 @@ async def main():
     print(f"   • Через {minutes_left} хвилин")
     print("="*60)
 
+async def run_daemon():
+    """Резидентний режим: один генератор, одне підключення, цикли за внутрішнім розкладом"""
+    print("\n" + "="*60)
+    print(f"🛰️ ЗАПУСК ДЕМОНА ГЕНЕРАЦІЇ СИГНАЛІВ - {Config.get_kyiv_time().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏰ Інтервал: {Config.SIGNAL_INTERVAL} сек (вирівняно по годиннику)")
+    print(f"🌐 Мова: {Config.LANGUAGE}")
+    print(f"🔄 Режим: {'DEMO' if Config.POCKET_DEMO else 'REAL'}")
+    print("="*60)
+    
+    if not Config.validate():
+        print("❌ Помилка валідації конфігурації. Перевірте ваші змінні оточення.")
+        return
+    
+    logging.basicConfig(
+        level=getattr(logging, Config.LOG_LEVEL),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal_module.SIGINT, signal_module.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows не підтримує add_signal_handler
+            signal_module.signal(sig, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+    
+    generator = SignalGenerator()
+    generator.keep_connection = True
+    generator.incremental_indicators = True
+    generator.indicator_state.load(Config.INDICATOR_STATE_FILE)
+    
+    try:
+        while not stop_event.is_set():
+            now_utc = datetime.utcnow()
+            next_time_utc = get_next_run_time(now_utc, Config.SIGNAL_INTERVAL)
+            wait_seconds = (next_time_utc - now_utc).total_seconds()
+            logger.info(f"⏳ Наступний цикл о {next_time_utc.strftime('%H:%M:%S')} UTC (через {wait_seconds:.0f} сек)")
+            
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=wait_seconds)
+                break  # Отримано сигнал зупинки
+            except asyncio.TimeoutError:
+                pass
+            
+            cycle_task = asyncio.create_task(generator.generate_all_signals())
+            stop_task = asyncio.create_task(stop_event.wait())
+            await asyncio.wait({cycle_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            stop_task.cancel()
+            
+            if not cycle_task.done():
+                # Даємо поточному циклу завершитися, щоб не залишити напівзаписані дані
+                logger.info("🛑 Отримано сигнал зупинки, чекаю завершення поточного циклу...")
+                await cycle_task
+            
+            generator.indicator_state.save(Config.INDICATOR_STATE_FILE)
+    finally:
+        logger.info("🔌 Зупинка демона, закриваю з'єднання...")
+        await generator.pocket_client.disconnect()
+        await generator.analyzer.aclose()
+        await generator.close_workers()
+        print(f"\n✅ Демон зупинено о {Config.get_kyiv_time().strftime('%H:%M:%S')}")
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Генератор торгових сигналів")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Резидентний режим з внутрішнім розкладом замість одноразового запуску")
+    args = parser.parse_args()
+    
+    if args.daemon:
+        asyncio.run(run_daemon())
+    else:
+        asyncio.run(main())
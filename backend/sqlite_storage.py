@@ -0,0 +1,420 @@
+import json
+import os
+import sqlite3
+import time
+from config import Config
+from data_handler import DataHandler, SIGNAL_TTL, write_json_atomic
+from feedback_stats import FeedbackStats
+import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id TEXT PRIMARY KEY,
+    asset TEXT NOT NULL,
+    generated_at TEXT,
+    generated_epoch REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_asset_time ON signals (asset, generated_epoch);
+CREATE INDEX IF NOT EXISTS idx_signals_time ON signals (generated_epoch);
+
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    history_id TEXT,
+    signal_id TEXT,
+    asset TEXT,
+    generated_at TEXT,
+    generated_epoch REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_asset_time ON history (asset, generated_epoch);
+CREATE INDEX IF NOT EXISTS idx_history_signal_id ON history (signal_id);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    signal_id TEXT,
+    success INTEGER NOT NULL,
+    direction TEXT,
+    user_comment TEXT,
+    feedback_at TEXT,
+    learned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_signal_id ON feedback (signal_id);
+
+CREATE TABLE IF NOT EXISTS lessons (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    signal_id TEXT,
+    asset TEXT,
+    learned_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_signal_id ON lessons (signal_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SQLiteDataHandler(DataHandler):
+    """
+    DataHandler поверх SQLite (WAL): сигнали, історія, відгуки та уроки в індексованих таблицях.
+    JSON-файли, які читає сайт, експортуються після кожної зміни.
+    """
+
+    def __init__(self, db_path=None):
+        super().__init__()
+        self.db_path = str(db_path or Config.SQLITE_DB_FILE)
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.commit()
+        self._import_json_if_empty()
+
+    def _migrate(self):
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(feedback)")}
+        if 'direction' not in columns:
+            self.conn.execute("ALTER TABLE feedback ADD COLUMN direction TEXT")
+
+    def _init_history_store(self):
+        # Повна історія зберігається в таблиці history
+        return None
+
+    def begin_cycle(self):
+        # Кожне збереження вже є однією транзакцією, окремий стан циклу не потрібен
+        return None
+
+    def commit_cycle(self):
+        return False
+
+    def close(self):
+        self.conn.close()
+
+    def _epoch(self, entry):
+        if entry.get('generated_epoch') is not None:
+            return entry['generated_epoch']
+        dt = self._parse_datetime(entry.get('generated_at'))
+        return dt.timestamp() if dt else None
+
+    # --- Мета-дані ---
+
+    def _get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value, default=str))
+        )
+
+    # --- Імпорт наявних JSON ---
+
+    def _read_json(self, path, default):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Не вдалося прочитати {path}: {e}")
+        return default
+
+    def _import_json_if_empty(self):
+        """Перший запуск: переносимо наявні JSON файли в базу"""
+        if self._get_meta('imported_json', False):
+            return
+
+        signals_data = self._read_json(self.signals_file, {})
+        with self.conn:
+            for signal in signals_data.get('signals', []):
+                self._insert_signal(signal)
+            self._set_meta('generation_count', signals_data.get('generation_count', 0))
+
+            history = self._read_json(self.history_file, [])
+            self._insert_history(history if isinstance(history, list) else [])
+
+            feedback_data = self._read_json(self.feedback_file, {})
+            for fb in feedback_data.get('feedback_history', []) if isinstance(feedback_data, dict) else []:
+                self.conn.execute(
+                    "INSERT INTO feedback (signal_id, success, direction, user_comment, feedback_at, learned) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (fb.get('signal_id'), int(bool(fb.get('success'))), fb.get('direction'), fb.get('user_comment', ''),
+                     fb.get('feedback_at'), int(bool(fb.get('learned'))))
+                )
+
+            lessons_data = self._read_json(self.lessons_file, {})
+            for lesson in lessons_data.get('lessons', []) if isinstance(lessons_data, dict) else []:
+                self._insert_lesson(lesson)
+            if isinstance(lessons_data, dict):
+                self._set_meta('last_learning', lessons_data.get('last_learning'))
+
+            self._rebuild_feedback_meta()
+
+            self._set_meta('imported_json', True)
+        print("🗄️ Дані з JSON файлів імпортовано в SQLite")
+
+    # --- Вставки ---
+
+    def _insert_signal(self, signal):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO signals (id, asset, generated_at, generated_epoch, data) VALUES (?, ?, ?, ?, ?)",
+            (signal.get('id'), signal.get('asset', 'unknown'), signal.get('generated_at'),
+             self._epoch(signal), json.dumps(signal, ensure_ascii=False, default=str))
+        )
+
+    def _insert_history(self, entries):
+        self.conn.executemany(
+            "INSERT INTO history (history_id, signal_id, asset, generated_at, generated_epoch, data) VALUES (?, ?, ?, ?, ?, ?)",
+            [(entry.get('history_id'), entry.get('id'), entry.get('asset', 'unknown'), entry.get('generated_at'),
+              self._epoch(entry), json.dumps(entry, ensure_ascii=False, default=str))
+             for entry in entries]
+        )
+
+    def _insert_lesson(self, lesson):
+        self.conn.execute(
+            "INSERT INTO lessons (signal_id, asset, learned_at, data) VALUES (?, ?, ?, ?)",
+            (lesson.get('signal_id'), lesson.get('asset'), lesson.get('learned_at'),
+             json.dumps(lesson, ensure_ascii=False, default=str))
+        )
+
+    # --- Експорт JSON для сайту ---
+
+    def export_signals(self):
+        write_json_atomic(self.signals_file, self.load_signals())
+
+    def export_history(self):
+        rows = self.conn.execute(
+            "SELECT data FROM history ORDER BY seq DESC LIMIT ?", (Config.MAX_SIGNALS_HISTORY,)
+        ).fetchall()
+        write_json_atomic(self.history_file, [json.loads(row['data']) for row in reversed(rows)])
+
+    def export_feedback(self):
+        rows = self.conn.execute(
+            "SELECT signal_id, success, direction, user_comment, feedback_at, learned FROM feedback ORDER BY seq"
+        ).fetchall()
+        stats = self._feedback_stats()
+        write_json_atomic(self.feedback_file, {
+            'feedback_history': [{
+                'signal_id': row['signal_id'],
+                'success': bool(row['success']),
+                'direction': row['direction'],
+                'user_comment': row['user_comment'],
+                'feedback_at': row['feedback_at'],
+                'learned': bool(row['learned'])
+            } for row in rows],
+            'success_count': stats.success,
+            'total_feedback': stats.total,
+            'accuracy_percentage': stats.accuracy(),
+            'stats': stats.to_dict(),
+            'learned_count': sum(1 for row in rows if row['learned'])
+        })
+
+    def export_lessons(self):
+        lessons = [json.loads(row['data']) for row in self.conn.execute("SELECT data FROM lessons ORDER BY seq")]
+        write_json_atomic(self.lessons_file, {
+            'lessons': lessons,
+            'last_learning': self._get_meta('last_learning'),
+            'learned_patterns': self._update_learned_patterns(lessons)
+        })
+
+    # --- Публічні методи DataHandler ---
+
+    @metrics.timed('save_signals')
+    def save_signals(self, signals):
+        """Збереження сигналів в одній транзакції з обмеженням до 6 останніх"""
+        try:
+            if not signals:
+                print("⚠️ Немає сигналів для збереження")
+                return False
+
+            valid_signals = self._prepare_signals(signals)
+            if not valid_signals:
+                print("⚠️ Немає сигналів з достатньою впевненістю для збереження")
+                return False
+
+            now_kyiv = Config.get_kyiv_time()
+            cutoff = time.time() - SIGNAL_TTL
+
+            history_entries = []
+            for signal in valid_signals:
+                history_entry = signal.copy()
+                history_entry['saved_at'] = now_kyiv.isoformat()
+                history_entry['history_id'] = f"{signal.get('asset', 'unknown')}_{now_kyiv.strftime('%Y%m%d%H%M%S')}"
+                history_entry['status'] = 'saved'
+                history_entries.append(history_entry)
+
+            with self.conn:
+                self.conn.execute("DELETE FROM signals WHERE generated_epoch IS NULL OR generated_epoch < ?", (cutoff,))
+                for signal in valid_signals:
+                    self._insert_signal(signal)
+                self.conn.execute(
+                    "DELETE FROM signals WHERE id NOT IN "
+                    "(SELECT id FROM signals ORDER BY generated_epoch DESC LIMIT ?)",
+                    (Config.MAX_SIGNALS_ON_SITE,)
+                )
+                self._insert_history(history_entries)
+                self._set_meta('generation_count', self._get_meta('generation_count', 0) + 1)
+                self._set_meta('last_update', now_kyiv.isoformat())
+
+            self.export_signals()
+            self.export_history()
+            self.update_learning_stats()
+
+            active_count = self.load_signals()['active_signals']
+            print(f"💾 Збережено {len(valid_signals)} сигналів. Активних: {active_count}")
+            return True
+
+        except Exception as e:
+            print(f"❌ Помилка збереження сигналів: {e}")
+            import traceback
+            print(f"Деталі: {traceback.format_exc()}")
+            return False
+
+    def load_signals(self):
+        """Поточні сигнали з бази у форматі signals.json"""
+        try:
+            rows = self.conn.execute("SELECT data, generated_epoch FROM signals ORDER BY generated_epoch").fetchall()
+            signals = [json.loads(row['data']) for row in rows]
+            cutoff = time.time() - SIGNAL_TTL
+            active_count = sum(1 for row in rows if row['generated_epoch'] and row['generated_epoch'] >= cutoff)
+            return {
+                "last_update": self._get_meta('last_update'),
+                "signals": signals,
+                "timezone": "Europe/Kiev (UTC+2)",
+                "total_signals": len(signals),
+                "active_signals": active_count,
+                "generation_count": self._get_meta('generation_count', 0)
+            }
+        except Exception as e:
+            print(f"❌ Помилка завантаження сигналів: {e}")
+            return super().load_signals()
+
+    def get_signal(self, signal_id):
+        """Пошук сигналу за ID (індекс по signal_id в історії)"""
+        row = self.conn.execute("SELECT data FROM signals WHERE id = ?", (signal_id,)).fetchone()
+        if row is None:
+            row = self.conn.execute(
+                "SELECT data FROM history WHERE signal_id = ? ORDER BY seq DESC LIMIT 1", (signal_id,)
+            ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def _feedback_stats(self):
+        return FeedbackStats.from_dict(self._get_meta('feedback_stats', {}))
+
+    def _rebuild_feedback_meta(self):
+        """Лічильники та позначка вивченого за наявними рядками (імпорт зі старих файлів)"""
+        rows = self.conn.execute("SELECT seq, signal_id, success, direction, learned FROM feedback ORDER BY seq").fetchall()
+        stats = FeedbackStats.rebuild(
+            {'signal_id': row['signal_id'], 'success': bool(row['success']), 'direction': row['direction']} for row in rows
+        )
+        learned_seq = 0
+        for row in rows:
+            if not row['learned']:
+                break
+            learned_seq = row['seq']
+        self._set_meta('feedback_stats', stats.to_dict())
+        self._set_meta('learned_seq', learned_seq)
+
+    def save_feedback(self, signal_id, success, user_comment="", direction=None):
+        """Збереження відгуку: один INSERT та інкрементальні лічильники; навчання - пакетами"""
+        try:
+            if not Config.FEEDBACK_ENABLED:
+                return False
+
+            now_kyiv = Config.get_kyiv_time()
+            if direction is None:
+                signal = self.get_signal(signal_id)
+                direction = signal.get('direction') if signal else None
+
+            with self.conn:
+                seq = self.conn.execute(
+                    "INSERT INTO feedback (signal_id, success, direction, user_comment, feedback_at, learned) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (signal_id, int(bool(success)), direction, user_comment, now_kyiv.isoformat())
+                ).lastrowid
+                stats = self._feedback_stats()
+                stats.record({'signal_id': signal_id, 'success': success, 'direction': direction})
+                self._set_meta('feedback_stats', stats.to_dict())
+            # Сайт читає feedback.json - оновлюємо одразу, як і JSON-бекенд
+            self.export_feedback()
+
+            pending = seq - self._get_meta('learned_seq', 0)
+            if pending >= Config.LEARNING_BATCH_SIZE:
+                # Поріг досягнуто - навчаємося пакетом (експортує feedback.json та lessons.json)
+                self.learn_from_feedback()
+
+            print(f"💾 Збережено відгук для сигналу {signal_id}: {'✅ Успіх' if success else '❌ Невдача'}")
+            print(f"📊 Нова точність AI: {stats.accuracy():.2f}% ({stats.success}/{stats.total})")
+            return True
+
+        except Exception as e:
+            print(f"❌ Помилка збереження відгуку: {e}")
+            return False
+
+    def learn_from_feedback(self):
+        """Пакетне навчання ШІ на відгуках після позначки learned_seq (вибірка за первинним ключем)"""
+        try:
+            learned_seq = self._get_meta('learned_seq', 0)
+            rows = self.conn.execute(
+                "SELECT seq, signal_id, success, user_comment, feedback_at FROM feedback WHERE seq > ? ORDER BY seq",
+                (learned_seq,)
+            ).fetchall()
+            if not rows:
+                return []
+
+            now_kyiv = Config.get_kyiv_time()
+            new_lessons = []
+            with self.conn:
+                for row in rows:
+                    fb = {
+                        'signal_id': row['signal_id'] or '',
+                        'success': bool(row['success']),
+                        'user_comment': row['user_comment'],
+                        'feedback_at': row['feedback_at'] or ''
+                    }
+                    lesson = {
+                        'signal_id': fb['signal_id'],
+                        'success': fb['success'],
+                        'feedback_at': fb['feedback_at'],
+                        'learned_at': now_kyiv.isoformat(),
+                        'asset': fb['signal_id'].split('_')[0] if '_' in fb['signal_id'] else '',
+                        'patterns': self._extract_patterns(fb),
+                        'analysis': self._analyze_feedback(fb)
+                    }
+                    self._insert_lesson(lesson)
+                    new_lessons.append(lesson)
+
+                self.conn.execute("UPDATE feedback SET learned = 1 WHERE seq > ? AND seq <= ?", (learned_seq, rows[-1]['seq']))
+                self._set_meta('learned_seq', rows[-1]['seq'])
+                self._set_meta('last_learning', now_kyiv.isoformat())
+
+            self.export_feedback()
+            self.export_lessons()
+            print(f"🧠 ШІ навчився на {len(new_lessons)} нових прикладах")
+            return new_lessons
+
+        except Exception as e:
+            print(f"❌ Помилка навчання ШІ: {e}")
+            return []
+
+    @metrics.timed('cleanup')
+    def auto_cleanup_old_signals(self):
+        """Автоматичне очищення сигналів старіших 10 хвилин (видалення за індексом часу)"""
+        try:
+            print("🧹 Автоматичне очищення старих сигналів...")
+            cutoff = time.time() - SIGNAL_TTL
+            with self.conn:
+                removed_count = self.conn.execute(
+                    "DELETE FROM signals WHERE generated_epoch IS NULL OR generated_epoch < ?", (cutoff,)
+                ).rowcount
+
+            self.export_signals()
+            remaining = self.conn.execute("SELECT COUNT(*) FROM signals").fetchone()[0]
+            print(f"✅ Автоочищення: видалено {removed_count} старих сигналів, залишено {remaining} актуальних")
+
+        except Exception as e:
+            print(f"❌ Помилка автоочищення: {e}")
@@ -0,0 +1,448 @@
+import json
+import logging
+import math
+import os
+from collections import deque
+
+from candle_frame import CandleFrame
+from indicators import (EMA_FAST, EMA_SLOW, MACD_FAST, MACD_SLOW, MACD_SIGNAL, RSI_PERIOD, ATR_PERIOD,
+                        STOCHASTIC_K, STOCHASTIC_D, BOLLINGER_PERIOD, BOLLINGER_STD, VOLATILITY_WINDOW)
+
+logger = logging.getLogger("signal_bot")
+
+# Інкрементні індикатори: кожне оновлення - O(1) на нову закриту свічку,
+# стан серіалізується в dict, тож довгоживучий процес не перераховує історію.
+
+
+class StreamingEMA:
+    """Експоненційна ковзна середня (перші period значень - SMA для ініціалізації)"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.count = 0
+        self._seed_sum = 0.0
+        self.value = None
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self._seed_sum += x
+        elif self.count == self.period:
+            self.value = (self._seed_sum + x) / self.period
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self):
+        return {'period': self.period, 'count': self.count, 'seed_sum': self._seed_sum, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data['period'])
+        obj.count = data['count']
+        obj._seed_sum = data['seed_sum']
+        obj.value = data['value']
+        return obj
+
+
+class StreamingRSI:
+    """RSI за Вайлдером"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.count = 0  # кількість змін ціни
+        self.prev = None
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+
+    def update(self, x):
+        if self.prev is None:
+            self.prev = x
+            return None
+
+        delta = x - self.prev
+        self.prev = x
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        self.count += 1
+
+        if self.count < self.period:
+            self._gain_sum += gain
+            self._loss_sum += loss
+        elif self.count == self.period:
+            self.avg_gain = (self._gain_sum + gain) / self.period
+            self.avg_loss = (self._loss_sum + loss) / self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+    @property
+    def value(self):
+        if self.avg_gain is None:
+            return None
+        if self.avg_loss == 0:
+            return 50.0 if self.avg_gain == 0 else 100.0
+        return 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+
+    def to_dict(self):
+        return {
+            'period': self.period, 'count': self.count, 'prev': self.prev,
+            'gain_sum': self._gain_sum, 'loss_sum': self._loss_sum,
+            'avg_gain': self.avg_gain, 'avg_loss': self.avg_loss
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data['period'])
+        obj.count = data['count']
+        obj.prev = data['prev']
+        obj._gain_sum = data['gain_sum']
+        obj._loss_sum = data['loss_sum']
+        obj.avg_gain = data['avg_gain']
+        obj.avg_loss = data['avg_loss']
+        return obj
+
+
+class StreamingWilder:
+    """Згладжування Вайлдера (RMA), ініціалізація - середнє перших period значень"""
+
+    def __init__(self, period):
+        self.period = period
+        self.count = 0
+        self._seed_sum = 0.0
+        self.value = None
+
+    def update(self, x):
+        self.count += 1
+        if self.count < self.period:
+            self._seed_sum += x
+        elif self.count == self.period:
+            self.value = (self._seed_sum + x) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+    def to_dict(self):
+        return {'period': self.period, 'count': self.count, 'seed_sum': self._seed_sum, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data['period'])
+        obj.count = data['count']
+        obj._seed_sum = data['seed_sum']
+        obj.value = data['value']
+        return obj
+
+
+class RollingMinMax:
+    """Мінімум і максимум у ковзному вікні через монотонні черги (амортизовано O(1))"""
+
+    def __init__(self, window):
+        self.window = window
+        self.index = 0
+        self._max = deque()  # (index, value), значення спадають
+        self._min = deque()  # (index, value), значення зростають
+
+    def update(self, x):
+        while self._max and self._max[-1][1] <= x:
+            self._max.pop()
+        self._max.append((self.index, x))
+        while self._min and self._min[-1][1] >= x:
+            self._min.pop()
+        self._min.append((self.index, x))
+
+        expired = self.index - self.window
+        if self._max[0][0] <= expired:
+            self._max.popleft()
+        if self._min[0][0] <= expired:
+            self._min.popleft()
+
+        self.index += 1
+        return self.min, self.max
+
+    @property
+    def ready(self):
+        return self.index >= self.window
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+    def to_dict(self):
+        return {'window': self.window, 'index': self.index,
+                'max': [list(item) for item in self._max], 'min': [list(item) for item in self._min]}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data['window'])
+        obj.index = data['index']
+        obj._max = deque(tuple(item) for item in data['max'])
+        obj._min = deque(tuple(item) for item in data['min'])
+        return obj
+
+
+class RollingStats:
+    """Ковзні середнє та дисперсія вікна фіксованого розміру"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self._m2 = 0.0  # сума квадратів відхилень (Welford)
+
+    def update(self, x):
+        if len(self.values) < self.window:
+            self.values.append(x)
+            delta = x - self.mean
+            self.mean += delta / len(self.values)
+            self._m2 += delta * (x - self.mean)
+        else:
+            old = self.values.popleft()
+            self.values.append(x)
+            old_mean = self.mean
+            self.mean += (x - old) / self.window
+            self._m2 += (x - old) * (x - self.mean + old - old_mean)
+            self._m2 = max(self._m2, 0.0)
+        return self.mean
+
+    @property
+    def ready(self):
+        return len(self.values) >= self.window
+
+    @property
+    def variance(self):
+        if not self.values:
+            return None
+        return self._m2 / len(self.values)
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def to_dict(self):
+        return {'window': self.window, 'values': list(self.values), 'mean': self.mean, 'm2': self._m2}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data['window'])
+        obj.values = deque(data['values'])
+        obj.mean = data['mean']
+        obj._m2 = data['m2']
+        return obj
+
+
+class AssetIndicatorState:
+    """
+    Набір інкрементних індикаторів одного активу (ті самі, що й indicators.compute_indicators),
+    оновлюється закритими свічками
+    """
+
+    def __init__(self):
+        self.last_epoch = None
+        self.close = None
+        self.ema_9 = StreamingEMA(EMA_FAST)
+        self.ema_21 = StreamingEMA(EMA_SLOW)
+        self.ema_9_prev = None
+        self.ema_21_prev = None
+        self.macd_fast = StreamingEMA(MACD_FAST)
+        self.macd_slow = StreamingEMA(MACD_SLOW)
+        self.macd_signal = StreamingEMA(MACD_SIGNAL)
+        self.rsi = StreamingRSI(RSI_PERIOD)
+        self.atr = StreamingWilder(ATR_PERIOD)
+        self.high_14 = RollingMinMax(STOCHASTIC_K)
+        self.low_14 = RollingMinMax(STOCHASTIC_K)
+        self.stoch_k = None
+        self.stoch_d = RollingStats(STOCHASTIC_D)
+        self.range_10 = RollingMinMax(VOLATILITY_WINDOW)
+        self.stats_10 = RollingStats(VOLATILITY_WINDOW)
+        self.stats_20 = RollingStats(BOLLINGER_PERIOD)
+
+    def update(self, epoch, high, low, close):
+        prev_close = self.close if self.close is not None else close
+        self.last_epoch = epoch
+        self.close = close
+
+        self.ema_9_prev, self.ema_21_prev = self.ema_9.value, self.ema_21.value
+        self.ema_9.update(close)
+        self.ema_21.update(close)
+        fast, slow = self.macd_fast.update(close), self.macd_slow.update(close)
+        if fast is not None and slow is not None:
+            self.macd_signal.update(fast - slow)
+        self.rsi.update(close)
+        self.atr.update(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+
+        self.high_14.update(high)
+        self.low_14.update(low)
+        if self.high_14.ready:
+            highest, lowest = self.high_14.max, self.low_14.min
+            self.stoch_k = (close - lowest) / (highest - lowest) * 100.0 if highest != lowest else 50.0
+            self.stoch_d.update(self.stoch_k)
+
+        self.range_10.update(close)
+        self.stats_10.update(close)
+        self.stats_20.update(close)
+
+    @property
+    def volatility(self):
+        """Та сама метрика, що й GroqAnalyzer.calculate_volatility, без проходу по вікну"""
+        if not self.range_10.ready or self.stats_10.mean == 0:
+            return 0.0
+        return round((self.range_10.max - self.range_10.min) / self.stats_10.mean * 100, 4)
+
+    def snapshot(self):
+        """Останні значення у форматі compute_indicators"""
+        values = {'price': self.close, 'rsi': self.rsi.value, 'ema_9': self.ema_9.value, 'ema_21': self.ema_21.value,
+                  'ema_9_prev': self.ema_9_prev, 'ema_21_prev': self.ema_21_prev,
+                  'macd': None, 'macd_signal': None, 'macd_hist': None,
+                  'bb_upper': None, 'bb_middle': None, 'bb_lower': None, 'bb_percent_b': None,
+                  'stoch_k': self.stoch_k, 'stoch_d': self.stoch_d.mean if self.stoch_d.ready else None,
+                  'atr': self.atr.value, 'volatility': self.volatility}
+
+        if self.macd_fast.value is not None and self.macd_slow.value is not None:
+            values['macd'] = self.macd_fast.value - self.macd_slow.value
+            if self.macd_signal.value is not None:
+                values['macd_signal'] = self.macd_signal.value
+                values['macd_hist'] = values['macd'] - self.macd_signal.value
+
+        if self.stats_20.ready:
+            middle, std = self.stats_20.mean, self.stats_20.std
+            upper, lower = middle + BOLLINGER_STD * std, middle - BOLLINGER_STD * std
+            values.update({
+                'bb_upper': upper, 'bb_middle': middle, 'bb_lower': lower,
+                'bb_percent_b': (self.close - lower) / (upper - lower) if upper != lower else 0.5,
+            })
+        return values
+
+    def to_dict(self):
+        return {
+            'last_epoch': self.last_epoch,
+            'close': self.close,
+            'ema_9_prev': self.ema_9_prev,
+            'ema_21_prev': self.ema_21_prev,
+            'stoch_k': self.stoch_k,
+            **{name: getattr(self, name).to_dict() for name in self._STREAMS},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls()
+        for name in ('last_epoch', 'close', 'ema_9_prev', 'ema_21_prev', 'stoch_k'):
+            setattr(obj, name, data[name])
+        for name, stream in cls._STREAMS.items():
+            setattr(obj, name, stream.from_dict(data[name]))
+        return obj
+
+    def copy(self):
+        return AssetIndicatorState.from_dict(self.to_dict())
+
+
+AssetIndicatorState._STREAMS = {
+    'ema_9': StreamingEMA, 'ema_21': StreamingEMA,
+    'macd_fast': StreamingEMA, 'macd_slow': StreamingEMA, 'macd_signal': StreamingEMA,
+    'rsi': StreamingRSI, 'atr': StreamingWilder,
+    'high_14': RollingMinMax, 'low_14': RollingMinMax, 'stoch_d': RollingStats,
+    'range_10': RollingMinMax, 'stats_10': RollingStats, 'stats_20': RollingStats,
+}
+
+
+class IndicatorStateRegistry:
+    """Стан інкрементних індикаторів для всіх активів"""
+
+    def __init__(self):
+        self.states = {}
+        self.rebuilt = set()  # Активи, чий стан щойно побудовано з вікна свічок (холодні або після розриву)
+
+    @staticmethod
+    def _rows(candles):
+        """(epoch, high, low, close) свічок; для CandleFrame - з колонкових масивів"""
+        if isinstance(candles, CandleFrame):
+            return candles.timestamps, candles.high, candles.low, candles.close
+        return ([int(candle.timestamp.timestamp()) for candle in candles], [candle.high for candle in candles],
+                [candle.low for candle in candles], [candle.close for candle in candles])
+
+    def update(self, asset, candles):
+        """
+        Подає в стан лише нові закриті свічки (остання свічка вважається незакритою).
+        Прохід іде з кінця до вже обробленої свічки - O(нових свічок).
+        Якщо між станом і вікном є пропуск (розрив з'єднання), стан будується заново з вікна.
+        """
+        self.rebuilt.discard(asset)
+        if not candles or len(candles) < 2:
+            return 0
+
+        epochs, highs, lows, closes = self._rows(candles)
+        timeframe = getattr(candles, 'timeframe', None) or int(epochs[-1]) - int(epochs[-2])
+        state = self.states.get(asset)
+        if state is not None and state.last_epoch is not None:
+            first, last_closed = int(epochs[0]), int(epochs[-2])
+            if first > state.last_epoch + timeframe or last_closed < state.last_epoch:
+                logger.info(f"📐 Пропуск у свічках {asset}, стан індикаторів перебудовується")
+                state = None
+        if state is None:
+            state = self.states[asset] = AssetIndicatorState()
+            self.rebuilt.add(asset)
+        last_epoch = state.last_epoch
+
+        start = len(epochs) - 1
+        for i in range(len(epochs) - 2, -1, -1):
+            if last_epoch is not None and int(epochs[i]) <= last_epoch:
+                break
+            start = i
+
+        for i in range(start, len(epochs) - 1):
+            state.update(int(epochs[i]), float(highs[i]), float(lows[i]), float(closes[i]))
+        return len(epochs) - 1 - start
+
+    def merge(self, states):
+        """Стан активів, оновлений в іншому процесі (словники to_dict)"""
+        for asset, state in states.items():
+            self.states[asset] = AssetIndicatorState.from_dict(state)
+
+    def snapshot(self, asset, candles=None):
+        """
+        Індикатори активу без проходу по історії. З candles остання (незакрита) свічка
+        застосовується до копії стану. Віконні значення (Bollinger, стохастик, волатильність) збігаються
+        з compute_indicators по тому ж вікну; рекурсивні (EMA, MACD, RSI, ATR) враховують усю історію стану,
+        тож для прогрітого активу це збіжні значення довшої історії, а не перерахунок 50 свічок.
+        """
+        state = self.states.get(asset)
+        if state is None or state.last_epoch is None:
+            return None
+        if candles is None:
+            return state.snapshot()
+
+        epochs, highs, lows, closes = self._rows(candles[-2:])
+        if int(epochs[0]) != state.last_epoch:
+            return None  # Стан не відповідає цим свічкам
+        live = state.copy()
+        live.update(int(epochs[-1]), float(highs[-1]), float(lows[-1]), float(closes[-1]))
+        return live.snapshot()
+
+    def save(self, path):
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({asset: state.to_dict() for asset, state in self.states.items()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося зберегти стан індикаторів: {e}")
+
+    def load(self, path):
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.states = {asset: AssetIndicatorState.from_dict(state) for asset, state in data.items()}
+                logger.info(f"📐 Завантажено стан індикаторів для {len(self.states)} активів")
+        except Exception as e:
+            logger.warning(f"⚠️ Не вдалося завантажити стан індикаторів: {e}")
+            self.states = {}
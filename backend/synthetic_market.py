@@ -0,0 +1,107 @@
+import time
+import zlib
+
+import numpy as np
+
+from candle_frame import CandleFrame
+
+# Режими ринку: (зсув у частках сигми за свічку, множник волатильності)
+REGIMES = {
+    'range': (0.0, 0.7),
+    'trend_up': (0.25, 1.0),
+    'trend_down': (-0.25, 1.0),
+    'burst': (0.0, 3.0),
+}
+REGIME_WEIGHTS = (0.45, 0.2, 0.2, 0.15)
+
+# Орієнтовні рівні цін для відомих активів; решта - стабільний рівень з хешу назви
+PRICE_LEVELS = {
+    'EURUSD': 1.08, 'GBPUSD': 1.27, 'USDJPY': 150.0, 'AUDUSD': 0.66, 'USDCAD': 1.36,
+    'USDCHF': 0.88, 'NZDUSD': 0.61, 'EURGBP': 0.85, 'EURJPY': 162.0, 'GBPJPY': 190.0,
+    'BTCUSD': 60000.0, 'ETHUSD': 3000.0, 'XAUUSD': 2300.0,
+}
+
+BASE_SIGMA = 0.0004  # стандартне відхилення лог-доходності за хвилину
+
+
+def _asset_key(asset):
+    return zlib.crc32(asset.replace('/', '').upper().encode('utf-8'))
+
+
+def price_level(asset):
+    """Рівень ціни активу: відомий або детермінований з назви (0.5 ... 500)"""
+    name = asset.replace('/', '').upper()
+    for known, level in PRICE_LEVELS.items():
+        if name.startswith(known):
+            return level
+    return float(10 ** ((_asset_key(name) % 3000) / 1000.0 - 0.3))
+
+
+class SyntheticMarket:
+    """
+    Детермінований генератор ринкових свічок на NumPy для демо-режиму та навантажувальних тестів.
+    Вся генерація векторизована по осях (активи, свічки); режими (флет, тренд, сплеск волатильності)
+    перемикаються сегментами випадкової довжини.
+    """
+
+    def __init__(self, seed=None, switch_probability=0.04):
+        self.seed = seed
+        self.switch_probability = switch_probability
+
+    def _rng(self, assets):
+        if self.seed is None:
+            return np.random.default_rng()
+        return np.random.default_rng([int(self.seed)] + [_asset_key(asset) for asset in assets])
+
+    def generate_matrix(self, assets, timeframe=60, count=50, end=None):
+        """
+        Свічки для кількох активів: dict з timestamps (count,) та open/high/low/close (активи, count).
+        Для того ж seed і списку активів результат однаковий.
+        """
+        assets = list(assets)
+        rows, timeframe = len(assets), int(timeframe)
+        rng = self._rng(assets)
+
+        # Сегменти режимів: перемикання з імовірністю switch_probability на свічку
+        switches = rng.random((rows, count)) < self.switch_probability
+        segments = np.cumsum(switches, axis=1)
+        segment_regimes = rng.choice(len(REGIMES), size=(rows, count + 1), p=REGIME_WEIGHTS)
+        regimes = np.take_along_axis(segment_regimes, segments, axis=1)
+
+        params = np.array(list(REGIMES.values()))
+        drift, vol = params[regimes, 0], params[regimes, 1]
+
+        sigma = BASE_SIGMA * np.sqrt(timeframe / 60.0)
+        noise = rng.standard_normal((3, rows, count))
+        returns = sigma * (drift + vol * noise[0])
+
+        levels = np.array([price_level(asset) for asset in assets])[:, None]
+        close = levels * np.exp(np.cumsum(returns, axis=1))
+        open_ = np.empty_like(close)
+        open_[:, 0] = levels[:, 0]
+        open_[:, 1:] = close[:, :-1]
+
+        wick = sigma * vol * 0.5
+        high = np.maximum(open_, close) * np.exp(np.abs(noise[1]) * wick)
+        low = np.minimum(open_, close) * np.exp(-np.abs(noise[2]) * wick)
+
+        end_epoch = int(end if end is not None else time.time())
+        last_bucket = end_epoch - end_epoch % timeframe
+        timestamps = last_bucket - timeframe * np.arange(count - 1, -1, -1, dtype=np.int64)
+
+        return {'timestamps': timestamps, 'open': open_, 'high': high, 'low': low, 'close': close,
+                'regimes': regimes}
+
+    def generate_frames(self, assets, timeframe=60, count=50, end=None):
+        """Словник актив -> CandleFrame (рядки матриць без копіювання)"""
+        assets = list(assets)
+        m = self.generate_matrix(assets, timeframe, count, end)
+        return {
+            asset: CandleFrame(m['timestamps'], m['open'][row], m['high'][row], m['low'][row], m['close'][row],
+                               asset=asset.replace('/', ''), timeframe=int(timeframe))
+            for row, asset in enumerate(assets)
+        }
+
+    def generate(self, asset, timeframe=60, count=50, end=None):
+        """Свічки одного активу як CandleFrame"""
+        return self.generate_frames([asset], timeframe, count, end)[asset]